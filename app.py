@@ -24,7 +24,13 @@ from engine.time_manager import TimeManager
 from engine.interaction_engine import InteractionEngine
 from engine.transaction_system import TransactionSystem
 from cognition.llm_client import LLMClient
+from cognition.model_routes import ModelRoute
 from cognition.decision_maker import DecisionMaker
+from cognition.plan_follower import PlanTriggerPolicy
+from cognition.decision_cache import DecisionCache
+from cognition.prompt_builder import PromptBudget
+from cognition.utility_policy import UtilityPolicy
+from cognition.tick_scheduler import TickScheduler, TickBudget
 from cognition.response_parser import ResponseParser
 
 
@@ -346,6 +352,10 @@ if "decision_maker" not in st.session_state:
     st.session_state.decision_maker = None
 if "response_parser" not in st.session_state:
     st.session_state.response_parser = None
+if "performance_config" not in st.session_state:
+    st.session_state.performance_config = {}  # Sección "performance" del JSON cargado
+if "tick_scheduler" not in st.session_state:
+    st.session_state.tick_scheduler = None  # Presupuesto de LLM por tick (opcional)
 if "last_campaign_check" not in st.session_state:
     st.session_state.last_campaign_check = {}  # Para rastrear campañas activas
 
@@ -371,6 +381,56 @@ def get_api_key() -> Optional[str]:
     return None
 
 
+def uses_utility_backend() -> bool:
+    """True si la configuración pide el backend de reglas en lugar del LLM"""
+    return st.session_state.performance_config.get("decision_backend", "llm") == "utility"
+
+
+def create_llm_client(api_key: str) -> LLMClient:
+    """Crea el cliente LLM con las rutas de modelo por tipo de llamada de la configuración"""
+    routes = {
+        call_type: ModelRoute.from_dict(route)
+        for call_type, route in st.session_state.performance_config.get("model_routes", {}).items()
+    }
+    return LLMClient(api_key=api_key, routes=routes)
+
+
+def create_decision_maker(world_config: WorldConfig, locations: Dict, llm_client: Optional[LLMClient],
+                          interaction_engine: Optional[InteractionEngine] = None):
+    """
+    Crea el backend de decisiones (DecisionMaker o UtilityPolicy) con la
+    configuración de rendimiento y cierra el anterior
+    """
+    if st.session_state.decision_maker:
+        st.session_state.decision_maker.shutdown(wait=False)
+    
+    performance = st.session_state.performance_config
+    st.session_state.tick_scheduler = None
+    if uses_utility_backend():
+        return UtilityPolicy(world_config, locations, TransactionSystem(world_config))
+    decision_maker = DecisionMaker(
+        world_config, locations, llm_client,
+        max_workers=performance.get("executor_workers", 32),
+        max_queue_depth=performance.get("executor_queue_depth", 256),
+        plan_policy=PlanTriggerPolicy(**performance.get("plan_triggers", {})),
+        decision_cache=DecisionCache(**performance["decision_cache"]) if "decision_cache" in performance else None,
+        prompt_budgets={
+            call_type: PromptBudget(**budget)
+            for call_type, budget in performance.get("prompt_budgets", {}).items()
+        },
+        prompt_formats=performance.get("prompt_formats"),
+        interaction_engine=interaction_engine,
+        max_nearby_agents=performance.get("max_nearby_agents", 5)
+    )
+    if "tick_budget" in performance:
+        # Los agentes que no caben en el presupuesto usan la política de utilidad
+        st.session_state.tick_scheduler = TickScheduler(
+            decision_maker, TickBudget(**performance["tick_budget"]),
+            fallback=UtilityPolicy(world_config, locations, TransactionSystem(world_config))
+        )
+    return decision_maker
+
+
 def initialize_simulation():
     """Inicializa la simulación con configuración básica"""
     # Crear configuración del mundo
@@ -477,9 +537,11 @@ def initialize_simulation():
     
     # Inicializar cliente LLM
     api_key = get_api_key()
-    if api_key:
-        llm_client = LLMClient(api_key=api_key)
-        decision_maker = DecisionMaker(world_config, locations, llm_client)
+    if st.session_state.llm_client:
+        st.session_state.llm_client.close()
+    if api_key or uses_utility_backend():
+        llm_client = create_llm_client(api_key) if api_key else None
+        decision_maker = create_decision_maker(world_config, locations, llm_client, interaction_engine)
         response_parser = ResponseParser(
             world_config, locations, interaction_engine, transaction_system
         )
@@ -552,6 +614,7 @@ def load_config_from_json(uploaded_file):
         world_config.marketing_campaigns = data.get("marketing", [])
         
         # Actualizar session state
+        st.session_state.performance_config = data.get("performance", {})
         st.session_state.world_config = world_config
         st.session_state.locations = locations
         st.session_state.agents = agents
@@ -580,6 +643,11 @@ def execute_tick():
     
     # 1. Avanzar tiempo
     is_morning = time_manager.advance_tick(agents)
+    # Índice espacial e instantánea del mundo del tick (los colapsados vuelven a casa en advance_tick)
+    interaction_engine.index_agents(agents)
+    world_config.take_snapshot(locations)
+    if decision_maker:
+        decision_maker.begin_tick()
     
     # 2. Si es la mañana (7 AM), planificar el día
     if is_morning and decision_maker:
@@ -628,67 +696,105 @@ def execute_tick():
     day, hour, minute = world_config.get_current_time()
     
     if decision_maker and response_parser:
-        # Decidir acciones en paralelo
-        decisions = decision_maker.decide_actions_parallel(agents)
+        # Decidir acciones en paralelo; en modo "plan" solo llaman al LLM
+        # los agentes cuyo plan diario no basta para esta hora
+        performance = st.session_state.performance_config
+        follow_plan = performance.get("reactor_mode", "always") == "plan"
+        tick_scheduler = st.session_state.tick_scheduler
+        streamed = []
+        if tick_scheduler:
+            decisions = tick_scheduler.decide_actions(agents, follow_plan=follow_plan)
+        elif performance.get("stream_reactor", False) and isinstance(decision_maker, DecisionMaker):
+            # Las decisiones del reactor se ejecutan según llegan, tras las del plan
+            if follow_plan:
+                decisions, reactor_agents, plan_items = decision_maker.split_by_plan(agents)
+            else:
+                decisions, reactor_agents, plan_items = {}, agents, {}
+            streamed = decision_maker.decide_actions_streaming(reactor_agents, plan_items)
+        elif follow_plan:
+            decisions = decision_maker.decide_actions_following_plan(
+                agents, batch_size=performance.get("reactor_batch_size", 0)
+            )
+        else:
+            decisions = decision_maker.decide_actions_parallel(agents)
         
         # Ejecutar decisiones
-        for agent in agents:
-            if agent.agent_id in decisions:
-                decision = decisions[agent.agent_id]
-                success, message = response_parser.parse_and_execute_decision(agent, decision)
-                
-                if success:
-                    st.session_state.event_log.append({
-                        "time": time_manager.get_time_string(),
-                        "type": "action",
-                        "agent": agent.name,
-                        "message": message
-                    })
-    
-    # 4. Detectar y procesar interacciones sociales
-    if interaction_engine:
-        for agent in agents:
-            nearby_agents = interaction_engine.detect_same_location(agent, agents)
+        def execute_decision(agent: Agent, decision: Dict):
+            success, message = response_parser.parse_and_execute_decision(agent, decision)
             
-            if nearby_agents and decision_maker:
-                # Generar conversación con el primer agente cercano
-                other_agent = nearby_agents[0]
-                conversation = decision_maker.generate_conversation(agent, other_agent)
-                
-                # Actualizar relaciones
-                relationship_change = conversation.get("relationship_change", 0.0)
-                agent.update_relationship(other_agent.agent_id, relationship_change)
-                other_agent.update_relationship(agent.agent_id, relationship_change)
-                
-                # Registrar evento
-                day, hour, minute = world_config.get_current_time()
-                agent.memory.add_event(
-                    timestamp=(day, hour, minute),
-                    event_type="Chat",
-                    description=conversation.get("dialogue", ""),
-                    location=agent.current_location,
-                    other_agent_id=other_agent.agent_id
-                )
-                
-                other_agent.memory.add_event(
-                    timestamp=(day, hour, minute),
-                    event_type="Chat",
-                    description=conversation.get("dialogue", ""),
-                    location=agent.current_location,
-                    other_agent_id=agent.agent_id
-                )
-                
+            if success:
                 st.session_state.event_log.append({
                     "time": time_manager.get_time_string(),
-                    "type": "chat",
+                    "type": "action",
                     "agent": agent.name,
-                    "other_agent": other_agent.name,
-                    "message": conversation.get("dialogue", "")
+                    "message": message
                 })
+        
+        for agent in agents:
+            if agent.agent_id in decisions:
+                execute_decision(agent, decisions[agent.agent_id])
+        for agent, decision in streamed:
+            execute_decision(agent, decision)
+    
+    # 4. Detectar y procesar interacciones sociales: una conversación por pareja
+    # única, generadas en paralelo y aplicadas en orden determinista
+    chatted = set()
+    if interaction_engine and decision_maker:
+        pairs = interaction_engine.detect_conversation_pairs(agents)
+        conversations = decision_maker.generate_conversations_parallel(pairs)
+        
+        day, hour, minute = world_config.get_current_time()
+        for (agent, other_agent), conversation in zip(pairs, conversations):
+            chatted.update((agent.agent_id, other_agent.agent_id))
+            
+            # Actualizar relaciones
+            relationship_change = conversation.get("relationship_change", 0.0)
+            agent.update_relationship(other_agent.agent_id, relationship_change)
+            other_agent.update_relationship(agent.agent_id, relationship_change)
+            
+            # Registrar evento
+            agent.memory.add_event(
+                timestamp=(day, hour, minute),
+                event_type="Chat",
+                description=conversation.get("dialogue", ""),
+                location=agent.current_location,
+                other_agent_id=other_agent.agent_id
+            )
+            
+            other_agent.memory.add_event(
+                timestamp=(day, hour, minute),
+                event_type="Chat",
+                description=conversation.get("dialogue", ""),
+                location=agent.current_location,
+                other_agent_id=agent.agent_id
+            )
+            
+            st.session_state.event_log.append({
+                "time": time_manager.get_time_string(),
+                "type": "chat",
+                "agent": agent.name,
+                "other_agent": other_agent.name,
+                "message": conversation.get("dialogue", "")
+            })
     
     # 5. Limitar tamaño del log
     if len(st.session_state.event_log) > 100:
         st.session_state.event_log = st.session_state.event_log[-100:]
+    
+    # 6. Adelantar las llamadas del reactor del siguiente tick para los agentes
+    # estables (descansando en casa, sin conversación) mientras se renderiza
+    performance = st.session_state.performance_config
+    if isinstance(decision_maker, DecisionMaker) and performance.get("speculative_prefetch", False):
+        stable_agents = [
+            agent for agent in agents
+            if agent.last_action == "rest" and agent.last_action_success
+            and agent.current_location == agent.home_location
+            and agent.agent_id not in chatted
+        ]
+        if stable_agents:
+            decision_maker.prefetch_next_tick(
+                stable_agents, follow_plan=performance.get("reactor_mode", "always") == "plan"
+            )
 
 
 def create_map_visualization():
@@ -962,8 +1068,8 @@ def create_social_graph():
     )
     
     return fig
-
-
+    
+    
     
     # Paso 1: Inicialización
     st.subheader("📍 Paso 1: Inicializar la Simulación")
@@ -1465,10 +1571,14 @@ with st.sidebar:
             st.session_state.transaction_system = TransactionSystem(world_config)
             
             api_key = get_api_key()
-            if api_key:
-                llm_client = LLMClient(api_key=api_key)
+            if api_key or uses_utility_backend():
+                if st.session_state.llm_client:
+                    st.session_state.llm_client.close()
+                llm_client = create_llm_client(api_key) if api_key else None
                 st.session_state.llm_client = llm_client
-                st.session_state.decision_maker = DecisionMaker(world_config, locations, llm_client)
+                st.session_state.decision_maker = create_decision_maker(
+                    world_config, locations, llm_client, st.session_state.interaction_engine
+                )
                 st.session_state.response_parser = ResponseParser(
                     world_config, locations,
                     st.session_state.interaction_engine,
@@ -1830,7 +1940,100 @@ if st.session_state.world_config:
                     st.write(f"**Personality**: {', '.join(agent.personality_traits)}")
         else:
             st.info("No hay agentes configurados")
-    
+        
+        # Consumo del LLM
+        llm_client = st.session_state.llm_client
+        if llm_client:
+            st.markdown("---")
+            st.markdown("### 💸 LLM Usage")
+            usage_tracker = llm_client.usage_tracker
+            
+            for label, totals in [("Tick", usage_tracker.get_tick_totals()),
+                                  ("Day", usage_tracker.get_day_totals()),
+                                  ("Total", usage_tracker.get_totals())]:
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric(f"{label} · Calls", f"{totals['calls']} ({totals['cache_hits']} cached, {totals['coalesced']} coalesced)")
+                with col2:
+                    st.metric(f"{label} · Tokens", f"{totals['prompt_tokens']:,} / {totals['completion_tokens']:,}")
+                with col3:
+                    st.metric(f"{label} · Avg Latency", f"{totals['avg_latency']:.2f}s")
+                with col4:
+                    st.metric(f"{label} · Cost", f"${totals['cost']:.4f}")
+            
+            by_type = usage_tracker.get_totals_by_call_type()
+            if by_type:
+                df_usage = pd.DataFrame([
+                    {
+                        "Call Type": call_type,
+                        "Calls": totals["calls"],
+                        "Errors": totals["errors"],
+                        "Coalesced": totals["coalesced"],
+                        "Retries": totals["retries"],
+                        "Prompt Tokens": totals["prompt_tokens"],
+                        "Completion Tokens": totals["completion_tokens"],
+                        "Avg Latency (s)": round(totals["avg_latency"], 2),
+                        "Cost ($)": round(totals["cost"], 4)
+                    }
+                    for call_type, totals in by_type.items()
+                ])
+                st.dataframe(df_usage, use_container_width=True, hide_index=True)
+            
+            limiter = llm_client.rate_limiter
+            if limiter:
+                gauges = limiter.get_gauges()
+                st.caption(
+                    f"Rate limiter: limit {gauges['current_limit']} · in flight {gauges['in_flight']} · "
+                    f"queue {gauges['queue_depth']} · throttled {gauges['total_throttled']}"
+                )
+        
+        decision_maker = st.session_state.decision_maker
+        if isinstance(decision_maker, DecisionMaker):
+            pool = decision_maker.get_executor_stats()
+            st.caption(
+                f"Thread pool: {pool['active']}/{pool['max_workers']} busy · queued {pool['queued']} · "
+                f"peak {pool['peak_active']} · utilization {pool['utilization']:.0%}"
+            )
+            plan_stats = decision_maker.plan_follower.get_stats()
+            if plan_stats["followed"] or plan_stats["reacted"]:
+                triggers = ", ".join(f"{name} {count}" for name, count in sorted(plan_stats["triggers"].items()))
+                st.caption(
+                    f"Plan following: {plan_stats['followed']} from plan · {plan_stats['reacted']} via reactor "
+                    f"({plan_stats['followed_ratio']:.0%} skipped LLM) · triggers: {triggers or 'none'}"
+                )
+            prefetch_stats = decision_maker.prefetcher.get_stats()
+            if prefetch_stats["issued"]:
+                st.caption(
+                    f"Speculative prefetch: {prefetch_stats['used']}/{prefetch_stats['issued']} used · "
+                    f"{prefetch_stats['mismatched']} mismatched · {prefetch_stats['discarded']} discarded"
+                )
+            if decision_maker.decision_cache:
+                cache_stats = decision_maker.decision_cache.get_stats()
+                st.caption(
+                    f"Decision cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+                    f"{cache_stats['bypassed']} fresh by choice · hit rate {cache_stats['hit_rate']:.0%} · "
+                    f"{cache_stats['entries']} entries"
+                )
+            prompt_sizes = decision_maker.prompt_builder.get_size_stats()
+            if prompt_sizes:
+                sizes = " · ".join(
+                    f"{call_type} ~{size['avg_tokens']:.0f} (max {size['max_tokens']}"
+                    + (f"/{size['budget']}, {size['trimmed']} trimmed, {size['over_budget']} over budget"
+                       if size["budget"] else "") + ")"
+                    for call_type, size in sorted(prompt_sizes.items())
+                )
+                st.caption(f"Prompt tokens: {sizes}")
+            tick_scheduler = st.session_state.tick_scheduler
+            if tick_scheduler:
+                budget_stats = tick_scheduler.get_stats()
+                fallbacks = ", ".join(f"{name} {count}" for name, count in sorted(budget_stats["fallbacks"].items()))
+                last_tick = budget_stats["last_tick"]
+                st.caption(
+                    f"Tick budget: {budget_stats['llm_decisions']} LLM decisions · fallbacks: {fallbacks or 'none'} · "
+                    f"last tick {last_tick.get('llm_decisions', 0)}/{last_tick.get('reactor_candidates', 0)} "
+                    f"in {last_tick.get('seconds', 0.0):.2f}s"
+                )
+
 else:
     st.info("👈 Usa el panel lateral para inicializar la simulación")
     st.markdown("""
@@ -3,15 +3,56 @@ Módulo de Cognición
 Exporta todas las clases relacionadas con el LLM
 """
 
-from cognition.llm_client import LLMClient
-from cognition.prompt_builder import PromptBuilder
+from cognition.llm_client import LLMClient, LLMRequestError, CallCancelledError, cancellation_scope
+from cognition.llm_cache import LLMResponseCache
+from cognition.llm_cassette import LLMCassette, CassetteMissError
+from cognition.rate_limiter import AdaptiveRateLimiter, get_shared_limiter, configure_shared_limiter
+from cognition.retry_policy import RetryPolicy, RetryBudget, LatencyTracker
+from cognition.usage_tracker import UsageTracker, CallRecord
+from cognition.model_routes import ModelRoute
+from cognition.single_flight import SingleFlight
+from cognition.executor_pool import BoundedExecutor
+from cognition.plan_follower import PlanFollower, PlanTriggerPolicy
+from cognition.decision_cache import DecisionCache
+from cognition.speculative_prefetch import SpeculativePrefetcher
+from cognition.prompt_builder import PromptBuilder, PromptBudget, FORMAT_VERBOSE, FORMAT_COMPACT
 from cognition.decision_maker import DecisionMaker
+from cognition.utility_policy import UtilityPolicy, UtilityWeights
+from cognition.tick_scheduler import TickScheduler, TickBudget
 from cognition.response_parser import ResponseParser
 
 __all__ = [
     "LLMClient",
+    "LLMRequestError",
+    "CallCancelledError",
+    "cancellation_scope",
+    "LLMResponseCache",
+    "LLMCassette",
+    "CassetteMissError",
+    "AdaptiveRateLimiter",
+    "get_shared_limiter",
+    "configure_shared_limiter",
+    "RetryPolicy",
+    "RetryBudget",
+    "LatencyTracker",
+    "UsageTracker",
+    "CallRecord",
+    "ModelRoute",
+    "SingleFlight",
+    "BoundedExecutor",
+    "PlanFollower",
+    "PlanTriggerPolicy",
+    "DecisionCache",
+    "SpeculativePrefetcher",
     "PromptBuilder",
+    "PromptBudget",
+    "FORMAT_VERBOSE",
+    "FORMAT_COMPACT",
     "DecisionMaker",
+    "UtilityPolicy",
+    "UtilityWeights",
+    "TickScheduler",
+    "TickBudget",
     "ResponseParser"
 ]
 
@@ -0,0 +1,191 @@
+"""
+Caché de Decisiones
+Reutiliza decisiones del reactor entre agentes en situaciones casi idénticas
+"""
+
+import random
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from models.agent import Agent
+from models.world_config import WorldConfig
+from cognition.single_flight import SingleFlight
+
+
+class DecisionCache:
+    """
+    Memoriza decisiones del Action Reactor por una firma gruesa del estado:
+    tramos de energía, dinero y comestibles, ubicación, hora, día de la
+    semana, descuentos activos, arquetipo de personalidad y actividad del plan.
+    
+    Cada entrada vive `ttl_hours` horas simuladas. En cada consulta la entrada
+    se reutiliza con probabilidad `reuse_probability`; si no, se pide una
+    decisión nueva al LLM, que reemplaza a la guardada, para que el
+    comportamiento siga siendo variado. Los agentes con la misma firma que
+    deciden a la vez esperan a la primera llamada en lugar de repetirla.
+    """
+    
+    def __init__(self, ttl_hours: int = 24 * 7, reuse_probability: float = 0.8,
+                 energy_bucket: float = 20.0, money_bucket: float = 100.0,
+                 grocery_bucket: float = 25.0, max_entries: int = 5000,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            ttl_hours: Horas simuladas que una decisión sigue siendo reutilizable.
+            reuse_probability: Probabilidad (0-1) de reutilizar una entrada válida.
+            energy_bucket: Ancho de los tramos de energía.
+            money_bucket: Ancho de los tramos de dinero.
+            grocery_bucket: Ancho de los tramos de comestibles.
+            max_entries: Entradas máximas (se descartan las menos usadas).
+            seed: Semilla para que la reutilización sea reproducible.
+        """
+        self.ttl_hours = ttl_hours
+        self.reuse_probability = reuse_probability
+        self.energy_bucket = energy_bucket
+        self.money_bucket = money_bucket
+        self.grocery_bucket = grocery_bucket
+        self.max_entries = max_entries
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # firma -> (hora absoluta de creación, decisión)
+        self._entries: "OrderedDict[Tuple, Tuple[int, Dict]]" = OrderedDict()
+        self.single_flight = SingleFlight()
+        
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expired = 0
+    
+    def make_key(self, agent: Agent, world_config: WorldConfig,
+                 active_discounts: List[str], plan_item: Optional[Dict] = None) -> Tuple:
+        """Firma cuantizada del estado del agente y del mundo"""
+        plan_key = None
+        if plan_item:
+            plan_key = (plan_item.get("action"), plan_item.get("location"), plan_item.get("product"))
+        return (
+            int(agent.energy // self.energy_bucket),
+            int(agent.money // self.money_bucket),
+            int(agent.grocery_level // self.grocery_bucket),
+            agent.current_location,
+            agent.current_location == agent.work_location,
+            world_config.current_hour,
+            world_config.get_day_of_week(),
+            tuple(sorted(active_discounts)),
+            tuple(sorted(agent.personality_traits)),
+            plan_key
+        )
+    
+    def get(self, key: Tuple, now: int) -> Optional[Dict]:
+        """Decisión guardada y vigente para la firma, o None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, decision = entry
+            if now - created >= self.ttl_hours:
+                del self._entries[key]
+                self.expired += 1
+                return None
+            self._entries.move_to_end(key)
+            return decision
+    
+    def put(self, key: Tuple, decision: Dict, now: int):
+        """Guarda una decisión para la firma"""
+        with self._lock:
+            self._entries[key] = (now, dict(decision))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def _should_reuse(self) -> bool:
+        """Tira el dado de reutilización"""
+        with self._lock:
+            return self._random.random() < self.reuse_probability
+    
+    def _lookup(self, key: Tuple, now: int) -> Optional[Dict]:
+        """Consulta la caché actualizando los contadores de acierto y fallo"""
+        decision = self.get(key, now)
+        with self._lock:
+            if decision is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return decision
+    
+    def get_or_compute(self, key: Tuple, now: int, compute: Callable[[], Dict],
+                       cacheable: Callable[[Dict], bool]) -> Dict:
+        """
+        Retorna una decisión para la firma reutilizando la guardada si procede.
+        
+        Args:
+            now: Hora simulada absoluta (día * 24 + hora).
+            compute: Obtiene una decisión nueva del LLM.
+            cacheable: Indica si una decisión nueva puede guardarse.
+        """
+        if not self._should_reuse():
+            with self._lock:
+                self.bypassed += 1
+            decision = compute()
+            if cacheable(decision):
+                self.put(key, decision, now)
+            return decision
+        
+        def lookup_or_compute() -> Dict:
+            cached = self._lookup(key, now)
+            if cached is not None:
+                return cached
+            fresh = compute()
+            if cacheable(fresh):
+                self.put(key, fresh, now)
+            return fresh
+        
+        decision, shared = self.single_flight.do(key, lookup_or_compute)
+        if shared:
+            with self._lock:
+                self.hits += 1
+        return dict(decision)
+    
+    async def aget_or_compute(self, key: Tuple, now: int, compute: Callable[[], Awaitable[Dict]],
+                              cacheable: Callable[[Dict], bool]) -> Dict:
+        """Versión asíncrona de get_or_compute()"""
+        if not self._should_reuse():
+            with self._lock:
+                self.bypassed += 1
+            decision = await compute()
+            if cacheable(decision):
+                self.put(key, decision, now)
+            return decision
+        
+        async def lookup_or_compute() -> Dict:
+            cached = self._lookup(key, now)
+            if cached is not None:
+                return cached
+            fresh = await compute()
+            if cacheable(fresh):
+                self.put(key, fresh, now)
+            return fresh
+        
+        decision, shared = await self.single_flight.ado(key, lookup_or_compute)
+        if shared:
+            with self._lock:
+                self.hits += 1
+        return dict(decision)
+    
+    def get_stats(self) -> Dict:
+        """Retorna aciertos, fallos, consultas sin reutilización y tamaño"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "expired": self.expired,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+    
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._entries.clear()
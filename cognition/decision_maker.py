@@ -3,15 +3,38 @@ Tomador de Decisiones
 Gestiona las llamadas al LLM y clasifica las intenciones
 """
 
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from models.agent import Agent
 from models.world_config import WorldConfig
-from cognition.prompt_builder import PromptBuilder
+from cognition.prompt_builder import PromptBuilder, PromptBudget
 from cognition.llm_client import LLMClient
+from cognition.json_stream import IncrementalJSONParser
+from cognition.executor_pool import BoundedExecutor
+from cognition.plan_follower import PlanFollower, PlanTriggerPolicy
+from cognition.decision_cache import DecisionCache
+from cognition.speculative_prefetch import SpeculativePrefetcher
+from engine.time_manager import TimeManager
+from engine.interaction_engine import InteractionEngine
+from cognition.usage_tracker import (
+    CALL_DAILY_PLANNER, CALL_ACTION_REACTOR, CALL_BATCHED_REACTOR, CALL_CONVERSATION
+)
 import json
+import asyncio
 import concurrent.futures
 
 
+# Acciones que ResponseParser sabe ejecutar
+VALID_ACTIONS = {"buy", "move", "rest", "eat", "work", "chat"}
+
+# Campos del reactor que ResponseParser necesita, además de "action", para
+# ejecutar cada acción (las demás no necesitan ninguno)
+ACTION_REQUIRED_FIELDS = {
+    "buy": ("target_location", "target_product"),
+    "move": ("target_location",),
+    "chat": ("target_agent",)
+}
+
+
 class DecisionMaker:
     """
     Gestiona las decisiones de los agentes usando el LLM.
@@ -21,11 +44,50 @@ class DecisionMaker:
     3. Conversation Generator: Se activa cuando hay agentes cerca
     """
     
-    def __init__(self, world_config: WorldConfig, locations: Dict, llm_client: LLMClient):
+    def __init__(self, world_config: WorldConfig, locations: Dict, llm_client: LLMClient,
+                 async_concurrency: int = 100, max_workers: int = 32,
+                 max_queue_depth: int = 256,
+                 plan_policy: Optional[PlanTriggerPolicy] = None,
+                 decision_cache: Optional[DecisionCache] = None,
+                 prompt_budgets: Optional[Dict[str, PromptBudget]] = None,
+                 prompt_formats: Optional[Dict[str, str]] = None,
+                 interaction_engine: Optional[InteractionEngine] = None,
+                 max_nearby_agents: int = 5):
         self.world_config = world_config
         self.locations = locations
         self.llm_client = llm_client
-        self.prompt_builder = PromptBuilder(world_config, locations)
+        # Con prompt_budgets, cada tipo de llamada recorta su prompt a su presupuesto de tokens;
+        # prompt_formats elige el formato (explicativo o compacto) de cada tipo de llamada
+        # interaction_engine aporta los agentes cercanos del reactor (como mucho max_nearby_agents)
+        self.prompt_builder = PromptBuilder(world_config, locations, prompt_budgets, prompt_formats,
+                                            interaction_engine, max_nearby_agents)
+        # Máximo de peticiones en vuelo en las variantes asíncronas
+        self.async_concurrency = async_concurrency
+        # Pool de hilos compartido por todas las variantes paralelas síncronas
+        self.executor = BoundedExecutor(max_workers, max_queue_depth, name="decision")
+        # Ejecución directa del plan diario cuando no hay motivos para llamar al reactor
+        self.plan_follower = PlanFollower(VALID_ACTIONS, plan_policy)
+        # Reutilización de decisiones del reactor entre estados casi idénticos (None = desactivada)
+        self.decision_cache = decision_cache
+        # Peticiones del reactor lanzadas por adelantado para el tick siguiente
+        self.prefetcher = SpeculativePrefetcher()
+    
+    def shutdown(self, wait: bool = True):
+        """Cierra el pool de hilos de las llamadas paralelas"""
+        self.executor.shutdown(wait=wait)
+    
+    def get_executor_stats(self) -> Dict:
+        """Retorna la ocupación y utilización del pool de hilos"""
+        return self.executor.get_stats()
+    
+    def begin_tick(self):
+        """
+        Prepara un nuevo tick de simulación: restablece el presupuesto de
+        reintentos y asigna la contabilidad de uso al tick actual.
+        """
+        day, hour, minute = self.world_config.get_current_time()
+        self.llm_client.begin_tick(day, hour)
+        self.prefetcher.discard_stale((day, hour))
     
     def plan_daily_activities(self, agent: Agent) -> Dict:
         """
@@ -35,15 +97,26 @@ class DecisionMaker:
         prompt = self.prompt_builder.build_daily_planner_prompt(agent)
         
         try:
-            response = self.llm_client.call(prompt)
-            plan_data = self._parse_json_response(response)
-            
-            if "plan" in plan_data:
-                agent.daily_plan = plan_data["plan"]
-                agent.is_planning_day = True
-                return plan_data
-            else:
-                return {"plan": [], "reasoning": "No se pudo generar un plan válido"}
+            response = self.llm_client.call(
+                prompt, call_type=CALL_DAILY_PLANNER, agent_id=agent.agent_id,
+                system_message=self.prompt_builder.get_system_message(CALL_DAILY_PLANNER)
+            )
+            return self._apply_daily_plan(agent, response)
+        
+        except Exception as e:
+            print(f"Error al planificar día para {agent.name}: {e}")
+            return {"plan": [], "reasoning": f"Error: {str(e)}"}
+    
+    async def aplan_daily_activities(self, agent: Agent) -> Dict:
+        """Versión asíncrona de plan_daily_activities()"""
+        prompt = self.prompt_builder.build_daily_planner_prompt(agent)
+        
+        try:
+            response = await self.llm_client.acall(
+                prompt, call_type=CALL_DAILY_PLANNER, agent_id=agent.agent_id,
+                system_message=self.prompt_builder.get_system_message(CALL_DAILY_PLANNER)
+            )
+            return self._apply_daily_plan(agent, response)
         
         except Exception as e:
             print(f"Error al planificar día para {agent.name}: {e}")
@@ -52,28 +125,261 @@ class DecisionMaker:
     def decide_action(self, agent: Agent, current_plan_item: Optional[Dict] = None) -> Dict:
         """
         Action Reactor: Decide qué hacer ahora (ejecutado cada hora).
+        Usa la petición especulativa del tick anterior si su prompt coincide y,
+        si hay caché de decisiones, puede reutilizar la de un agente en una
+        situación casi idéntica.
         Retorna una decisión de acción como diccionario.
         """
+        return self._decide(agent, current_plan_item)
+    
+    def _decide(self, agent: Agent, current_plan_item: Optional[Dict], prompt: Optional[str] = None,
+                on_partial: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Implementación de decide_action().
+        
+        Args:
+            prompt: Prompt del reactor ya construido (por defecto se construye ahora).
+            on_partial: Si se indica, la llamada al reactor va en streaming y
+                recibe la decisión en cuanto sus campos de acción están completos.
+        """
+        prefetched = self._take_prefetched(agent, current_plan_item, prompt)
+        if prefetched is not None:
+            return prefetched.result()
+        
+        if self.decision_cache is None:
+            return self._react(agent, current_plan_item, prompt, on_partial)
+        
+        return self.decision_cache.get_or_compute(
+            self._decision_key(agent, current_plan_item),
+            self._absolute_hour(),
+            lambda: self._react(agent, current_plan_item, prompt, on_partial),
+            self._is_cacheable_decision
+        )
+    
+    async def adecide_action(self, agent: Agent, current_plan_item: Optional[Dict] = None) -> Dict:
+        """Versión asíncrona de decide_action()"""
+        prefetched = self._take_prefetched(agent, current_plan_item)
+        if prefetched is not None:
+            return await asyncio.wrap_future(prefetched)
+        
+        if self.decision_cache is None:
+            return await self._areact(agent, current_plan_item)
+        
+        return await self.decision_cache.aget_or_compute(
+            self._decision_key(agent, current_plan_item),
+            self._absolute_hour(),
+            lambda: self._areact(agent, current_plan_item),
+            self._is_cacheable_decision
+        )
+    
+    def _react(self, agent: Agent, current_plan_item: Optional[Dict], prompt: Optional[str] = None,
+               on_partial: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Llamada al Action Reactor sin caché"""
+        if prompt is None:
+            prompt = self.prompt_builder.build_action_reactor_prompt(agent, current_plan_item)
+        return self._call_reactor(agent, prompt, on_partial)
+    
+    def _call_reactor(self, agent: Agent, prompt: str,
+                      on_partial: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Envía un prompt del reactor ya construido y valida la decisión"""
+        try:
+            if on_partial is None:
+                response = self.llm_client.call(
+                    prompt, call_type=CALL_ACTION_REACTOR, agent_id=agent.agent_id,
+                    system_message=self.prompt_builder.get_system_message(CALL_ACTION_REACTOR)
+                )
+            else:
+                response = self.llm_client.call_stream(
+                    prompt, on_progress=self._early_decision_watcher(on_partial),
+                    call_type=CALL_ACTION_REACTOR, agent_id=agent.agent_id,
+                    system_message=self.prompt_builder.get_system_message(CALL_ACTION_REACTOR)
+                )
+            return self._validate_decision(response)
+        
+        except Exception as e:
+            print(f"Error al decidir acción para {agent.name}: {e}")
+            return self._error_decision(e)
+    
+    async def _areact(self, agent: Agent, current_plan_item: Optional[Dict]) -> Dict:
+        """Versión asíncrona de _react()"""
         prompt = self.prompt_builder.build_action_reactor_prompt(agent, current_plan_item)
         
         try:
-            response = self.llm_client.call(prompt)
-            decision = self._parse_json_response(response)
-            
-            # Validar estructura de decisión
-            if "action" not in decision:
-                decision = {"action": "rest", "reasoning": "Decisión inválida, descansando"}
-            
-            return decision
+            response = await self.llm_client.acall(
+                prompt, call_type=CALL_ACTION_REACTOR, agent_id=agent.agent_id,
+                system_message=self.prompt_builder.get_system_message(CALL_ACTION_REACTOR)
+            )
+            return self._validate_decision(response)
         
         except Exception as e:
             print(f"Error al decidir acción para {agent.name}: {e}")
-            return {
-                "action": "rest",
-                "target_location": None,
-                "target_product": None,
-                "reasoning": f"Error: {str(e)}"
-            }
+            return self._error_decision(e)
+    
+    def decide_actions_streaming(self, agents: List[Agent],
+                                 plan_items: Optional[Dict[str, Dict]] = None) -> Iterator[Tuple[Agent, Dict]]:
+        """
+        Lanza en paralelo las llamadas del reactor en streaming y retorna un
+        iterador de (agente, decisión) en orden de llegada. Cada decisión se
+        entrega en cuanto action y los target_* están completos y son válidos,
+        sin esperar a que termine el reasoning (que entonces falta en la
+        decisión entregada).
+        
+        Las llamadas se lanzan al llamar al método, no al recorrer el iterador,
+        así que avanzan mientras se ejecutan las decisiones del plan. Los
+        prompts se construyen antes de lanzar ninguna, de modo que ejecutar una
+        decisión mientras llegan las demás no cambia lo que ven los agentes que
+        aún esperan. Cada agente recibe exactamente una decisión, también si su
+        tarea se cancela o falla.
+        """
+        plan_items = plan_items or {}
+        requests = [
+            (agent, plan_items.get(agent.agent_id),
+             self.prompt_builder.build_action_reactor_prompt(agent, plan_items.get(agent.agent_id)))
+            for agent in agents
+        ]
+        
+        arrivals: Dict[concurrent.futures.Future, Agent] = {}
+        for agent, plan_item, prompt in requests:
+            arrival = concurrent.futures.Future()
+            arrivals[arrival] = agent
+            try:
+                worker = self.executor.submit(self._decide_streaming, agent, plan_item, prompt, arrival)
+            except RuntimeError as e:  # Ejecutor cerrado
+                self._settle_arrival(arrival, self._error_decision(e))
+                continue
+            worker.add_done_callback(
+                lambda worker, arrival=arrival: self._settle_arrival(arrival, self._worker_decision(worker))
+            )
+        
+        return (
+            (arrivals[arrival], arrival.result())
+            for arrival in concurrent.futures.as_completed(arrivals)
+        )
+    
+    def _decide_streaming(self, agent: Agent, current_plan_item: Optional[Dict], prompt: str,
+                          arrival: concurrent.futures.Future) -> Dict:
+        """
+        Decide para un agente. La decisión anticipada, si es ejecutable, se
+        entrega en arrival; si no, arrival recibe la final al terminar la tarea.
+        """
+        def on_partial(fields: Dict):
+            decision = self._check_decision(fields)
+            if self._is_executable_decision(decision):
+                self._settle_arrival(arrival, decision)
+        
+        try:
+            return self._decide(agent, current_plan_item, prompt, on_partial)
+        except Exception as e:
+            print(f"Error al decidir para {agent.name}: {e}")
+            return self._error_decision(e)
+    
+    def _worker_decision(self, worker: concurrent.futures.Future) -> Dict:
+        """Decisión final de una tarea terminada, cancelada o fallida"""
+        if worker.cancelled():
+            return self._error_decision(concurrent.futures.CancelledError("Llamada cancelada"))
+        error = worker.exception()
+        if error is not None:
+            return self._error_decision(error)
+        return worker.result()
+    
+    @staticmethod
+    def _settle_arrival(arrival: concurrent.futures.Future, decision: Dict):
+        """Entrega la decisión si arrival aún no tiene una (la anticipada gana a la final)"""
+        try:
+            arrival.set_result(decision)
+        except concurrent.futures.InvalidStateError:
+            pass
+    
+    @staticmethod
+    def _early_decision_watcher(on_partial: Callable[[Dict], None]) -> Callable[[IncrementalJSONParser], None]:
+        """
+        Callback de streaming que llama a on_partial una vez, cuando la decisión
+        ya es ejecutable: la acción y los campos que esa acción necesita están
+        completos, o se cerró el objeto. El modelo puede escribir "reasoning"
+        antes que los target_*, así que no basta con que empiece otro campo.
+        Se entregan todos los campos completos hasta ese momento (incluido
+        "error" en las respuestas de error) para que el receptor los valide.
+        """
+        sent = []
+        
+        def on_progress(parser: IncrementalJSONParser):
+            if sent:
+                return
+            fields = parser.fields
+            action = fields.get("action")
+            if not isinstance(action, str):
+                return
+            required = ACTION_REQUIRED_FIELDS.get(action.lower(), ())
+            if parser.done or all(name in fields for name in required):
+                sent.append(True)
+                on_partial(dict(fields))
+        
+        return on_progress
+    
+    def prefetch_next_tick(self, agents: List[Agent], follow_plan: bool = False) -> int:
+        """
+        Lanza ya las llamadas del reactor del tick siguiente para agentes cuyo
+        estado no debería cambiar (p. ej. descansando en casa). El prompt se
+        construye con la hora siguiente y la energía tras el decaimiento; en el
+        tick siguiente decide_action() solo usa la respuesta si el prompt real
+        coincide. Retorna el número de peticiones lanzadas.
+        
+        Args:
+            follow_plan: Si es True, se omiten los agentes cuyo plan ya cubre la
+                hora siguiente y el prompt incluye la actividad del plan, como
+                hace decide_actions_following_plan().
+        """
+        next_config = self.prefetcher.next_world(self.world_config)
+        current = self.prompt_builder
+        builder = PromptBuilder(next_config, self.locations, current.budgets, current.formats,
+                                current.interaction_engine, current.max_nearby_agents, current.nearby_radius)
+        tick = (next_config.current_day, next_config.current_hour)
+        
+        issued = 0
+        for agent in agents:
+            predicted = self.prefetcher.predict_agent(agent, TimeManager.energy_decay(agent))
+            if predicted.is_collapsed():
+                continue
+            plan_item = None
+            if follow_plan:
+                if self.plan_follower.get_plan_decision(agent, tick[1]) is not None:
+                    continue
+                plan_item = self.plan_follower.get_plan_item(agent, tick[1])
+            prompt = builder.build_action_reactor_prompt(predicted, plan_item)
+            future = self.executor.submit(self._call_reactor, agent, prompt)
+            self.prefetcher.add(agent.agent_id, tick, prompt, future)
+            issued += 1
+        
+        return issued
+    
+    def split_prefetched(self, agents: List[Agent], plan_items: Optional[Dict[str, Dict]] = None
+                         ) -> Tuple[Dict[str, concurrent.futures.Future], List[Agent]]:
+        """
+        Separa los agentes cuya petición especulativa sigue siendo válida en este tick.
+        Retorna ({agent_id: futuro con la decisión}, agentes que aún necesitan llamada).
+        Las rutas que no pasan por decide_action() (lotes, planificador de ticks)
+        la usan para no pagar dos veces la misma decisión.
+        """
+        plan_items = plan_items or {}
+        prefetched = {}
+        remaining = []
+        for agent in agents:
+            future = self._take_prefetched(agent, plan_items.get(agent.agent_id))
+            if future is not None:
+                prefetched[agent.agent_id] = future
+            else:
+                remaining.append(agent)
+        return prefetched, remaining
+    
+    def _take_prefetched(self, agent: Agent, current_plan_item: Optional[Dict],
+                         prompt: Optional[str] = None) -> Optional[concurrent.futures.Future]:
+        """Futuro especulativo del agente si sigue siendo válido en este tick"""
+        if not self.prefetcher.has_pending(agent.agent_id):
+            return None
+        day, hour, minute = self.world_config.get_current_time()
+        if prompt is None:
+            prompt = self.prompt_builder.build_action_reactor_prompt(agent, current_plan_item)
+        return self.prefetcher.take(agent.agent_id, (day, hour), prompt)
     
     def generate_conversation(self, agent: Agent, other_agent: Agent) -> Dict:
         """
@@ -83,42 +389,74 @@ class DecisionMaker:
         prompt = self.prompt_builder.build_conversation_prompt(agent, other_agent)
         
         try:
-            response = self.llm_client.call(prompt)
+            response = self.llm_client.call(
+                prompt, call_type=CALL_CONVERSATION, agent_id=agent.agent_id,
+                system_message=self.prompt_builder.get_system_message(CALL_CONVERSATION)
+            )
             conversation = self._parse_json_response(response)
             
             return conversation
         
         except Exception as e:
             print(f"Error al generar conversación entre {agent.name} y {other_agent.name}: {e}")
-            return {
-                "dialogue": f"{agent.name}: Hola, {other_agent.name}!",
-                "topic": "saludo",
-                "relationship_change": 0.0,
-                "reasoning": f"Error: {str(e)}"
-            }
+            return self._error_conversation(agent, other_agent, e)
+    
+    async def agenerate_conversation(self, agent: Agent, other_agent: Agent) -> Dict:
+        """Versión asíncrona de generate_conversation()"""
+        prompt = self.prompt_builder.build_conversation_prompt(agent, other_agent)
+        
+        try:
+            response = await self.llm_client.acall(
+                prompt, call_type=CALL_CONVERSATION, agent_id=agent.agent_id,
+                system_message=self.prompt_builder.get_system_message(CALL_CONVERSATION)
+            )
+            return self._parse_json_response(response)
+        
+        except Exception as e:
+            print(f"Error al generar conversación entre {agent.name} y {other_agent.name}: {e}")
+            return self._error_conversation(agent, other_agent, e)
+    
+    def generate_conversations_parallel(self, pairs: List[Tuple[Agent, Agent]]) -> List[Dict]:
+        """
+        Genera las conversaciones de varias parejas en paralelo con el pool compartido.
+        Retorna una conversación por pareja, en el mismo orden que pairs.
+        """
+        futures = [
+            self.executor.submit(self.generate_conversation, agent, other_agent)
+            for agent, other_agent in pairs
+        ]
+        
+        results = []
+        for (agent, other_agent), future in zip(pairs, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error al generar conversación entre {agent.name} y {other_agent.name}: {e}")
+                results.append(self._error_conversation(agent, other_agent, e))
+        
+        return results
     
     def plan_daily_parallel(self, agents: List[Agent]) -> Dict[str, Dict]:
         """
         Planifica el día para múltiples agentes en paralelo.
         Retorna un diccionario {agent_id: plan}
         """
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_agent = {
-                executor.submit(self.plan_daily_activities, agent): agent
-                for agent in agents
-            }
-            
-            results = {}
-            for future in concurrent.futures.as_completed(future_to_agent):
-                agent = future_to_agent[future]
-                try:
-                    plan = future.result()
-                    results[agent.agent_id] = plan
-                except Exception as e:
-                    print(f"Error al planificar para {agent.name}: {e}")
-                    results[agent.agent_id] = {"plan": [], "reasoning": str(e)}
-            
-            return results
+        future_to_agent = {
+            self.executor.submit(self.plan_daily_activities, agent): agent
+            for agent in agents
+        }
+        
+        results = {}
+        for future in concurrent.futures.as_completed(future_to_agent):
+            agent = future_to_agent[future]
+            try:
+                plan = future.result()
+                results[agent.agent_id] = plan
+            except Exception as e:
+                print(f"Error al planificar para {agent.name}: {e}")
+                results[agent.agent_id] = {"plan": [], "reasoning": str(e)}
+        
+        return results
     
     def decide_actions_parallel(self, agents: List[Agent], 
                                 plan_items: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
@@ -126,27 +464,304 @@ class DecisionMaker:
         Decide acciones para múltiples agentes en paralelo.
         Retorna un diccionario {agent_id: decision}
         """
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_agent = {
-                executor.submit(
-                    self.decide_action,
-                    agent,
-                    plan_items.get(agent.agent_id) if plan_items else None
-                ): agent
-                for agent in agents
-            }
+        future_to_agent = {
+            self.executor.submit(
+                self.decide_action,
+                agent,
+                plan_items.get(agent.agent_id) if plan_items else None
+            ): agent
+            for agent in agents
+        }
+        
+        results = {}
+        for future in concurrent.futures.as_completed(future_to_agent):
+            agent = future_to_agent[future]
+            try:
+                decision = future.result()
+                results[agent.agent_id] = decision
+            except Exception as e:
+                print(f"Error al decidir para {agent.name}: {e}")
+                results[agent.agent_id] = {"action": "rest", "reasoning": str(e)}
+        
+        return results
+    
+    def decide_actions_following_plan(self, agents: List[Agent], batch_size: int = 0) -> Dict[str, Dict]:
+        """
+        Ejecuta el plan diario de cada agente sin llamar al LLM.
+        Solo los agentes con un disparador activo (plan sin cubrir esta hora,
+        descuento nuevo, energía o comestibles bajos, acción anterior fallida
+        o un agente nuevo en su ubicación) pasan por el Action Reactor, que recibe
+        la actividad del plan como contexto.
+        
+        Args:
+            batch_size: Si es > 0, el reactor se ejecuta por lotes de este tamaño.
+        
+        Retorna un diccionario {agent_id: decision}
+        """
+        results, reactor_agents, plan_items = self.split_by_plan(agents)
+        
+        if reactor_agents:
+            if batch_size > 0:
+                results.update(self.decide_actions_batched(reactor_agents, plan_items, batch_size))
+            else:
+                results.update(self.decide_actions_parallel(reactor_agents, plan_items))
+        
+        return results
+    
+    def split_by_plan(self, agents: List[Agent]) -> Tuple[Dict[str, Dict], List[Agent], Dict[str, Dict]]:
+        """
+        Separa los agentes que pueden seguir su plan de los que necesitan el reactor.
+        Retorna (decisiones del plan, agentes para el reactor, actividades del plan
+        de esos agentes).
+        """
+        day, hour, minute = self.world_config.get_current_time()
+        self.plan_follower.observe_world(self.world_config.get_snapshot(self.locations), agents)
+        
+        plan_decisions = {}
+        reactor_agents = []
+        plan_items = {}
+        fired = []
+        for agent in agents:
+            plan_item = self.plan_follower.get_plan_item(agent, hour)
+            triggers = self.plan_follower.get_triggers(agent, hour)
+            if triggers:
+                reactor_agents.append(agent)
+                fired.extend(triggers)
+                if plan_item:
+                    plan_items[agent.agent_id] = plan_item
+            else:
+                plan_decisions[agent.agent_id] = self.plan_follower.get_plan_decision(agent, hour)
+        
+        self.plan_follower.record(len(plan_decisions), len(reactor_agents), fired)
+        return plan_decisions, reactor_agents, plan_items
+    
+    def decide_batch(self, agents: List[Agent],
+                     plan_items: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """
+        Action Reactor por lotes: una sola llamada al LLM decide por varios agentes.
+        Los agentes con una petición especulativa válida usan esa respuesta y
+        no entran en el lote.
+        Retorna {agent_id: decision} solo con las entradas válidas de la respuesta.
+        """
+        prefetched, agents = self.split_prefetched(agents, plan_items)
+        decisions = {}
+        if agents:
+            prompt = self.prompt_builder.build_batched_reactor_prompt(agents, plan_items)
+            # Cada decisión ocupa ~150 tokens; se deja margen para el razonamiento
+            max_tokens = min(8000, max(1000, 200 * len(agents)))
             
-            results = {}
-            for future in concurrent.futures.as_completed(future_to_agent):
-                agent = future_to_agent[future]
-                try:
-                    decision = future.result()
-                    results[agent.agent_id] = decision
-                except Exception as e:
-                    print(f"Error al decidir para {agent.name}: {e}")
-                    results[agent.agent_id] = {"action": "rest", "reasoning": str(e)}
+            response = self.llm_client.call(
+                prompt,
+                max_tokens=max_tokens,
+                call_type=CALL_BATCHED_REACTOR,
+                batch_agent_ids=[agent.agent_id for agent in agents],
+                system_message=self.prompt_builder.get_system_message(CALL_BATCHED_REACTOR)
+            )
+            data = self._parse_json_response(response)
             
-            return results
+            for agent in agents:
+                entry = data.get(agent.agent_id)
+                if self._is_valid_decision(entry):
+                    decisions[agent.agent_id] = entry
+        
+        for agent_id, future in prefetched.items():
+            decision = future.result()
+            if self._is_valid_decision(decision) and not decision.get("error"):
+                decisions[agent_id] = decision
+        return decisions
+    
+    def decide_actions_batched(self, agents: List[Agent],
+                               plan_items: Optional[Dict[str, Dict]] = None,
+                               batch_size: int = 10,
+                               fallback_to_single: bool = True) -> Dict[str, Dict]:
+        """
+        Decide acciones agrupando agentes en lotes de batch_size por llamada.
+        Los agentes sin entrada válida en la respuesta de su lote se deciden
+        individualmente (o descansan si fallback_to_single es False).
+        Retorna un diccionario {agent_id: decision}
+        """
+        batches = [agents[i:i + batch_size] for i in range(0, len(agents), batch_size)]
+        results = {}
+        
+        future_to_batch = {
+            self.executor.submit(self.decide_batch, batch, plan_items): batch
+            for batch in batches
+        }
+        
+        for future in concurrent.futures.as_completed(future_to_batch):
+            try:
+                results.update(future.result())
+            except Exception as e:
+                names = ", ".join(agent.name for agent in future_to_batch[future])
+                print(f"Error al decidir el lote ({names}): {e}")
+        
+        missing = [agent for agent in agents if agent.agent_id not in results]
+        if missing:
+            if fallback_to_single:
+                results.update(self.decide_actions_parallel(missing, plan_items))
+            else:
+                for agent in missing:
+                    results[agent.agent_id] = {
+                        "action": "rest",
+                        "reasoning": "Sin decisión válida en el lote, descansando"
+                    }
+        
+        return results
+    
+    async def aplan_daily_parallel(self, agents: List[Agent],
+                                   max_concurrency: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Versión asíncrona de plan_daily_parallel().
+        Lanza todas las peticiones a la vez limitadas por un semáforo.
+        Retorna un diccionario {agent_id: plan}
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.async_concurrency)
+        
+        async def plan_one(agent: Agent) -> Dict:
+            async with semaphore:
+                return await self.aplan_daily_activities(agent)
+        
+        plans = await asyncio.gather(
+            *(plan_one(agent) for agent in agents), return_exceptions=True
+        )
+        
+        results = {}
+        for agent, plan in zip(agents, plans):
+            if isinstance(plan, Exception):
+                print(f"Error al planificar para {agent.name}: {plan}")
+                plan = {"plan": [], "reasoning": str(plan)}
+            results[agent.agent_id] = plan
+        
+        return results
+    
+    async def adecide_actions_parallel(self, agents: List[Agent],
+                                       plan_items: Optional[Dict[str, Dict]] = None,
+                                       max_concurrency: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Versión asíncrona de decide_actions_parallel().
+        Lanza todas las peticiones a la vez limitadas por un semáforo.
+        Retorna un diccionario {agent_id: decision}
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.async_concurrency)
+        
+        async def decide_one(agent: Agent) -> Dict:
+            async with semaphore:
+                return await self.adecide_action(
+                    agent, plan_items.get(agent.agent_id) if plan_items else None
+                )
+        
+        decisions = await asyncio.gather(
+            *(decide_one(agent) for agent in agents), return_exceptions=True
+        )
+        
+        results = {}
+        for agent, decision in zip(agents, decisions):
+            if isinstance(decision, Exception):
+                print(f"Error al decidir para {agent.name}: {decision}")
+                decision = {"action": "rest", "reasoning": str(decision)}
+            results[agent.agent_id] = decision
+        
+        return results
+    
+    async def agenerate_conversations_parallel(self, pairs: List[Tuple[Agent, Agent]],
+                                               max_concurrency: Optional[int] = None) -> List[Dict]:
+        """
+        Versión asíncrona de generate_conversations_parallel().
+        Retorna una conversación por pareja, en el mismo orden que pairs.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.async_concurrency)
+        
+        async def converse(agent: Agent, other_agent: Agent) -> Dict:
+            async with semaphore:
+                return await self.agenerate_conversation(agent, other_agent)
+        
+        conversations = await asyncio.gather(
+            *(converse(agent, other_agent) for agent, other_agent in pairs), return_exceptions=True
+        )
+        
+        results = []
+        for (agent, other_agent), conversation in zip(pairs, conversations):
+            if isinstance(conversation, Exception):
+                print(f"Error al generar conversación entre {agent.name} y {other_agent.name}: {conversation}")
+                conversation = self._error_conversation(agent, other_agent, conversation)
+            results.append(conversation)
+        
+        return results
+    
+    def _apply_daily_plan(self, agent: Agent, response: str) -> Dict:
+        """Parsea la respuesta del planificador y la asigna al agente"""
+        plan_data = self._parse_json_response(response)
+        
+        if "plan" in plan_data:
+            agent.daily_plan = plan_data["plan"]
+            agent.is_planning_day = True
+            return plan_data
+        else:
+            return {"plan": [], "reasoning": "No se pudo generar un plan válido"}
+    
+    def _validate_decision(self, response: str) -> Dict:
+        """Parsea la respuesta del reactor y valida la estructura de la decisión"""
+        return self._check_decision(self._parse_json_response(response))
+    
+    def _check_decision(self, decision: Dict) -> Dict:
+        """Valida la estructura de una decisión ya parseada (completa o anticipada)"""
+        if "action" not in decision:
+            decision = {"action": "rest", "reasoning": "Decisión inválida, descansando", "error": True}
+        
+        return decision
+    
+    def _is_executable_decision(self, decision: Dict) -> bool:
+        """
+        True si la decisión puede entregarse antes de terminar la respuesta:
+        acción conocida, sin error y con los campos que esa acción necesita
+        como texto no vacío. Si no, se espera a la respuesta completa.
+        """
+        if decision.get("error") or not self._is_valid_decision(decision):
+            return False
+        required = ACTION_REQUIRED_FIELDS.get(str(decision["action"]).lower(), ())
+        return all(isinstance(decision.get(name), str) and decision[name].strip() for name in required)
+    
+    def _decision_key(self, agent: Agent, current_plan_item: Optional[Dict]) -> tuple:
+        """Firma del estado del agente para la caché de decisiones"""
+        active_discounts = self.world_config.get_snapshot(self.locations).active_discounts()
+        return self.decision_cache.make_key(agent, self.world_config, active_discounts, current_plan_item)
+    
+    def _absolute_hour(self) -> int:
+        """Horas simuladas desde el inicio (para el TTL de la caché)"""
+        day, hour, minute = self.world_config.get_current_time()
+        return day * 24 + hour
+    
+    def _is_cacheable_decision(self, decision: Dict) -> bool:
+        """
+        Solo se guardan decisiones válidas que no provienen de un error.
+        Las de chat apuntan a un vecino concreto, así que no se comparten.
+        """
+        return (self._is_valid_decision(decision) and not decision.get("error") and
+                str(decision.get("action", "")).lower() != "chat")
+    
+    def _is_valid_decision(self, decision) -> bool:
+        """Verifica que una decisión sea un diccionario con una acción conocida"""
+        return (isinstance(decision, dict) and
+                str(decision.get("action", "")).lower() in VALID_ACTIONS)
+    
+    def _error_decision(self, error: Exception) -> Dict:
+        """Decisión por defecto cuando falla la llamada al reactor"""
+        return {
+            "action": "rest",
+            "target_location": None,
+            "target_product": None,
+            "reasoning": f"Error: {str(error)}",
+            "error": True
+        }
+    
+    def _error_conversation(self, agent: Agent, other_agent: Agent, error: Exception) -> Dict:
+        """Conversación por defecto cuando falla la llamada al generador"""
+        return {
+            "dialogue": f"{agent.name}: Hola, {other_agent.name}!",
+            "topic": "saludo",
+            "relationship_change": 0.0,
+            "reasoning": f"Error: {str(error)}"
+        }
     
     def _parse_json_response(self, response: str) -> Dict:
         """
@@ -0,0 +1,148 @@
+"""
+Pool de Hilos Persistente
+Ejecutor de larga vida con cola acotada y métricas de utilización
+"""
+
+import concurrent.futures
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class BoundedExecutor:
+    """
+    ThreadPoolExecutor de larga vida con profundidad de cola acotada.
+    
+    Como máximo `max_workers` tareas se ejecutan a la vez y `max_queue_depth`
+    esperan en cola; submit() bloquea al llamador cuando ambas se llenan, de
+    modo que un tick con muchos agentes no acumula trabajo sin límite.
+    """
+    
+    def __init__(self, max_workers: int = 32, max_queue_depth: int = 256,
+                 name: str = "pool"):
+        """
+        Args:
+            max_workers: Hilos del pool (peticiones simultáneas al LLM).
+            max_queue_depth: Tareas pendientes admitidas además de las activas.
+            name: Prefijo de los hilos y nombre en las métricas.
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.name = name
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue_depth)
+        self._lock = threading.Lock()
+        self._closed = False
+        
+        # Métricas
+        self._created_at = time.monotonic()
+        self._busy_time = 0.0
+        self._active = 0
+        self._pending = 0
+        self.peak_active = 0
+        self.peak_pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+    
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        """Crea el pool en la primera tarea"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"El pool '{self.name}' está cerrado")
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+            return self._executor
+    
+    def submit(self, fn: Callable, *args, **kwargs) -> concurrent.futures.Future:
+        """Encola fn(*args, **kwargs); bloquea si la cola está llena"""
+        return self.submit_within(None, fn, *args, **kwargs)
+    
+    def submit_within(self, timeout: Optional[float], fn: Callable, *args,
+                      **kwargs) -> Optional[concurrent.futures.Future]:
+        """
+        Como submit(), pero espera como mucho `timeout` segundos a que haya
+        hueco en la cola (None = sin límite). Retorna None si no lo hubo.
+        """
+        executor = self._get_executor()
+        if timeout is None:
+            self._slots.acquire()
+        elif not self._slots.acquire(timeout=max(0.0, timeout)):
+            return None
+        with self._lock:
+            self.submitted += 1
+            self._pending += 1
+            self.peak_pending = max(self.peak_pending, self._pending)
+        
+        try:
+            future = executor.submit(self._run, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+    
+    def _on_done(self, future: concurrent.futures.Future):
+        """Libera el hueco de la tarea (también si se canceló antes de empezar)"""
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+        self._slots.release()
+    
+    def _run(self, fn: Callable, args: tuple, kwargs: Dict) -> Any:
+        """Ejecuta la tarea midiendo el tiempo ocupado del hilo"""
+        with self._lock:
+            self._pending -= 1
+            self._active += 1
+            self.peak_active = max(self.peak_active, self._active)
+        started = time.monotonic()
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._busy_time += time.monotonic() - started
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+    
+    def shutdown(self, wait: bool = True):
+        """Cierra el pool; las tareas ya encoladas terminan si wait es True"""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+    
+    @property
+    def closed(self) -> bool:
+        """True si el pool ya no acepta tareas"""
+        return self._closed
+    
+    def get_stats(self) -> Dict:
+        """Retorna ocupación actual y utilización acumulada del pool"""
+        with self._lock:
+            elapsed = time.monotonic() - self._created_at
+            capacity = elapsed * self.max_workers
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "active": self._active,
+                "queued": self._pending,
+                "peak_active": self.peak_active,
+                "peak_queued": self.peak_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "busy_seconds": round(self._busy_time, 3),
+                "utilization": self._busy_time / capacity if capacity > 0 else 0.0
+            }
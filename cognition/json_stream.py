@@ -0,0 +1,175 @@
+"""
+Extractor Incremental de JSON
+Extrae los campos de un objeto JSON a medida que llegan los fragmentos del streaming
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class IncrementalJSONParser:
+    """
+    Parser incremental de un objeto JSON de primer nivel.
+    
+    Recibe el texto por fragmentos con feed() y deja disponible cada campo
+    de primer nivel en cuanto su valor está completo, sin esperar al resto
+    del objeto. Los valores anidados (objetos y listas) se entregan enteros
+    al cerrarse. Ignora el texto previo a la primera llave (p. ej. ```json).
+    """
+    
+    # Estados del autómata
+    _START = "start"
+    _KEY_OR_END = "key_or_end"
+    _IN_KEY = "in_key"
+    _COLON = "colon"
+    _VALUE_START = "value_start"
+    _IN_STRING = "in_string"
+    _IN_SCALAR = "in_scalar"
+    _IN_NESTED = "in_nested"
+    _AFTER_VALUE = "after_value"
+    _DONE = "done"
+    
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}  # Campos completos, en orden de llegada
+        self.keys_seen: List[str] = []  # Claves empezadas, en orden de aparición
+        self.text = ""  # Texto recibido hasta ahora
+        self._state = self._START
+        self._raw: List[str] = []
+        self._key: Optional[str] = None
+        self._escape = False
+        self._depth = 0
+        self._nested_in_string = False
+    
+    @property
+    def done(self) -> bool:
+        """True si ya se cerró el objeto de primer nivel"""
+        return self._state == self._DONE
+    
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """
+        Procesa un fragmento de texto.
+        Retorna los campos que se han completado con este fragmento.
+        """
+        self.text += chunk
+        completed: Dict[str, Any] = {}
+        for char in chunk:
+            if self._state == self._DONE:
+                break
+            self._step(char, completed)
+        return completed
+    
+    def _step(self, char: str, completed: Dict[str, Any]):
+        """Avanza el autómata un carácter"""
+        state = self._state
+        
+        if state == self._START:
+            if char == "{":
+                self._state = self._KEY_OR_END
+        
+        elif state == self._KEY_OR_END:
+            if char == '"':
+                self._raw = []
+                self._escape = False
+                self._state = self._IN_KEY
+            elif char == "}":
+                self._state = self._DONE
+        
+        elif state == self._IN_KEY:
+            if self._escape:
+                self._escape = False
+                self._raw.append(char)
+            elif char == "\\":
+                self._escape = True
+                self._raw.append(char)
+            elif char == '"':
+                self._key = self._decode('"' + "".join(self._raw) + '"')
+                if self._key is not None:
+                    self.keys_seen.append(self._key)
+                self._state = self._COLON
+            else:
+                self._raw.append(char)
+        
+        elif state == self._COLON:
+            if char == ":":
+                self._state = self._VALUE_START
+        
+        elif state == self._VALUE_START:
+            if char.isspace():
+                return
+            self._raw = [char]
+            self._escape = False
+            if char == '"':
+                self._state = self._IN_STRING
+            elif char in "{[":
+                self._depth = 1
+                self._nested_in_string = False
+                self._state = self._IN_NESTED
+            else:
+                self._state = self._IN_SCALAR
+        
+        elif state == self._IN_STRING:
+            self._raw.append(char)
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._finish_value(completed)
+                self._state = self._AFTER_VALUE
+        
+        elif state == self._IN_SCALAR:
+            if char in ",}" or char.isspace():
+                self._finish_value(completed)
+                if char == ",":
+                    self._state = self._KEY_OR_END
+                elif char == "}":
+                    self._state = self._DONE
+                else:
+                    self._state = self._AFTER_VALUE
+            else:
+                self._raw.append(char)
+        
+        elif state == self._IN_NESTED:
+            self._raw.append(char)
+            if self._nested_in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._nested_in_string = False
+            elif char == '"':
+                self._nested_in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_value(completed)
+                    self._state = self._AFTER_VALUE
+        
+        elif state == self._AFTER_VALUE:
+            if char == ",":
+                self._state = self._KEY_OR_END
+            elif char == "}":
+                self._state = self._DONE
+    
+    def _finish_value(self, completed: Dict[str, Any]):
+        """Decodifica el valor acumulado y lo registra bajo la clave actual"""
+        if self._key is None:
+            return
+        raw = "".join(self._raw)
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        self.fields[self._key] = value
+        completed[self._key] = value
+    
+    @staticmethod
+    def _decode(raw: str) -> Optional[str]:
+        """Decodifica una cadena JSON (con comillas) o retorna None si es inválida"""
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
@@ -0,0 +1,123 @@
+"""
+Caché de Respuestas del LLM
+Almacena respuestas por contenido del prompt en memoria (LRU) y en disco (SQLite)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class LLMResponseCache:
+    """
+    Caché direccionada por contenido para las respuestas del LLM.
+    Nivel 1: LRU acotada en memoria. Nivel 2 (opcional): SQLite persistente
+    que sobrevive entre ejecuciones de la simulación.
+    """
+    
+    def __init__(self, max_entries: int = 10000, db_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: Máximo de respuestas en la LRU de memoria.
+            db_path: Ruta del fichero SQLite. Si es None, solo se usa memoria.
+        """
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        
+        # Contadores
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+    
+    @staticmethod
+    def make_key(model: str, system_message: str, prompt: str,
+                 temperature: float, max_tokens: int) -> str:
+        """Genera la clave hash de una llamada a partir de su contenido"""
+        raw = json.dumps(
+            [model, system_message, prompt, temperature, max_tokens],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Retorna la respuesta almacenada o None si no está en caché"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+            
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+                    self._store_in_memory(key, row[0])
+                    return row[0]
+            
+            self.misses += 1
+            return None
+    
+    def put(self, key: str, response: str):
+        """Guarda una respuesta en memoria y, si existe, en disco"""
+        with self._lock:
+            self._store_in_memory(key, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, time.time())
+                )
+                self._db.commit()
+    
+    def _store_in_memory(self, key: str, response: str):
+        """Inserta en la LRU expulsando la entrada menos usada si está llena"""
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def get_stats(self) -> Dict:
+        """Retorna los contadores de aciertos y fallos de la caché"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._memory)
+            }
+    
+    def clear(self):
+        """Vacía ambos niveles de la caché"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+    
+    def close(self):
+        """Cierra la conexión con la base de datos"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
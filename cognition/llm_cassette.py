@@ -0,0 +1,129 @@
+"""
+Cassette de Grabación/Reproducción del LLM
+Graba los pares prompt/respuesta de una ejecución para reproducirla sin red
+"""
+
+import gzip
+import json
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+class CassetteMissError(LookupError):
+    """Se lanza en modo replay cuando un prompt no está en la cassette"""
+    pass
+
+
+class LLMCassette:
+    """
+    Fichero compacto (JSONL comprimido con gzip) con las llamadas al LLM.
+    
+    Modos:
+    - "record": cada llamada se añade al fichero al completarse.
+    - "replay": las respuestas se sirven desde el fichero sin tocar la red.
+    
+    Un mismo prompt puede aparecer varias veces con respuestas distintas
+    (temperatura > 0); en replay se devuelven en el orden en que se grabaron
+    y, agotadas, se repite la última.
+    """
+    
+    RECORD = "record"
+    REPLAY = "replay"
+    
+    # Comportamiento en replay cuando falta un prompt
+    MISS_ERROR = "error"      # Lanza CassetteMissError
+    MISS_DEFAULT = "default"  # Retorna la respuesta por defecto del cliente
+    MISS_NETWORK = "network"  # Realiza la llamada real a la API
+    
+    def __init__(self, path: str, mode: str = "replay", on_miss: str = "error"):
+        """
+        Args:
+            path: Ruta del fichero de la cassette (p.ej. "run.cassette.jsonl.gz").
+            mode: "record" o "replay".
+            on_miss: "error", "default" o "network" (solo aplica en replay).
+        """
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Modo de cassette inválido: {mode}")
+        if on_miss not in (self.MISS_ERROR, self.MISS_DEFAULT, self.MISS_NETWORK):
+            raise ValueError(f"Política on_miss inválida: {on_miss}")
+        
+        self.path = path
+        self.mode = mode
+        self.on_miss = on_miss
+        self._lock = threading.Lock()
+        self._responses: Dict[str, List[str]] = defaultdict(list)
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._file = None
+        
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+        
+        if mode == self.RECORD:
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+        else:
+            self._load()
+    
+    @property
+    def is_recording(self) -> bool:
+        """True si la cassette está grabando llamadas"""
+        return self.mode == self.RECORD
+    
+    @property
+    def is_replaying(self) -> bool:
+        """True si la cassette sirve respuestas grabadas"""
+        return self.mode == self.REPLAY
+    
+    def _load(self):
+        """Carga en memoria todas las respuestas grabadas"""
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._responses[entry["k"]].append(entry["r"])
+    
+    def record(self, key: str, prompt: str, response: str):
+        """Añade un par prompt/respuesta a la cassette"""
+        if self._file is None:
+            return
+        line = json.dumps({"k": key, "p": prompt, "r": response}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self.recorded += 1
+    
+    def replay(self, key: str) -> Optional[str]:
+        """Retorna la siguiente respuesta grabada para la clave, o None si no existe"""
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                self.missed += 1
+                return None
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            self.replayed += 1
+            return responses[min(position, len(responses) - 1)]
+    
+    def get_stats(self) -> Dict:
+        """Retorna los contadores de la cassette"""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "missed": self.missed,
+                "unique_prompts": len(self._responses)
+            }
+    
+    def close(self):
+        """Cierra el fichero de grabación"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -4,21 +4,117 @@ Gestiona las comunicaciones con la API de DeepSeek
 """
 
 import os
+import asyncio
+import contextlib
+import contextvars
 import requests
+import aiohttp
 import json
-from typing import Optional
+import threading
+import time
+import concurrent.futures
+from typing import Callable, Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from cognition.llm_cache import LLMResponseCache
+from cognition.llm_cassette import LLMCassette, CassetteMissError
+from cognition.rate_limiter import AdaptiveRateLimiter, get_shared_limiter
+from cognition.retry_policy import RetryPolicy, RetryBudget, LatencyTracker
+from cognition.usage_tracker import UsageTracker, CALL_OTHER
+from cognition.single_flight import SingleFlight
+from cognition.model_routes import ModelRoute
+from cognition.json_stream import IncrementalJSONParser
+
+
+SYSTEM_MESSAGE = "Eres un asistente útil que siempre responde con JSON válido cuando se solicita."
+
+# Ruta usada por los tipos de llamada sin ruta propia
+ROUTE_DEFAULT = "default"
+DEFAULT_MAX_TOKENS = 1000
+
+
+class LLMRequestError(Exception):
+    """Fallo de un intento de petición a la API"""
+    
+    def __init__(self, error: Exception, retryable: bool, retry_after: Optional[float] = None):
+        super().__init__(str(error))
+        self.error = error
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.retries = 0
+    
+    @property
+    def cancelled(self) -> bool:
+        """True si la llamada se abandonó antes de enviarse (ver cancellation_scope)"""
+        return isinstance(self.error, CallCancelledError)
+
+
+class CallCancelledError(Exception):
+    """La llamada se abandonó sin enviarse porque su ámbito de cancelación se activó"""
+    pass
+
+
+# Evento de cancelación de las llamadas síncronas del hilo actual
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "llm_cancel_event", default=None
+)
+
+
+@contextlib.contextmanager
+def cancellation_scope(event: threading.Event):
+    """
+    Las llamadas síncronas hechas dentro del bloque se abandonan sin enviarse
+    si `event` se activa mientras esperan hueco en el limitador o entre
+    reintentos. Las que ya están en la red terminan con normalidad.
+    """
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+def _is_cancelled() -> bool:
+    """True si el ámbito de cancelación del hilo actual está activado"""
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
 
 
 class LLMClient:
     """Cliente para comunicarse con la API de DeepSeek"""
     
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 pool_connections: int = 4, pool_maxsize: int = 32,
+                 pool_block: bool = True, keep_alive: bool = True,
+                 timeout: float = 30.0, async_max_connections: int = 256,
+                 cache: Optional[LLMResponseCache] = None,
+                 cassette: Optional[LLMCassette] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 use_shared_limiter: bool = True,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 usage_tracker: Optional[UsageTracker] = None,
+                 coalesce: bool = True,
+                 routes: Optional[Dict[str, ModelRoute]] = None):
         """
         Inicializa el cliente LLM.
         
         Args:
             api_key: API key de DeepSeek. Si no se proporciona, se lee de DEEPSEEK_API_KEY env var.
             base_url: URL base de la API. Por defecto usa la API de DeepSeek.
+            pool_connections: Número de hosts distintos con pool de conexiones propio.
+            pool_maxsize: Máximo de conexiones abiertas por host.
+            pool_block: Si es True, las llamadas esperan una conexión libre en lugar
+                de abrir conexiones extra por encima de pool_maxsize.
+            keep_alive: Reutiliza conexiones TCP/TLS entre llamadas.
+            timeout: Timeout en segundos de cada petición.
+            async_max_connections: Máximo de conexiones simultáneas de la sesión asíncrona.
+            cache: Caché de respuestas opcional. Las respuestas de error no se almacenan.
+            cassette: Cassette opcional para grabar o reproducir todas las llamadas.
+            rate_limiter: Limitador propio. Si es None se usa el compartido por el proceso.
+            use_shared_limiter: Si es False y no se pasa rate_limiter, no se limita la tasa.
+            retry_policy: Reintentos con backoff y hedging. Por defecto RetryPolicy().
+            usage_tracker: Contabilidad de tokens, latencia y coste. Por defecto uno nuevo.
+            coalesce: Si es True, las llamadas idénticas simultáneas comparten una sola petición.
+            routes: Perfil de modelo/endpoint por tipo de llamada (clave "default" para el resto).
         """
         self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
         self.base_url = base_url or "https://api.deepseek.com/v1/chat/completions"
@@ -34,25 +130,700 @@ class LLMClient:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
+        if not keep_alive:
+            self.headers["Connection"] = "close"
+        
+        self.timeout = timeout
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.cache = cache
+        self.cassette = cassette
+        self._rate_limiter = rate_limiter
+        self.use_shared_limiter = use_shared_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = RetryBudget(self.retry_policy.retry_budget_per_tick,
+                                        self.retry_policy.retry_budget_window)
+        self.latency_tracker = LatencyTracker()
+        self.usage_tracker = usage_tracker or UsageTracker()
+        self.single_flight = SingleFlight() if coalesce else None
+        self.routes: Dict[str, ModelRoute] = dict(routes or {})
+        self._hedge_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._stats_lock = threading.Lock()
+        self.retry_stats = {"retries": 0, "hedged": 0, "hedge_wins": 0, "failures": 0}
+        self.async_max_connections = async_max_connections
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self._async_session: Optional[aiohttp.ClientSession] = None
+        self._async_session_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    @property
+    def rate_limiter(self) -> Optional[AdaptiveRateLimiter]:
+        """Limitador de tasa aplicado a las peticiones de red de este cliente"""
+        if self._rate_limiter is not None:
+            return self._rate_limiter
+        return get_shared_limiter() if self.use_shared_limiter else None
     
-    def call(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+    @property
+    def session(self) -> requests.Session:
+        """
+        Sesión HTTP compartida por todos los hilos del cliente.
+        Se crea bajo demanda y mantiene un pool de conexiones keep-alive por host.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize,
+                        pool_block=self.pool_block
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers.update(self.headers)
+                    self._session = session
+        return self._session
+    
+    async def _get_async_session(self) -> aiohttp.ClientSession:
+        """
+        Sesión aiohttp del event loop actual.
+        Una sesión aiohttp solo es válida en el loop donde se creó, así que se
+        recrea si el cliente se usa desde otro loop (p.ej. varios asyncio.run).
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session.closed or self._async_session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.async_max_connections,
+                limit_per_host=self.async_max_connections,
+                force_close=not self.keep_alive
+            )
+            self._async_session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._async_session_loop = loop
+        return self._async_session
+    
+    def close(self):
+        """
+        Cierra la sesión HTTP, libera las conexiones del pool y cierra la
+        cassette para que una grabación quede completa sin esperar al recolector.
+        """
+        with self._session_lock:
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        if self.cassette is not None:
+            self.cassette.close()
+    
+    async def aclose(self):
+        """Cierra la sesión asíncrona y la síncrona"""
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+        self._async_session_loop = None
+        self.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def call(self, prompt: str, temperature: float = 0.7, max_tokens: Optional[int] = None,
+             call_type: str = CALL_OTHER, agent_id: Optional[str] = None,
+             system_message: Optional[str] = None,
+             batch_agent_ids: Optional[List[str]] = None) -> str:
         """
         Realiza una llamada a la API de DeepSeek.
         
         Args:
             prompt: El prompt a enviar al LLM
             temperature: Temperatura para la generación (0.0-1.0)
-            max_tokens: Número máximo de tokens a generar
+            max_tokens: Número máximo de tokens a generar. Por defecto el de la ruta
+                del tipo de llamada o DEFAULT_MAX_TOKENS.
+            call_type: Tipo de llamada para la contabilidad (daily_planner, action_reactor...)
+            agent_id: Agente que origina la llamada, si aplica
+            system_message: Mensaje de sistema; por defecto SYSTEM_MESSAGE
+            batch_agent_ids: Agentes de una llamada por lotes, en lugar de agent_id
         
         Returns:
             La respuesta del LLM como string
         """
-        payload = {
-            "model": self.model,
+        started = time.perf_counter()
+        route = self.get_route(call_type)
+        payload = self._build_payload(prompt, temperature, max_tokens, route, system_message)
+        key = self._content_key(payload)
+        stored = self._lookup(key, prompt)
+        if stored is not None:
+            self._track(call_type, agent_id, payload, None, started, 0, self._stored_outcome(),
+                        batch_agent_ids)
+            return stored
+        
+        shared = False
+        try:
+            if self.single_flight is not None:
+                try:
+                    (content, usage, retries), shared = self.single_flight.do(
+                        key, lambda: self._request_with_retries(payload, route)
+                    )
+                except LLMRequestError as e:
+                    # Se canceló la petición de otro hilo, no la de este: se hace la propia
+                    if not e.cancelled or _is_cancelled():
+                        raise
+                    content, usage, retries = self._request_with_retries(payload, route)
+            else:
+                content, usage, retries = self._request_with_retries(payload, route)
+        
+        except LLMRequestError as e:
+            self._track(call_type, agent_id, payload, None, started, e.retries, self._failure_outcome(e),
+                        batch_agent_ids)
+            content = self._error_response(e)
+            self._remember(key, prompt, content, cacheable=False)
+            return content
+        
+        if shared:
+            # Los tokens ya los contabiliza la llamada que hizo la petición
+            self._track(call_type, agent_id, payload, None, started, 0, "coalesced",
+                        batch_agent_ids)
+        else:
+            self._track(call_type, agent_id, payload, usage, started, retries, "ok",
+                        batch_agent_ids)
+        self._remember(key, prompt, content)
+        return content
+    
+    async def acall(self, prompt: str, temperature: float = 0.7, max_tokens: Optional[int] = None,
+                    call_type: str = CALL_OTHER, agent_id: Optional[str] = None,
+                    system_message: Optional[str] = None) -> str:
+        """
+        Versión asíncrona de call().
+        Permite mantener cientos de peticiones en vuelo desde un único hilo.
+        """
+        started = time.perf_counter()
+        route = self.get_route(call_type)
+        payload = self._build_payload(prompt, temperature, max_tokens, route, system_message)
+        key = self._content_key(payload)
+        stored = self._lookup(key, prompt)
+        if stored is not None:
+            self._track(call_type, agent_id, payload, None, started, 0, self._stored_outcome())
+            return stored
+        
+        shared = False
+        try:
+            if self.single_flight is not None:
+                (content, usage, retries), shared = await self.single_flight.ado(
+                    key, lambda: self._arequest_with_retries(payload, route)
+                )
+            else:
+                content, usage, retries = await self._arequest_with_retries(payload, route)
+        
+        except LLMRequestError as e:
+            self._track(call_type, agent_id, payload, None, started, e.retries, self._failure_outcome(e))
+            content = self._error_response(e)
+            self._remember(key, prompt, content, cacheable=False)
+            return content
+        
+        if shared:
+            self._track(call_type, agent_id, payload, None, started, 0, "coalesced")
+        else:
+            self._track(call_type, agent_id, payload, usage, started, retries, "ok")
+        self._remember(key, prompt, content)
+        return content
+    
+    def call_stream(self, prompt: str, on_progress: Optional[Callable[[IncrementalJSONParser], None]] = None,
+                    temperature: float = 0.7, max_tokens: Optional[int] = None,
+                    call_type: str = CALL_OTHER, agent_id: Optional[str] = None,
+                    system_message: Optional[str] = None) -> str:
+        """
+        Como call(), pero pide la respuesta en streaming y la va pasando por un
+        IncrementalJSONParser. on_progress recibe el parser tras cada fragmento,
+        así que el llamador puede usar los campos ya completos antes de que
+        termine la respuesta. Retorna la respuesta completa.
+        
+        Las respuestas de la caché o la cassette se entregan de una vez. Las
+        llamadas en streaming no se fusionan con otras idénticas, y solo se
+        reintentan si el fallo llega antes del primer fragmento.
+        """
+        started = time.perf_counter()
+        route = self.get_route(call_type)
+        payload = self._build_payload(prompt, temperature, max_tokens, route, system_message)
+        key = self._content_key(payload)
+        parser = IncrementalJSONParser()
+        
+        def on_delta(text: str):
+            parser.feed(text)
+            if on_progress is not None:
+                on_progress(parser)
+        
+        stored = self._lookup(key, prompt)
+        if stored is not None:
+            self._track(call_type, agent_id, payload, None, started, 0, self._stored_outcome())
+            on_delta(stored)
+            return stored
+        
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        try:
+            content, usage, retries = self._stream_with_retries(payload, route, on_delta)
+        
+        except LLMRequestError as e:
+            self._track(call_type, agent_id, payload, None, started, e.retries, self._failure_outcome(e))
+            content = self._error_response(e)
+            self._remember(key, prompt, content, cacheable=False)
+            if not parser.text:
+                on_delta(content)
+            return content
+        
+        self._track(call_type, agent_id, payload, usage, started, retries, "ok")
+        self._remember(key, prompt, content)
+        return content
+    
+    def begin_tick(self, day: Optional[int] = None, hour: Optional[int] = None):
+        """
+        Comienza un tick: restablece el presupuesto de reintentos y,
+        si se indica (día, hora), asigna a ese tick la contabilidad siguiente.
+        """
+        self.retry_budget.reset()
+        if day is not None and hour is not None:
+            self.usage_tracker.set_tick(day, hour)
+    
+    def _track(self, call_type: str, agent_id: Optional[str], payload: Dict, usage: Optional[Dict],
+               started: float, retries: int, outcome: str, batch_agent_ids: Optional[List[str]] = None):
+        """Registra la llamada en la contabilidad de uso"""
+        self.usage_tracker.record(
+            call_type=call_type,
+            agent_id=agent_id,
+            model=payload["model"],
+            usage=usage,
+            latency=time.perf_counter() - started,
+            retries=retries,
+            outcome=outcome,
+            batch_agent_ids=batch_agent_ids
+        )
+    
+    @staticmethod
+    def _failure_outcome(error: LLMRequestError) -> str:
+        """Resultado contable de una llamada fallida: "cancelled" si no llegó a enviarse"""
+        return "cancelled" if error.cancelled else "error"
+    
+    def _stored_outcome(self) -> str:
+        """Resultado contable de una respuesta servida sin red"""
+        if self.cassette is not None and self.cassette.is_replaying:
+            return "replay"
+        return "cache_hit"
+    
+    def get_retry_stats(self) -> Dict:
+        """Retorna contadores de reintentos, hedging y latencias observadas"""
+        with self._stats_lock:
+            stats = dict(self.retry_stats)
+        stats["budget_remaining"] = self.retry_budget.remaining
+        stats["budget_exhausted"] = self.retry_budget.exhausted_count
+        stats["latency"] = self.latency_tracker.get_stats()
+        return stats
+    
+    def get_coalescing_stats(self) -> Dict:
+        """Retorna cuántas llamadas se resolvieron compartiendo una petición en vuelo"""
+        if self.single_flight is None:
+            return {"leaders": 0, "coalesced": 0, "coalesced_ratio": 0.0, "in_flight": 0}
+        return self.single_flight.get_stats()
+    
+    def _count(self, key: str):
+        """Incrementa un contador de reintentos/hedging"""
+        with self._stats_lock:
+            self.retry_stats[key] += 1
+    
+    def _request_with_retries(self, payload: Dict,
+                              route: Optional[ModelRoute] = None) -> Tuple[str, Optional[Dict], int]:
+        """
+        Realiza la petición reintentando con backoff exponencial y jitter.
+        Retorna (contenido, usage de la API, número de reintentos).
+        """
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            try:
+                if policy.hedging:
+                    content, usage = self._hedged_attempt(payload, route)
+                else:
+                    content, usage = self._attempt(payload, route)
+                return content, usage, attempt
+            except LLMRequestError as e:
+                attempt += 1
+                if (not e.retryable or attempt >= policy.max_attempts
+                        or not self.retry_budget.try_spend()):
+                    self._count("failures")
+                    e.retries = attempt - 1
+                    raise
+                self._count("retries")
+                time.sleep(policy.backoff(attempt, e.retry_after))
+                if _is_cancelled():
+                    e = LLMRequestError(CallCancelledError("Cancelada antes de reintentar"), retryable=False)
+                    e.retries = attempt
+                    raise e
+    
+    async def _arequest_with_retries(self, payload: Dict,
+                                     route: Optional[ModelRoute] = None) -> Tuple[str, Optional[Dict], int]:
+        """Versión asíncrona de _request_with_retries()"""
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            try:
+                if policy.hedging:
+                    content, usage = await self._ahedged_attempt(payload, route)
+                else:
+                    content, usage = await self._aattempt(payload, route)
+                return content, usage, attempt
+            except LLMRequestError as e:
+                attempt += 1
+                if (not e.retryable or attempt >= policy.max_attempts
+                        or not self.retry_budget.try_spend()):
+                    self._count("failures")
+                    e.retries = attempt - 1
+                    raise
+                self._count("retries")
+                await asyncio.sleep(policy.backoff(attempt, e.retry_after))
+    
+    def _stream_with_retries(self, payload: Dict, route: Optional[ModelRoute],
+                             on_delta: Callable[[str], None]) -> Tuple[str, Optional[Dict], int]:
+        """
+        Versión en streaming de _request_with_retries(), sin hedging.
+        Un fallo a mitad de respuesta no se reintenta: el llamador ya recibió parte del texto.
+        """
+        policy = self.retry_policy
+        attempt = 0
+        received = []
+        
+        def track_delta(text: str):
+            received.append(True)
+            on_delta(text)
+        
+        while True:
+            try:
+                content, usage = self._stream_attempt(payload, route, track_delta)
+                return content, usage, attempt
+            except LLMRequestError as e:
+                attempt += 1
+                if (received or not e.retryable or attempt >= policy.max_attempts
+                        or not self.retry_budget.try_spend()):
+                    self._count("failures")
+                    e.retries = attempt - 1
+                    raise
+                self._count("retries")
+                time.sleep(policy.backoff(attempt, e.retry_after))
+                if _is_cancelled():
+                    e = LLMRequestError(CallCancelledError("Cancelada antes de reintentar"), retryable=False)
+                    e.retries = attempt
+                    raise e
+    
+    def _hedge_threshold(self) -> Optional[float]:
+        """Latencia a partir de la cual se lanza una petición duplicada"""
+        policy = self.retry_policy
+        return self.latency_tracker.percentile(policy.hedge_percentile, policy.hedge_min_samples)
+    
+    def _hedged_attempt(self, payload: Dict, route: Optional[ModelRoute] = None) -> Tuple[str, Optional[Dict]]:
+        """
+        Lanza la petición y, si supera el percentil de latencia configurado,
+        envía un duplicado y se queda con la primera respuesta correcta.
+        """
+        threshold = self._hedge_threshold()
+        if threshold is None:
+            return self._attempt(payload, route)
+        
+        with self._session_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.pool_maxsize, thread_name_prefix="llm-hedge"
+                )
+            executor = self._hedge_executor
+        
+        # Los intentos corren en otros hilos con el ámbito de cancelación del llamador
+        primary = executor.submit(contextvars.copy_context().run, self._attempt, payload, route)
+        done, _ = concurrent.futures.wait([primary], timeout=threshold)
+        if done or not self.retry_budget.try_spend():
+            return primary.result()
+        
+        self._count("hedged")
+        hedge = executor.submit(contextvars.copy_context().run, self._attempt, payload, route)
+        pending = {primary, hedge}
+        last_error = None
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                try:
+                    result = future.result()
+                except LLMRequestError as e:
+                    last_error = e
+                    continue
+                if future is hedge:
+                    self._count("hedge_wins")
+                return result
+        raise last_error
+    
+    async def _ahedged_attempt(self, payload: Dict,
+                               route: Optional[ModelRoute] = None) -> Tuple[str, Optional[Dict]]:
+        """Versión asíncrona de _hedged_attempt(); cancela la petición perdedora"""
+        threshold = self._hedge_threshold()
+        if threshold is None:
+            return await self._aattempt(payload, route)
+        
+        primary = asyncio.ensure_future(self._aattempt(payload, route))
+        done, _ = await asyncio.wait({primary}, timeout=threshold)
+        if done or not self.retry_budget.try_spend():
+            return await primary
+        
+        self._count("hedged")
+        hedge = asyncio.ensure_future(self._aattempt(payload, route))
+        pending = {primary, hedge}
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        result = task.result()
+                    except LLMRequestError as e:
+                        last_error = e
+                        continue
+                    if task is hedge:
+                        self._count("hedge_wins")
+                    return result
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _attempt(self, payload: Dict, route: Optional[ModelRoute] = None) -> Tuple[str, Optional[Dict]]:
+        """
+        Un único intento de petición HTTP, regulado por el limitador de tasa
+        y por el límite de concurrencia de la ruta.
+        Retorna (contenido, usage de la API).
+        """
+        url, timeout, headers = self._endpoint(route)
+        if route is not None:
+            route.acquire()
+        limiter = self.rate_limiter
+        if limiter is not None:
+            limiter.acquire()
+        outcome, retry_after = AdaptiveRateLimiter.ERROR, None
+        started = time.perf_counter()
+        
+        try:
+            # La espera en el limitador puede durar más que el plazo del llamador
+            if _is_cancelled():
+                outcome = AdaptiveRateLimiter.CANCELLED
+                raise LLMRequestError(CallCancelledError("Cancelada antes de enviarse"), retryable=False)
+            response = self.session.post(
+                url,
+                json=payload,
+                headers=headers,
+                timeout=timeout
+            )
+            
+            outcome, retry_after = self._classify_status(response.status_code, response.headers)
+            response.raise_for_status()
+            result = response.json()
+            content = self._extract_content(result)
+        
+        except requests.exceptions.RequestException as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                outcome = AdaptiveRateLimiter.THROTTLED
+            raise LLMRequestError(e, self._is_retryable(outcome, e), retry_after)
+        
+        finally:
+            if limiter is not None:
+                limiter.release(outcome, retry_after)
+            if route is not None:
+                route.release()
+        
+        self.latency_tracker.record(time.perf_counter() - started)
+        return content, result.get("usage")
+    
+    async def _aattempt(self, payload: Dict, route: Optional[ModelRoute] = None) -> Tuple[str, Optional[Dict]]:
+        """Versión asíncrona de _attempt()"""
+        session = await self._get_async_session()
+        url, timeout, headers = self._endpoint(route)
+        if route is not None:
+            await route.acquire_async()
+        limiter = self.rate_limiter
+        if limiter is not None:
+            await limiter.acquire_async()
+        outcome, retry_after = AdaptiveRateLimiter.ERROR, None
+        started = time.perf_counter()
+        
+        try:
+            async with session.post(url, json=payload, headers=headers,
+                                    timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                outcome, retry_after = self._classify_status(response.status, response.headers)
+                response.raise_for_status()
+                result = await response.json()
+            content = self._extract_content(result)
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if isinstance(e, asyncio.TimeoutError):
+                outcome = AdaptiveRateLimiter.THROTTLED
+            raise LLMRequestError(e, self._is_retryable(outcome, e), retry_after)
+        
+        finally:
+            if limiter is not None:
+                limiter.release(outcome, retry_after)
+            if route is not None:
+                route.release()
+        
+        self.latency_tracker.record(time.perf_counter() - started)
+        return content, result.get("usage")
+    
+    def _stream_attempt(self, payload: Dict, route: Optional[ModelRoute],
+                        on_delta: Callable[[str], None]) -> Tuple[str, Optional[Dict]]:
+        """
+        Un intento de petición en streaming (server-sent events).
+        Llama a on_delta con cada fragmento de contenido y retorna (contenido, usage).
+        Si el servidor ignora "stream" y responde con un JSON normal, lo entrega entero.
+        """
+        url, timeout, headers = self._endpoint(route)
+        if route is not None:
+            route.acquire()
+        limiter = self.rate_limiter
+        if limiter is not None:
+            limiter.acquire()
+        outcome, retry_after = AdaptiveRateLimiter.ERROR, None
+        started = time.perf_counter()
+        parts = []
+        usage = None
+        
+        try:
+            if _is_cancelled():
+                outcome = AdaptiveRateLimiter.CANCELLED
+                raise LLMRequestError(CallCancelledError("Cancelada antes de enviarse"), retryable=False)
+            with self.session.post(url, json=payload, headers=headers,
+                                   timeout=timeout, stream=True) as response:
+                outcome, retry_after = self._classify_status(response.status_code, response.headers)
+                response.raise_for_status()
+                
+                if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                    result = response.json()
+                    parts.append(self._extract_content(result))
+                    usage = result.get("usage")
+                    on_delta(parts[0])
+                else:
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        usage = chunk.get("usage") or usage
+                        for choice in chunk.get("choices") or []:
+                            text = (choice.get("delta") or {}).get("content")
+                            if text:
+                                parts.append(text)
+                                on_delta(text)
+        
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                outcome = AdaptiveRateLimiter.THROTTLED
+            raise LLMRequestError(e, self._is_retryable(outcome, e), retry_after)
+        
+        finally:
+            if limiter is not None:
+                limiter.release(outcome, retry_after)
+            if route is not None:
+                route.release()
+        
+        self.latency_tracker.record(time.perf_counter() - started)
+        return "".join(parts), usage
+    
+    def _is_retryable(self, outcome: str, error: Exception) -> bool:
+        """
+        Los 429/5xx/timeouts y los errores de conexión se reintentan;
+        el resto de errores 4xx no cambiarían al repetir la petición.
+        """
+        if outcome == AdaptiveRateLimiter.THROTTLED:
+            return True
+        return isinstance(error, (requests.exceptions.ConnectionError, aiohttp.ClientConnectionError))
+    
+    def _lookup(self, key: str, prompt: str) -> Optional[str]:
+        """
+        Busca una respuesta sin usar la red: primero en la cassette (modo replay)
+        y después en la caché. Retorna None si hay que llamar a la API.
+        """
+        if self.cassette is not None and self.cassette.is_replaying:
+            replayed = self.cassette.replay(key)
+            if replayed is not None:
+                return replayed
+            if self.cassette.on_miss == LLMCassette.MISS_ERROR:
+                raise CassetteMissError(f"Prompt no encontrado en la cassette {self.cassette.path}")
+            if self.cassette.on_miss == LLMCassette.MISS_DEFAULT:
+                return self._error_response(CassetteMissError("Prompt no encontrado en la cassette"))
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                if self.cassette is not None and self.cassette.is_recording:
+                    self.cassette.record(key, prompt, cached)
+                return cached
+        
+        return None
+    
+    def _remember(self, key: str, prompt: str, content: str, cacheable: bool = True):
+        """Graba la respuesta en la cassette y, si es válida, en la caché"""
+        if self.cassette is not None and self.cassette.is_recording:
+            self.cassette.record(key, prompt, content)
+        if cacheable and self.cache is not None:
+            self.cache.put(key, content)
+    
+    def get_route(self, call_type: str) -> Optional[ModelRoute]:
+        """Ruta del tipo de llamada, la ruta "default" o None (configuración del cliente)"""
+        return self.routes.get(call_type) or self.routes.get(ROUTE_DEFAULT)
+    
+    def set_route(self, call_type: str, route: Optional[ModelRoute]):
+        """Asigna (o con None elimina) la ruta de un tipo de llamada"""
+        if route is None:
+            self.routes.pop(call_type, None)
+        else:
+            self.routes[call_type] = route
+    
+    def _endpoint(self, route: Optional[ModelRoute]) -> Tuple[str, float, Optional[Dict]]:
+        """
+        Retorna (URL, timeout, cabeceras extra) de la ruta.
+        Las cabeceras solo cambian si la ruta usa otra API key.
+        """
+        if route is None:
+            return self.base_url, self.timeout, None
+        headers = None
+        if route.api_key:
+            headers = {"Authorization": f"Bearer {route.api_key}"}
+        return (
+            route.base_url or self.base_url,
+            route.timeout if route.timeout is not None else self.timeout,
+            headers
+        )
+    
+    def _build_payload(self, prompt: str, temperature: float, max_tokens: Optional[int],
+                       route: Optional[ModelRoute] = None, system_message: Optional[str] = None) -> Dict:
+        """Construye el cuerpo de la petición de chat completions"""
+        if max_tokens is None:
+            max_tokens = route.max_tokens if route and route.max_tokens else DEFAULT_MAX_TOKENS
+        return {
+            "model": route.model if route and route.model else self.model,
             "messages": [
                 {
                     "role": "system",
-                    "content": "Eres un asistente útil que siempre responde con JSON válido cuando se solicita."
+                    "content": system_message or SYSTEM_MESSAGE
                 },
                 {
                     "role": "user",
@@ -63,31 +834,56 @@ class LLMClient:
             "max_tokens": max_tokens,
             "response_format": {"type": "json_object"}  # Fuerza respuesta JSON
         }
-        
-        try:
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            # Extraer el contenido de la respuesta
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"]
-            else:
-                raise ValueError("Respuesta inválida de la API")
-        
-        except requests.exceptions.RequestException as e:
-            print(f"Error en la llamada a la API: {e}")
-            # Retornar respuesta por defecto en caso de error
+    
+    def _content_key(self, payload: Dict) -> str:
+        """Clave de contenido de la petición, compartida por la caché y la cassette"""
+        messages = payload["messages"]
+        return LLMResponseCache.make_key(
+            payload["model"],
+            messages[0]["content"],
+            messages[-1]["content"],
+            payload["temperature"],
+            payload["max_tokens"]
+        )
+    
+    def _classify_status(self, status_code: int, headers) -> Tuple[str, Optional[float]]:
+        """
+        Clasifica una respuesta HTTP para el limitador de tasa.
+        Retorna (resultado, segundos de Retry-After si el servidor los indica).
+        """
+        if status_code == 429 or status_code >= 500:
+            retry_after = None
+            try:
+                retry_after = float(headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                pass
+            return AdaptiveRateLimiter.THROTTLED, retry_after
+        if status_code >= 400:
+            return AdaptiveRateLimiter.ERROR, None
+        return AdaptiveRateLimiter.SUCCESS, None
+    
+    def _extract_content(self, result: Dict) -> str:
+        """Extrae el contenido de la respuesta de la API"""
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"]
+        else:
+            raise ValueError("Respuesta inválida de la API")
+    
+    def _error_response(self, error: Exception) -> str:
+        """Respuesta por defecto cuando la llamada a la API falla o se cancela"""
+        if isinstance(error, LLMRequestError) and error.cancelled:
             return json.dumps({
                 "action": "rest",
-                "reasoning": f"Error de conexión: {str(e)}"
+                "reasoning": f"Llamada cancelada: {str(error)}",
+                "error": True,
+                "cancelled": True
             })
+        print(f"Error en la llamada a la API: {error}")
+        return json.dumps({
+            "action": "rest",
+            "reasoning": f"Error de conexión: {str(error)}",
+            "error": True
+        })
     
     def set_model(self, model: str):
         """Cambia el modelo a usar"""
@@ -0,0 +1,52 @@
+"""
+Rutas de Modelo
+Modelo, endpoint y límites de cada tipo de llamada al LLM
+"""
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class ModelRoute:
+    """
+    Perfil de llamada para un tipo de llamada (action_reactor, daily_planner...).
+    Los campos a None heredan el valor del LLMClient.
+    """
+    
+    model: Optional[str] = None  # Modelo a usar (p.ej. uno pequeño y rápido para el reactor)
+    base_url: Optional[str] = None  # Endpoint de chat completions
+    api_key: Optional[str] = None  # API key del endpoint, si es distinta
+    timeout: Optional[float] = None  # Timeout en segundos de cada petición
+    max_tokens: Optional[int] = None  # Tokens de salida si la llamada no indica otros
+    max_concurrency: Optional[int] = None  # Peticiones simultáneas máximas en esta ruta
+    _slots: Optional[threading.BoundedSemaphore] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if self.max_concurrency is not None:
+            self._slots = threading.BoundedSemaphore(max(1, self.max_concurrency))
+    
+    def acquire(self):
+        """Ocupa una plaza de la ruta (bloquea si está llena)"""
+        if self._slots is not None:
+            self._slots.acquire()
+    
+    async def acquire_async(self):
+        """Versión asíncrona de acquire(): cede el event loop mientras espera"""
+        if self._slots is None:
+            return
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(0.005)
+    
+    def release(self):
+        """Libera la plaza ocupada con acquire()"""
+        if self._slots is not None:
+            self._slots.release()
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ModelRoute":
+        """Crea la ruta a partir de la sección de configuración JSON"""
+        fields = ("model", "base_url", "api_key", "timeout", "max_tokens", "max_concurrency")
+        return cls(**{name: data[name] for name in fields if name in data})
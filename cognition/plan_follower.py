@@ -0,0 +1,260 @@
+"""
+Seguimiento del Plan Diario
+Ejecuta el plan del agente sin llamar al LLM y decide cuándo hace falta el reactor
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from models.agent import Agent
+from models.world_snapshot import WorldSnapshot
+
+
+# Motivos por los que un agente necesita el Action Reactor
+TRIGGER_NO_PLAN_ITEM = "no_plan_item"
+TRIGGER_NEW_DISCOUNT = "new_discount"
+TRIGGER_LOW_ENERGY = "low_energy"
+TRIGGER_LOW_GROCERIES = "low_groceries"
+TRIGGER_FAILED_ACTION = "failed_action"
+TRIGGER_AGENT_NEARBY = "agent_nearby"
+
+
+@dataclass
+class PlanTriggerPolicy:
+    """Umbrales y disparadores que obligan a consultar al reactor"""
+    
+    energy_threshold: float = 30.0  # Energía por debajo de la cual se reconsidera el plan
+    grocery_threshold: float = 20.0  # Nivel de comestibles por debajo del cual se reconsidera
+    react_to_new_discounts: bool = True
+    react_to_failed_actions: bool = True
+    # Desactivado por defecto: cada llegada a una ubicación ocupada consultaría al LLM
+    react_to_nearby_agents: bool = False
+
+
+class PlanFollower:
+    """
+    Compila el plan diario de cada agente en un índice por hora y
+    convierte la actividad de la hora actual en una decisión ejecutable.
+    Entre dos actividades el agente continúa con la anterior (trabaja si
+    está en su trabajo, descansa si no), y antes de la primera del día con
+    la última del plan. Solo los agentes con algún
+    disparador activo pasan por el LLM.
+    """
+    
+    def __init__(self, valid_actions: Set[str], policy: Optional[PlanTriggerPolicy] = None):
+        """
+        Args:
+            valid_actions: Acciones que ResponseParser sabe ejecutar.
+            policy: Umbrales de los disparadores del reactor.
+        """
+        self.valid_actions = set(valid_actions)
+        self.policy = policy or PlanTriggerPolicy()
+        # agent_id -> (id del plan, longitud del plan, {hora: actividad})
+        self._plan_index: Dict[str, Tuple[int, int, Dict[int, Dict]]] = {}
+        # agent_id -> (id del plan, longitud del plan, {hora: ubicaciones de esa hora en adelante})
+        self._plan_locations: Dict[str, Tuple[int, int, Dict[int, Set[str]]]] = {}
+        self._tick: Optional[Tuple[int, int]] = None
+        self._snapshot_key: Optional[Tuple] = None
+        self._active_discounts: Set[str] = set()
+        self._new_discounts: Set[str] = set()
+        self._occupants: Dict[str, Set[str]] = {}
+        # agent_id -> agentes con los que compartía ubicación en el tick anterior / actual
+        self._previous_neighbours: Dict[str, Set[str]] = {}
+        self._current_neighbours: Dict[str, Set[str]] = {}
+        
+        # Contadores
+        self.followed = 0
+        self.reacted = 0
+        self.trigger_counts: Counter = Counter()
+    
+    def observe_world(self, snapshot: WorldSnapshot, agents: List[Agent]):
+        """
+        Actualiza los descuentos activos (de la instantánea del tick) y la
+        ocupación de cada ubicación. Un descuento es nuevo si no estaba activo
+        en el tick anterior; si las campañas cambian a mitad de tick, los que
+        empiezan entonces también cuentan como nuevos.
+        """
+        self._occupants = {}
+        for agent in agents:
+            self._occupants.setdefault(agent.current_location, set()).add(agent.agent_id)
+        
+        if snapshot.key == self._snapshot_key:
+            return
+        self._snapshot_key = snapshot.key
+        
+        day, hour, minute = snapshot.time
+        active = set(snapshot.discounts)
+        if self._tick == (day, hour):
+            self._new_discounts = (self._new_discounts | (active - self._active_discounts)) & active
+        else:
+            self._tick = (day, hour)
+            self._new_discounts = active - self._active_discounts
+            self._previous_neighbours = self._current_neighbours
+            self._current_neighbours = {}
+        self._active_discounts = active
+    
+    @property
+    def new_discounts(self) -> Set[str]:
+        """Ubicaciones cuyo descuento empezó en este tick"""
+        return set(self._new_discounts)
+    
+    def compile_plan(self, agent: Agent) -> Dict[int, Dict]:
+        """
+        Retorna el plan del agente indexado por hora.
+        El índice se recompila solo cuando cambia el plan.
+        """
+        plan = agent.daily_plan or []
+        identity = (id(plan), len(plan))
+        cached = self._plan_index.get(agent.agent_id)
+        if cached and cached[:2] == identity:
+            return cached[2]
+        
+        index: Dict[int, Dict] = {}
+        for item in plan:
+            if not isinstance(item, dict):
+                continue
+            hour = self._parse_hour(item.get("time"))
+            if hour is not None and hour not in index:
+                index[hour] = item
+        
+        self._plan_index[agent.agent_id] = (identity[0], identity[1], index)
+        return index
+    
+    def get_plan_locations(self, agent: Agent, hour: int) -> Set[str]:
+        """Ubicaciones de las actividades del plan desde la hora dada hasta el final del día"""
+        plan = agent.daily_plan or []
+        identity = (id(plan), len(plan))
+        cached = self._plan_locations.get(agent.agent_id)
+        if not cached or cached[:2] != identity:
+            index = self.compile_plan(agent)
+            remaining: Set[str] = set()
+            by_hour: Dict[int, Set[str]] = {}
+            for plan_hour in range(23, -1, -1):
+                location = index.get(plan_hour, {}).get("location")
+                if isinstance(location, str) and location:
+                    remaining = remaining | {location}
+                by_hour[plan_hour] = remaining
+            cached = (identity[0], identity[1], by_hour)
+            self._plan_locations[agent.agent_id] = cached
+        return cached[2].get(hour, set())
+    
+    def get_plan_item(self, agent: Agent, hour: int) -> Optional[Dict]:
+        """Actividad del plan para una hora concreta"""
+        return self.compile_plan(agent).get(hour)
+    
+    def get_plan_decision(self, agent: Agent, hour: int) -> Optional[Dict]:
+        """
+        Decisión que dicta el plan para la hora dada.
+        Retorna None si el plan no cubre la hora o su actividad no es ejecutable.
+        """
+        index = self.compile_plan(agent)
+        if hour in index:
+            return self.to_decision(index[hour])
+        
+        # Antes de la primera actividad (de madrugada) continúa la última del plan
+        if not index:
+            return None
+        earlier = [h for h in index if h < hour]
+        return self._continue_decision(agent, index[max(earlier or index)])
+    
+    def get_triggers(self, agent: Agent, hour: int) -> List[str]:
+        """
+        Retorna los motivos por los que el agente debe consultar al reactor.
+        Lista vacía si puede seguir su plan sin llamar al LLM.
+        Requiere haber llamado a observe_world() en el tick actual.
+        """
+        policy = self.policy
+        triggers = []
+        
+        if self.get_plan_decision(agent, hour) is None:
+            triggers.append(TRIGGER_NO_PLAN_ITEM)
+        # Un descuento nuevo solo afecta a quien está en esa ubicación o la tiene en el plan
+        if policy.react_to_new_discounts and self._new_discounts and (
+                agent.current_location in self._new_discounts or
+                not self._new_discounts.isdisjoint(self.get_plan_locations(agent, hour))):
+            triggers.append(TRIGGER_NEW_DISCOUNT)
+        if agent.energy < policy.energy_threshold:
+            triggers.append(TRIGGER_LOW_ENERGY)
+        if agent.grocery_level < policy.grocery_threshold:
+            triggers.append(TRIGGER_LOW_GROCERIES)
+        if policy.react_to_failed_actions and agent.last_action_success is False:
+            triggers.append(TRIGGER_FAILED_ACTION)
+        
+        # Solo cuenta como encuentro un agente que no estaba ya en la ubicación
+        # en el tick anterior; si no, compartir casa dispararía el reactor toda la noche.
+        # En el primer tick observado del agente no hay referencia y no se dispara.
+        if policy.react_to_nearby_agents:
+            neighbours = self._occupants.get(agent.current_location, set()) - {agent.agent_id}
+            self._current_neighbours[agent.agent_id] = neighbours
+            previous = self._previous_neighbours.get(agent.agent_id)
+            if previous is not None and neighbours - previous:
+                triggers.append(TRIGGER_AGENT_NEARBY)
+        
+        return triggers
+    
+    def to_decision(self, item: Optional[Dict]) -> Optional[Dict]:
+        """
+        Convierte una actividad del plan en una decisión con el formato del reactor.
+        Retorna None si la actividad está incompleta o su acción no es ejecutable.
+        """
+        if not item:
+            return None
+        
+        action = str(item.get("action", "")).lower()
+        if action not in self.valid_actions:
+            return None
+        location = item.get("location")
+        product = item.get("product")
+        
+        if action == "buy" and not (location and product):
+            return None
+        if action == "move" and not location:
+            return None
+        
+        return {
+            "action": action,
+            "target_location": location,
+            "target_product": product,
+            "reasoning": f"Siguiendo el plan: {item.get('purpose', '')}".strip(),
+            "source": "plan"
+        }
+    
+    def _continue_decision(self, agent: Agent, previous_item: Dict) -> Dict:
+        """Decisión para una hora sin actividad propia: continuar con la anterior"""
+        purpose = previous_item.get("purpose", "")
+        if agent.work_location and agent.current_location == agent.work_location:
+            action = "work"
+        else:
+            action = "rest"
+        return {
+            "action": action,
+            "target_location": None,
+            "target_product": None,
+            "reasoning": f"Continuando el plan: {purpose}".strip(),
+            "source": "plan"
+        }
+    
+    def record(self, followed: int, reacted: int, triggers: List[str]):
+        """Acumula el resultado de un tick"""
+        self.followed += followed
+        self.reacted += reacted
+        self.trigger_counts.update(triggers)
+    
+    def get_stats(self) -> Dict:
+        """Retorna cuántas decisiones siguieron el plan y por qué se llamó al reactor"""
+        total = self.followed + self.reacted
+        return {
+            "followed": self.followed,
+            "reacted": self.reacted,
+            "followed_ratio": self.followed / total if total else 0.0,
+            "triggers": dict(self.trigger_counts)
+        }
+    
+    @staticmethod
+    def _parse_hour(value) -> Optional[int]:
+        """Extrae la hora de "HH:MM" (o de un entero)"""
+        try:
+            hour = int(str(value).split(":")[0])
+        except (TypeError, ValueError):
+            return None
+        return hour if 0 <= hour <= 23 else None
@@ -3,63 +3,261 @@ Constructor de Prompts
 Ensambla dinámicamente el contexto para enviar a la API del LLM
 """
 
-from typing import Dict, List, Optional
+import json
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
 from models.agent import Agent
 from models.location import Location
 from models.world_config import WorldConfig
+from models.world_snapshot import WorldSnapshot
+from engine.interaction_engine import InteractionEngine
+from cognition.usage_tracker import (
+    CALL_DAILY_PLANNER, CALL_ACTION_REACTOR, CALL_BATCHED_REACTOR, CALL_CONVERSATION
+)
+
+
+# Aproximación de caracteres por token para texto en español
+CHARS_PER_TOKEN = 4
+
+# Granularidad (tokens) de los límites de prefijo reducido, para que agentes
+# con partes propias de tamaño parecido compartan el mismo prefijo
+PREFIX_LIMIT_STEP = 64
+
+# Eventos de memoria que se prueban, de más a menos, al recortar la memoria
+MEMORY_EVENT_STEPS = (10, 5, 2, 0)
+
+# Formatos de prompt
+FORMAT_VERBOSE = "verbose"  # Texto explicativo con el formato de respuesta en el prompt
+FORMAT_COMPACT = "compact"  # Bloque JSON con claves cortas; leyenda y formato en el mensaje de sistema
+
+_COMPACT_LEGEND = (
+    "Claves: t=fecha; loc=[nombre, tipo, [x, y], productos]; disc={ubicación: % de descuento}; "
+    "loc_mas/disc_mas=omitidos; n=nombre; edad; prof=profesión; tr=rasgos; e=energía/100; m=dinero; "
+    "g=comestibles/100; at=ubicación; xy=coordenadas; inv=nº de items; "
+    "near=agentes cercanos [id, nombre, ubicación, afinidad] (target_agent de chat); near_mas=otros en tu ubicación; "
+    "plan=actividad de esta hora (\"libre\" si el plan no la cubre); "
+    "mem: ev=[[\"D<día> HH:MM\", tipo, descripción]], refl=última reflexión, hab=hábitos, ev_n=eventos por tipo."
+)
+
+_COMPACT_DECISION = (
+    '{"action": "buy|move|rest|eat|work|chat", "target_location": ubicación o null, '
+    '"target_product": producto o null (solo buy), "target_agent": id o null (solo chat), '
+    '"reasoning": breve, "urgency": "high|medium|low"}'
+)
+
+# Mensajes de sistema del formato compacto: leyenda de claves y formato de respuesta, una sola vez
+COMPACT_SYSTEM_MESSAGES = {
+    CALL_DAILY_PLANNER: (
+        "Eres un agente consumidor en una simulación y cada mañana planificas tu día. "
+        "Recibes el mundo y tu perfil como JSON compacto. " + _COMPACT_LEGEND + " "
+        'Responde SOLO con JSON válido: {"plan": [{"time": "HH:MM", "action": "move|buy|rest|eat|work", '
+        '"location": ubicación, "product": producto (solo buy), "purpose": breve}], "reasoning": breve}. '
+        "Sé realista con tu energía y dinero y ten en cuenta tus hábitos."
+    ),
+    CALL_ACTION_REACTOR: (
+        "Eres un agente consumidor en una simulación y cada hora decides qué hacer a continuación. "
+        "Recibes el mundo y tu estado como JSON compacto (me=tú). " + _COMPACT_LEGEND + " "
+        "Responde SOLO con JSON válido: " + _COMPACT_DECISION + ". "
+        "Con energía baja descansa o come; gasta con cabeza; sigue el plan o adáptate."
+    ),
+    CALL_BATCHED_REACTOR: (
+        "Decides por varios agentes consumidores en una simulación; cada uno actúa según su propio "
+        "estado, personalidad y memoria. Recibes el mundo y los agentes (ags) como JSON compacto. "
+        + _COMPACT_LEGEND + " "
+        "Responde SOLO con JSON válido cuyas claves sean los agent_id, con una entrada por agente: "
+        '{"<agent_id>": ' + _COMPACT_DECISION + "}. "
+        "Con energía baja descansa o come; gasta con cabeza; sigue el plan o adáptate."
+    ),
+    CALL_CONVERSATION: (
+        "Eres un agente consumidor en una simulación y te encuentras con otro agente (o). "
+        "Recibes el encuentro como JSON compacto: me=tú, o=el otro, af=afinidad de -1 a 1, "
+        "hist=conversaciones previas; n=nombre, prof=profesión, e=energía/100, m=dinero, at=ubicación. "
+        'Responde SOLO con JSON válido: {"dialogue": texto, "topic": tema, '
+        '"relationship_change": número (positivo acerca, negativo aleja, ~0 neutral), "reasoning": breve}.'
+    )
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación barata del número de tokens de un texto"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class PromptBudget:
+    """Presupuesto de tokens de entrada para un tipo de llamada"""
+    
+    max_tokens: int  # Tokens estimados del prompt completo
+    prefix_share: float = 0.6  # Fracción máxima para el prefijo común del tick
 
 
 class PromptBuilder:
-    """Construye prompts contextualizados para el LLM"""
+    """
+    Construye prompts contextualizados para el LLM.
+    
+    Cada prompt empieza por un prefijo común a todos los agentes del tick
+    (instrucciones, formato de respuesta, mundo, ubicaciones, productos y
+    descuentos) y termina con la parte propia del agente. El prefijo se
+    construye una vez por tick y es idéntico byte a byte entre llamadas,
+    así que la caché de prefijos del proveedor puede reutilizarlo.
+    
+    Con un presupuesto de tokens para el tipo de llamada, las secciones de
+    menor prioridad se recortan hasta que el prompt cabe: en el prefijo, las
+    ubicaciones y después los descuentos (resumiendo lo omitido); en la parte
+    del agente, la memoria. Si la parte fija del agente no deja sitio al
+    prefijo del tick, el prefijo se reduce más para ese prompt; si ni así
+    cabe, el prompt se cuenta como "over_budget" en get_size_stats().
+    
+    Cada tipo de llamada puede usar el formato explicativo (FORMAT_VERBOSE) o
+    el compacto (FORMAT_COMPACT): un bloque JSON con claves cortas cuya
+    leyenda y formato de respuesta van en el mensaje de sistema
+    (get_system_message()).
+    """
     
-    def __init__(self, world_config: WorldConfig, locations: Dict[str, Location]):
+    def __init__(self, world_config: WorldConfig, locations: Dict[str, Location],
+                 budgets: Optional[Dict[str, PromptBudget]] = None,
+                 formats: Optional[Dict[str, str]] = None,
+                 interaction_engine: Optional[InteractionEngine] = None,
+                 max_nearby_agents: int = 5, nearby_radius: float = 1.0):
+        """
+        Args:
+            budgets: Presupuesto de tokens por tipo de llamada (sin entrada = sin límite).
+            formats: Formato de prompt por tipo de llamada (sin entrada = FORMAT_VERBOSE).
+            interaction_engine: Índice espacial del que salen los agentes cercanos
+                del reactor (None = sin sección de agentes cercanos).
+            max_nearby_agents: Máximo de vecinos listados por agente.
+            nearby_radius: Distancia a la que otro agente cuenta como cercano.
+        """
         self.world_config = world_config
         self.locations = locations
+        self.interaction_engine = interaction_engine
+        self.max_nearby_agents = max_nearby_agents
+        self.nearby_radius = nearby_radius
+        self.budgets: Dict[str, PromptBudget] = dict(budgets or {})
+        self.formats: Dict[str, str] = dict(formats or {})
+        for call_type, prompt_format in self.formats.items():
+            if prompt_format not in (FORMAT_VERBOSE, FORMAT_COMPACT):
+                raise ValueError(f"Formato de prompt desconocido para {call_type}: {prompt_format}")
+        self._lock = threading.Lock()
+        self._tick_key: Optional[Tuple] = None
+        self._tick_snapshot: Optional[WorldSnapshot] = None
+        # (tipo de llamada, límite de tokens o None) -> (prefijo, si se recortó)
+        self._prefixes: Dict[Tuple[str, Optional[int]], Tuple[str, bool]] = {}
+        self._sizes: Dict[str, Dict] = {}
     
-    def build_daily_planner_prompt(self, agent: Agent) -> str:
+    def get_format(self, call_type: str) -> str:
+        """Formato de prompt del tipo de llamada"""
+        return self.formats.get(call_type, FORMAT_VERBOSE)
+    
+    def get_system_message(self, call_type: str) -> Optional[str]:
         """
-        Construye el prompt para el planificador diario (ejecutado a las 7 AM).
-        Genera el itinerario del día.
+        Mensaje de sistema del tipo de llamada: la leyenda y el formato de
+        respuesta en formato compacto, o None para usar el del LLMClient.
         """
-        day, hour, minute = self.world_config.get_current_time()
-        day_name = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"][
-            self.world_config.get_day_of_week()
-        ]
-        
-        # Construir información del agente
-        agent_info = f"""
-Perfil del Agente:
-- Nombre: {agent.name}
-- Edad: {agent.age}
-- Profesión: {agent.profession}
-- Personalidad: {', '.join(agent.personality_traits)}
-- Dinero actual: ${agent.money:.2f}
-- Energía actual: {agent.energy:.1f}/100
-- Nivel de comestibles: {agent.grocery_level:.1f}/100
-"""
+        if self.get_format(call_type) == FORMAT_COMPACT:
+            return COMPACT_SYSTEM_MESSAGES[call_type]
+        return None
+    
+    def get_shared_prefix(self, call_type: str) -> str:
+        """
+        Prefijo común del tick para un tipo de llamada.
+        Se reconstruye cuando cambia la hora, las campañas o el catálogo de
+        ubicaciones de la instantánea (que se captura al inicio de cada tick).
+        """
+        return self._shared_prefix_entry(call_type)[0]
+    
+    def _snapshot(self) -> WorldSnapshot:
+        """Instantánea del tick: hora, descuentos y precios que leen todos los prompts"""
+        return self.world_config.get_snapshot(self.locations)
+    
+    def _shared_prefix_entry(self, call_type: str, limit: Optional[int] = None) -> Tuple[str, bool]:
+        """
+        (prefijo del tick, si se recortó) para un tipo de llamada.
+        Con limit, el prefijo se reduce hasta caber en ese número de tokens.
+        """
+        snapshot = self._snapshot()
+        with self._lock:
+            # El catálogo solo se compara cuando cambia la instantánea (una vez por tick)
+            if snapshot is not self._tick_snapshot:
+                key = (snapshot.key, snapshot.catalog)
+                if key != self._tick_key:
+                    self._tick_key = key
+                    self._prefixes = {}
+                self._tick_snapshot = snapshot
+            entry = self._prefixes.get((call_type, limit))
+            if entry is None:
+                entry = self._build_prefix(call_type, limit)
+                self._prefixes[(call_type, limit)] = entry
+            return entry
+    
+    def _fit_prefix(self, call_type: str, suffix_text: str) -> Tuple[str, bool]:
+        """
+        Prefijo del tick que, junto a la parte fija del agente (suffix_text,
+        sin memoria), cabe en el presupuesto. Si el prefijo compartido no deja
+        sitio, se usa uno reducido al espacio restante (redondeado hacia abajo
+        a PREFIX_LIMIT_STEP tokens). Retorna (prefijo, si se recortó).
+        """
+        prefix, trimmed = self._shared_prefix_entry(call_type)
+        budget = self.budgets.get(call_type)
+        if budget is None:
+            return prefix, trimmed
+        room = budget.max_tokens - estimate_tokens(suffix_text)
+        if estimate_tokens(prefix) <= room:
+            return prefix, trimmed
+        limit = max(0, room) // PREFIX_LIMIT_STEP * PREFIX_LIMIT_STEP
+        return self._shared_prefix_entry(call_type, limit)[0], True
+    
+    def _build_prefix(self, call_type: str, limit: Optional[int] = None) -> Tuple[str, bool]:
+        """
+        Construye el prefijo común de un tipo de llamada.
+        Con presupuesto, reduce (por búsqueda binaria) las ubicaciones listadas
+        y después los descuentos hasta que el prefijo cabe en su parte (o en
+        limit tokens si se indica). Retorna (prefijo, si se recortó).
+        """
+        compact = self.get_format(call_type) == FORMAT_COMPACT
         
-        # Información del mundo
-        world_info = self._build_world_info()
+        def render(location_limit: Optional[int], discount_limit: Optional[int]) -> str:
+            if compact:
+                return self._render_compact_prefix(call_type, location_limit, discount_limit)
+            return self._render_prefix(
+                call_type, self._build_locations_info(location_limit), self._get_active_discounts(discount_limit)
+            )
         
-        # Memoria reciente
-        memory_context = agent.memory.get_memory_context(window_hours=48)
+        prefix = render(None, None)
+        budget = self.budgets.get(call_type)
+        if budget is None:
+            return prefix, False
+        if limit is None:
+            limit = int(budget.max_tokens * budget.prefix_share)
+        if estimate_tokens(prefix) <= limit:
+            return prefix, False
         
-        # Ubicaciones disponibles
-        locations_info = self._build_locations_info()
+        location_count = self._largest_fitting(len(self.locations), lambda count: render(count, None), limit)
+        discount_count = None
+        if location_count == 0:
+            discount_count = self._largest_fitting(len(self.locations), lambda count: render(0, count), limit)
+        return render(location_count, discount_count), True
+    
+    @staticmethod
+    def _largest_fitting(upper: int, render: Callable[[int], str], limit: int) -> int:
+        """Mayor n en [0, upper] cuyo texto render(n) cabe en limit tokens (0 si ninguno)"""
+        low, high = 0, upper
+        while low < high:
+            middle = (low + high + 1) // 2
+            if estimate_tokens(render(middle)) <= limit:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+    
+    def _render_prefix(self, call_type: str, locations_info: str, discounts: str) -> str:
+        """Texto del prefijo común con las secciones de ubicaciones y descuentos dadas"""
+        world_info = self._build_world_info()
         
-        # Construir prompt completo
-        prompt = f"""Eres {agent.name}, un agente consumidor en una simulación.
-
-{agent_info}
-
-{world_info}
-
-{locations_info}
-
-{memory_context}
-
-Tarea: Planifica tu día. Es {day_name}, {hour:02d}:{minute:02d}. 
-Genera un plan diario con actividades horarias desde las {hour:02d}:00 hasta las 23:00.
+        if call_type == CALL_DAILY_PLANNER:
+            return f"""Eres un agente consumidor en una simulación. Cada mañana planificas tu día.
 
 Responde SOLO con un JSON válido en este formato:
 {{
@@ -79,52 +277,188 @@ Acciones disponibles:
 - "eat": Consumir alimentos del inventario
 - "work": Trabajar (si estás en tu lugar de trabajo)
 
-Importante: Sé realista con tu energía y dinero. Considera tus hábitos anteriores."""
+Importante: Sé realista con tu energía y dinero. Considera tus hábitos anteriores.
+{world_info}
+{locations_info}
+{discounts}
+"""
+
+        if call_type == CALL_ACTION_REACTOR:
+            return f"""Eres un agente consumidor en una simulación. Cada hora decides qué hacer a continuación.
+
+Responde SOLO con un JSON válido en este formato:
+{{
+    "action": "buy|move|rest|eat|work|chat",
+    "target_location": "nombre_de_ubicación o null",
+    "target_product": "nombre_producto o null (solo si action=buy)",
+    "target_agent": "id_agente o null (solo si action=chat)",
+    "reasoning": "Breve explicación de tu decisión",
+    "urgency": "high|medium|low"
+}}
+
+Consideraciones:
+- Si tu energía es baja, considera descansar o comer.
+- Gasta tu dinero sabiamente.
+- Hay descuentos activos en algunas tiendas (indicados abajo).
+- Puedes seguir tu plan o adaptarte a la situación actual.
+{world_info}
+{locations_info}
+{discounts}
+"""
+
+        if call_type == CALL_BATCHED_REACTOR:
+            return f"""Decides por varios agentes consumidores en una simulación.
+Cada agente actúa de forma independiente según su propio estado, personalidad y memoria.
+
+Responde SOLO con un JSON válido cuyas claves sean los agent_id, con una entrada por agente:
+{{
+    "agent_id": {{
+        "action": "buy|move|rest|eat|work|chat",
+        "target_location": "nombre_de_ubicación o null",
+        "target_product": "nombre_producto o null (solo si action=buy)",
+        "target_agent": "id_agente o null (solo si action=chat)",
+        "reasoning": "Breve explicación de la decisión",
+        "urgency": "high|medium|low"
+    }}
+}}
+
+Consideraciones:
+- Si la energía de un agente es baja, considera descansar o comer.
+- Cada agente debe gastar su dinero sabiamente.
+- Hay descuentos activos en algunas tiendas (indicados abajo).
+- Cada agente puede seguir su plan o adaptarse a la situación actual.
+{world_info}
+{locations_info}
+{discounts}
+"""
+
+        if call_type == CALL_CONVERSATION:
+            return """Eres un agente consumidor en una simulación y te encuentras con otro agente.
+Genera un diálogo corto y natural entre los dos.
+
+Responde SOLO con un JSON válido en este formato:
+{
+    "dialogue": "El texto del diálogo que dices",
+    "topic": "el_tema_de_la_conversación",
+    "relationship_change": 0.1,
+    "reasoning": "Breve explicación del diálogo"
+}
+
+relationship_change puede ser positivo (acercamiento), negativo (alejamiento), o cercano a 0 (neutral).
+"""
+
+        raise ValueError(f"Tipo de llamada sin prefijo: {call_type}")
+    
+    def _render_compact_prefix(self, call_type: str, location_limit: Optional[int],
+                               discount_limit: Optional[int]) -> str:
+        """
+        Prefijo común en formato compacto: fecha, ubicaciones y descuentos como JSON.
+        Las instrucciones van en el mensaje de sistema; la conversación no lleva prefijo.
+        """
+        if call_type not in COMPACT_SYSTEM_MESSAGES:
+            raise ValueError(f"Tipo de llamada sin prefijo: {call_type}")
+        if call_type == CALL_CONVERSATION:
+            return ""
         
-        return prompt
+        snapshot = self._snapshot()
+        day, hour, minute = snapshot.time
+        day_name = snapshot.day_name
+        locations, omitted = self._select_locations(location_limit)
+        discounts, omitted_discounts = self._select_discounts(discount_limit)
+        
+        data = {
+            "t": f"{day_name} D{day} {hour:02d}:{minute:02d}",
+            "loc": [
+                [location.name, location.location_type, list(location.coordinates), list(location.inventory)]
+                for location in locations
+            ]
+        }
+        if omitted:
+            data["loc_mas"] = dict(Counter(location.location_type for location in omitted).most_common())
+        data["disc"] = {name: round(discount * 100) for discount, name in discounts}
+        if omitted_discounts:
+            data["disc_mas"] = omitted_discounts
+        return "Mundo: " + self._compact_json(data) + "\n"
+    
+    @staticmethod
+    def _compact_json(data) -> str:
+        """JSON sin espacios y con acentos legibles (menos tokens)"""
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    
+    def build_daily_planner_prompt(self, agent: Agent) -> str:
+        """
+        Construye el prompt para el planificador diario (ejecutado a las 7 AM).
+        Genera el itinerario del día.
+        """
+        snapshot = self._snapshot()
+        day, hour, minute = snapshot.time
+        day_name = snapshot.day_name
+        
+        if self.get_format(CALL_DAILY_PLANNER) == FORMAT_COMPACT:
+            return self._build_compact_prompt(
+                CALL_DAILY_PLANNER, [agent], {}, 48,
+                f"Tarea: Planifica tu día ({day_name}, {hour:02d}:{minute:02d}) con actividades horarias "
+                f"desde las {hour:02d}:00 hasta las 23:00."
+            )
+        
+        # Construir información del agente
+        agent_info = f"""Perfil del Agente:
+- Nombre: {agent.name}
+- Edad: {agent.age}
+- Profesión: {agent.profession}
+- Personalidad: {', '.join(agent.personality_traits)}
+- Dinero actual: ${agent.money:.2f}
+- Energía actual: {agent.energy:.1f}/100
+- Nivel de comestibles: {agent.grocery_level:.1f}/100"""
+
+        def render(memory_context: str) -> str:
+            return f"""
+Eres {agent.name}.
+
+{agent_info}
+
+{memory_context}
+
+Tarea: Planifica tu día. Es {day_name}, {hour:02d}:{minute:02d}.
+Genera un plan diario con actividades horarias desde las {hour:02d}:00 hasta las 23:00."""
+
+        prefix, trimmed = self._fit_prefix(CALL_DAILY_PLANNER, render(""))
+        
+        # Memoria reciente, recortada a lo que deja libre el presupuesto
+        memory_context, memory_trimmed = self._fit_memory(
+            agent, 48, self._memory_allowance(CALL_DAILY_PLANNER, prefix + render(""))
+        )
+        
+        return self._record(CALL_DAILY_PLANNER, prefix + render(memory_context), trimmed or memory_trimmed)
     
     def build_action_reactor_prompt(self, agent: Agent, current_plan_item: Optional[Dict] = None) -> str:
         """
         Construye el prompt para el reactor de acciones (ejecutado cada hora).
         "¿Sigo el plan o cambio porque tengo hambre/vi un descuento?"
         """
-        day, hour, minute = self.world_config.get_current_time()
+        day, hour, minute = self._snapshot().time
+        
+        if self.get_format(CALL_ACTION_REACTOR) == FORMAT_COMPACT:
+            return self._build_compact_prompt(
+                CALL_ACTION_REACTOR, [agent], {agent.agent_id: current_plan_item}, 24,
+                f"Tarea: Decide qué hacer AHORA ({hour:02d}:{minute:02d})."
+            )
         
         # Estado actual
         agent_state = agent.get_state_summary()
-        
-        # Información del mundo
-        world_info = self._build_world_info()
-        
-        # Memoria reciente
-        memory_context = agent.memory.get_memory_context(window_hours=24)
-        
-        # Ubicaciones cercanas con descuentos
-        nearby_discounts = self._get_active_discounts()
+        state_info = self._build_agent_state_info(agent_state)
         
         # Agentes cercanos
         nearby_agents = self._get_nearby_agents_info(agent)
         
         # Plan actual
-        plan_info = ""
-        if current_plan_item:
-            plan_info = f"\nPlan actual para esta hora: {current_plan_item.get('action', 'none')} - {current_plan_item.get('purpose', '')}"
-        elif agent.daily_plan:
-            plan_info = "\nTienes un plan diario, pero no hay actividad específica para esta hora."
+        plan_info = self._build_plan_info(agent, current_plan_item)
         
-        prompt = f"""Eres {agent.name}, un agente consumidor en una simulación.
-
-Estado Actual:
-- Energía: {agent_state['energy']:.1f}/100
-- Dinero: ${agent_state['money']:.2f}
-- Comestibles: {agent_state['grocery_level']:.1f}/100
-- Ubicación actual: {agent_state['location']}
-- Coordenadas: {agent_state['coordinates']}
-- Inventario: {agent_state['inventory_count']} items
-
-{world_info}
+        def render(memory_context: str) -> str:
+            return f"""
+Eres {agent.name}.
 
-{nearby_discounts}
+{state_info}
 
 {nearby_agents}
 
@@ -132,25 +466,73 @@ Estado Actual:
 
 {memory_context}
 
-Tarea: Decide qué hacer AHORA (a las {hour:02d}:{minute:02d}).
+Tarea: Decide qué hacer AHORA (a las {hour:02d}:{minute:02d}). Tu energía es {agent_state['energy']:.1f}/100 y tu dinero ${agent_state['money']:.2f}."""
 
-Consideraciones:
-- Tu energía es {agent_state['energy']:.1f}/100. Si es baja, considera descansar o comer.
-- Tu dinero es ${agent_state['money']:.2f}. Gasta sabiamente.
-- Hay descuentos activos en algunas tiendas (mencionados arriba).
-- Puedes seguir tu plan o adaptarte a la situación actual.
+        prefix, trimmed = self._fit_prefix(CALL_ACTION_REACTOR, render(""))
+        
+        # Memoria reciente, recortada a lo que deja libre el presupuesto
+        memory_context, memory_trimmed = self._fit_memory(
+            agent, 24, self._memory_allowance(CALL_ACTION_REACTOR, prefix + render(""))
+        )
+        
+        return self._record(CALL_ACTION_REACTOR, prefix + render(memory_context), trimmed or memory_trimmed)
+    
+    def build_batched_reactor_prompt(self, agents: List[Agent],
+                                     plan_items: Optional[Dict[str, Dict]] = None) -> str:
+        """
+        Construye un único prompt del reactor para varios agentes.
+        La información del mundo y los descuentos se envían una sola vez;
+        cada agente aporta su estado, plan, agentes cercanos y memoria.
+        La respuesta esperada es un JSON indexado por agent_id.
+        """
+        day, hour, minute = self._snapshot().time
+        
+        if self.get_format(CALL_BATCHED_REACTOR) == FORMAT_COMPACT:
+            agent_ids = ", ".join(agent.agent_id for agent in agents)
+            return self._build_compact_prompt(
+                CALL_BATCHED_REACTOR, agents, plan_items or {}, 24,
+                f"Tarea: Decide qué hace AHORA ({hour:02d}:{minute:02d}) cada agente. "
+                f"Responde con un JSON cuyas claves sean los agent_id ({agent_ids})."
+            )
+        
+        section_heads = []
+        for agent in agents:
+            plan_item = plan_items.get(agent.agent_id) if plan_items else None
+            state_info = self._build_agent_state_info(agent.get_state_summary())
+            plan_info = self._build_plan_info(agent, plan_item)
+            nearby_agents = self._get_nearby_agents_info(agent)
+            section_heads.append(f"""### Agente {agent.agent_id} - {agent.name}
+Personalidad: {', '.join(agent.personality_traits) or 'sin rasgos definidos'}
+
+{state_info}
+{nearby_agents}
+{plan_info}
 
-Responde SOLO con un JSON válido en este formato:
-{{
-    "action": "buy|move|rest|eat|work|chat",
-    "target_location": "nombre_de_ubicación o null",
-    "target_product": "nombre_producto o null (solo si action=buy)",
-    "target_agent": "id_agente o null (solo si action=chat)",
-    "reasoning": "Breve explicación de tu decisión",
-    "urgency": "high|medium|low"
-}}"""
+""")
+
+        agent_ids = ", ".join(agent.agent_id for agent in agents)
         
-        return prompt
+        def render(memory_contexts: List[str]) -> str:
+            sections = [head + memory for head, memory in zip(section_heads, memory_contexts)]
+            return """
+Agentes:
+
+""" + "\n\n".join(sections) + f"""
+
+Tarea: Decide qué hace AHORA (a las {hour:02d}:{minute:02d}) cada uno de los agentes.
+Incluye una entrada por agente ({agent_ids})."""
+
+        prefix, trimmed = self._fit_prefix(CALL_BATCHED_REACTOR, render([""] * len(agents)))
+        
+        # La memoria de cada agente se recorta a su parte del presupuesto restante
+        allowance = self._memory_allowance(
+            CALL_BATCHED_REACTOR, prefix + render([""] * len(agents)), shares=len(agents)
+        )
+        fitted = [self._fit_memory(agent, 24, allowance) for agent in agents]
+        memory_trimmed = any(was_trimmed for _, was_trimmed in fitted)
+        
+        prompt = prefix + render([memory for memory, _ in fitted])
+        return self._record(CALL_BATCHED_REACTOR, prompt, trimmed or memory_trimmed)
     
     def build_conversation_prompt(self, agent: Agent, other_agent: Agent) -> str:
         """
@@ -164,13 +546,27 @@ Responde SOLO con un JSON válido en este formato:
             other_agent.agent_id, limit=5
         )
         
+        if self.get_format(CALL_CONVERSATION) == FORMAT_COMPACT:
+            encounter = {
+                "me": {"n": agent.name, "e": round(agent.energy), "m": round(agent.money, 2),
+                       "at": agent.current_location},
+                "o": {"id": other_agent.agent_id, "n": other_agent.name, "edad": other_agent.age,
+                      "prof": other_agent.profession},
+                "af": round(affinity, 2),
+                "hist": [event.description for event in conversation_history]
+            }
+            prompt = (self.get_shared_prefix(CALL_CONVERSATION) + "Encuentro: " + self._compact_json(encounter) +
+                      f"\nTarea: Genera un diálogo corto y natural con {other_agent.name}.")
+            return self._record(CALL_CONVERSATION, prompt, False)
+        
         history_text = ""
         if conversation_history:
             history_text = "\nHistorial de conversaciones previas:\n"
             for event in conversation_history:
                 history_text += f"- {event.description}\n"
         
-        prompt = f"""Eres {agent.name}, un agente consumidor en una simulación.
+        prompt = self.get_shared_prefix(CALL_CONVERSATION) + f"""
+Eres {agent.name}.
 
 Te encuentras con {other_agent.name} ({other_agent.age} años, {other_agent.profession}).
 Tu relación con {other_agent.name} es {relationship} (afinidad: {affinity:.2f}).
@@ -182,56 +578,255 @@ Estado actual:
 - Tu dinero: ${agent.money:.2f}
 - Ubicación: {agent.current_location}
 
-Genera un diálogo corto y natural entre tú y {other_agent.name}.
-
-Responde SOLO con un JSON válido en este formato:
-{{
-    "dialogue": "El texto del diálogo que dices",
-    "topic": "el_tema_de_la_conversación",
-    "relationship_change": 0.1,
-    "reasoning": "Breve explicación del diálogo"
-}}
+Genera un diálogo corto y natural entre tú y {other_agent.name}."""
 
-relationship_change puede ser positivo (acercamiento), negativo (alejamiento), o cercano a 0 (neutral)."""
+        return self._record(CALL_CONVERSATION, prompt, False)
+    
+    def _build_compact_prompt(self, call_type: str, agents: List[Agent], plan_items: Dict[str, Optional[Dict]],
+                              window_hours: int, task: str) -> str:
+        """
+        Prompt en formato compacto: prefijo del tick, un bloque JSON con el
+        agente ("me") o los agentes ("ags") y la tarea. La memoria de cada
+        agente se recorta a su parte del presupuesto restante.
+        """
+        planner = call_type == CALL_DAILY_PLANNER
+        entries = [self._compact_agent(agent, plan_items.get(agent.agent_id), planner) for agent in agents]
+        
+        def render(memories: List[Dict]) -> str:
+            blocks = [dict(entry, mem=memory) for entry, memory in zip(entries, memories)]
+            data = {"ags": blocks} if call_type == CALL_BATCHED_REACTOR else {"me": blocks[0]}
+            return "Entrada: " + self._compact_json(data) + "\n" + task
+        
+        prefix, trimmed = self._fit_prefix(call_type, render([{}] * len(agents)))
+        allowance = self._memory_allowance(call_type, prefix + render([{}] * len(agents)), shares=len(agents))
+        fitted = [self._fit_compact_memory(agent, window_hours, allowance) for agent in agents]
+        memory_trimmed = any(was_trimmed for _, was_trimmed in fitted)
+        
+        prompt = prefix + render([memory for memory, _ in fitted])
+        return self._record(call_type, prompt, trimmed or memory_trimmed)
+    
+    def _compact_agent(self, agent: Agent, plan_item: Optional[Dict], planner: bool) -> Dict:
+        """Estado del agente con claves cortas (leyenda en COMPACT_SYSTEM_MESSAGES)"""
+        entry = {"id": agent.agent_id, "n": agent.name}
+        if planner:
+            entry["edad"] = agent.age
+            entry["prof"] = agent.profession
+        entry["tr"] = list(agent.personality_traits)
+        entry["e"] = round(agent.energy)
+        entry["m"] = round(agent.money, 2)
+        entry["g"] = round(agent.grocery_level)
+        entry["at"] = agent.current_location
+        if not planner:
+            entry["xy"] = list(agent.coordinates)
+            entry["inv"] = len(agent.inventory)
+            if plan_item:
+                entry["plan"] = f"{plan_item.get('action', 'none')}: {plan_item.get('purpose', '')}"
+            else:
+                entry["plan"] = "libre" if agent.daily_plan else None
+            if self.interaction_engine is not None:
+                nearby, remaining = self._nearby_agents(agent)
+                entry["near"] = [
+                    [other.agent_id, other.name, other.current_location, round(agent.get_affinity(other.agent_id), 2)]
+                    for other in nearby
+                ]
+                if remaining:
+                    entry["near_mas"] = remaining
+        return entry
+    
+    def _fit_compact_memory(self, agent: Agent, window_hours: int,
+                            allowance: Optional[int]) -> Tuple[Dict, bool]:
+        """
+        Equivalente compacto de _fit_memory(): menos eventos y, si aún no
+        cabe, recuento por tipo de evento. Retorna (memoria, si se recortó).
+        """
+        memory = agent.memory.get_compact_context(window_hours=window_hours)
+        if allowance is None or estimate_tokens(self._compact_json(memory)) <= allowance:
+            return memory, False
+        
+        for max_events in MEMORY_EVENT_STEPS[1:]:
+            memory = agent.memory.get_compact_context(window_hours=window_hours, max_events=max_events)
+            if estimate_tokens(self._compact_json(memory)) <= allowance:
+                return memory, True
+        
+        counts = Counter(event.event_type for event in agent.memory.get_recent_events(window_hours))
+        summary = {"ev_n": dict(counts.most_common())}
+        return (summary if estimate_tokens(self._compact_json(summary)) <= allowance else {}), True
+    
+    def _memory_allowance(self, call_type: str, fixed_text: str, shares: int = 1) -> Optional[int]:
+        """
+        Tokens disponibles para la memoria de cada agente una vez contado el
+        resto del prompt, o None si el tipo de llamada no tiene presupuesto.
+        """
+        budget = self.budgets.get(call_type)
+        if budget is None:
+            return None
+        return max(0, budget.max_tokens - estimate_tokens(fixed_text)) // max(1, shares)
+    
+    def _fit_memory(self, agent: Agent, window_hours: int,
+                    allowance: Optional[int]) -> Tuple[str, bool]:
+        """
+        Contexto de memoria que cabe en allowance tokens: primero con menos
+        eventos y, si aún no cabe, como resumen por tipo de evento.
+        Retorna (contexto, si se recortó).
+        """
+        context = agent.memory.get_memory_context(window_hours=window_hours)
+        if allowance is None or estimate_tokens(context) <= allowance:
+            return context, False
+        
+        for max_events in MEMORY_EVENT_STEPS[1:]:
+            context = agent.memory.get_memory_context(window_hours=window_hours, max_events=max_events)
+            if estimate_tokens(context) <= allowance:
+                return context, True
         
+        counts = Counter(event.event_type for event in agent.memory.get_recent_events(window_hours))
+        summary = "Memoria Reciente (resumida): " + (
+            ", ".join(f"{count} {event_type}" for event_type, count in counts.most_common()) or "sin eventos"
+        )
+        return (summary if estimate_tokens(summary) <= allowance else ""), True
+    
+    def _record(self, call_type: str, prompt: str, trimmed: bool) -> str:
+        """
+        Registra el tamaño final del prompt y lo retorna.
+        Un prompt que supera el presupuesto cuenta como "over_budget" y no
+        como "trimmed", que solo cuenta los que caben tras recortarse.
+        """
+        tokens = estimate_tokens(prompt)
+        budget = self.budgets.get(call_type)
+        with self._lock:
+            sizes = self._sizes.setdefault(call_type, {
+                "prompts": 0, "tokens": 0, "max_tokens": 0, "trimmed": 0, "over_budget": 0
+            })
+            sizes["prompts"] += 1
+            sizes["tokens"] += tokens
+            sizes["max_tokens"] = max(sizes["max_tokens"], tokens)
+            if budget is not None and tokens > budget.max_tokens:
+                sizes["over_budget"] += 1
+            elif trimmed:
+                sizes["trimmed"] += 1
         return prompt
     
+    def get_size_stats(self) -> Dict[str, Dict]:
+        """
+        Tamaño estimado de los prompts por tipo de llamada: medio, máximo,
+        recortados que caben ("trimmed") y que no caben ni recortados ("over_budget")
+        """
+        with self._lock:
+            stats = {}
+            for call_type, sizes in self._sizes.items():
+                stats[call_type] = dict(sizes)
+                stats[call_type]["avg_tokens"] = sizes["tokens"] / sizes["prompts"] if sizes["prompts"] else 0.0
+                budget = self.budgets.get(call_type)
+                stats[call_type]["budget"] = budget.max_tokens if budget else None
+            return stats
+    
+    def _build_agent_state_info(self, agent_state: Dict) -> str:
+        """Construye el bloque de estado actual de un agente"""
+        return f"""Estado Actual:
+- Energía: {agent_state['energy']:.1f}/100
+- Dinero: ${agent_state['money']:.2f}
+- Comestibles: {agent_state['grocery_level']:.1f}/100
+- Ubicación actual: {agent_state['location']}
+- Coordenadas: {agent_state['coordinates']}
+- Inventario: {agent_state['inventory_count']} items"""
+
+    def _build_plan_info(self, agent: Agent, current_plan_item: Optional[Dict]) -> str:
+        """Construye la línea del plan del agente para la hora actual"""
+        if current_plan_item:
+            return f"\nPlan actual para esta hora: {current_plan_item.get('action', 'none')} - {current_plan_item.get('purpose', '')}"
+        elif agent.daily_plan:
+            return "\nTienes un plan diario, pero no hay actividad específica para esta hora."
+        return ""
+    
     def _build_world_info(self) -> str:
         """Construye información sobre el estado del mundo"""
-        day, hour, minute = self.world_config.get_current_time()
-        day_name = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"][
-            self.world_config.get_day_of_week()
-        ]
+        snapshot = self._snapshot()
+        day, hour, minute = snapshot.time
+        day_name = snapshot.day_name
         return f"\nEstado del Mundo:\n- Fecha: {day_name}, Día {day}, {hour:02d}:{minute:02d}\n"
     
-    def _build_locations_info(self) -> str:
-        """Construye información sobre las ubicaciones disponibles"""
+    def _select_locations(self, limit: Optional[int] = None) -> Tuple[List[Location], List[Location]]:
+        """
+        Ubicaciones a listar y ubicaciones omitidas.
+        Con limit solo se listan ese número, primero las que tienen descuento.
+        """
+        locations = list(self.locations.values())
+        omitted: List[Location] = []
+        if limit is not None and limit < len(locations):
+            snapshot = self._snapshot()
+            locations.sort(key=lambda location: not snapshot.is_discounted(location.name))
+            locations, omitted = locations[:limit], locations[limit:]
+        return locations, omitted
+    
+    def _select_discounts(self, limit: Optional[int] = None) -> Tuple[List[Tuple[float, str]], int]:
+        """
+        Descuentos activos a listar como (descuento, ubicación) y número de omitidos.
+        Con limit solo se listan los limit mayores.
+        """
+        discounts = [(discount, name) for name, discount in self._snapshot().discounts.items()]
+        
+        omitted = 0
+        if limit is not None and limit < len(discounts):
+            discounts.sort(key=lambda item: item[0], reverse=True)
+            omitted = len(discounts) - limit
+            discounts = discounts[:limit]
+        return discounts, omitted
+    
+    def _build_locations_info(self, limit: Optional[int] = None) -> str:
+        """
+        Construye información sobre las ubicaciones disponibles.
+        Con limit solo lista ese número (primero las que tienen descuento) y
+        resume el resto por tipo.
+        """
+        locations, omitted = self._select_locations(limit)
+        
         info = "\nUbicaciones Disponibles:\n"
-        for location in self.locations.values():
+        for location in locations:
             products = ", ".join(location.inventory.keys()) if location.inventory else "ninguno"
             info += f"- {location.name} ({location.location_type}) en {location.coordinates}\n"
             info += f"  Productos: {products}\n"
+        if omitted:
+            types = Counter(location.location_type for location in omitted)
+            summary = ", ".join(f"{count} {location_type}" for location_type, count in types.most_common())
+            info += f"- ... y {len(omitted)} ubicaciones más ({summary})\n"
         return info
     
-    def _get_active_discounts(self) -> str:
-        """Retorna información sobre descuentos activos"""
-        discounts = []
-        for location in self.locations.values():
-            if self.world_config.is_marketing_active(location.name):
-                discount = self.world_config.get_discount(location.name)
-                discounts.append(f"- {location.name}: {discount*100:.0f}% de descuento")
+    def _get_active_discounts(self, limit: Optional[int] = None) -> str:
+        """
+        Retorna información sobre descuentos activos.
+        Con limit solo lista los limit mayores.
+        """
+        discounts, omitted = self._select_discounts(limit)
+        if not discounts and not omitted:
+            return "\nNo hay descuentos activos en este momento."
         
-        if discounts:
-            return "\nDescuentos Activos:\n" + "\n".join(discounts)
-        return "\nNo hay descuentos activos en este momento."
+        lines = [f"- {name}: {discount*100:.0f}% de descuento" for discount, name in discounts]
+        if omitted:
+            lines.append(f"- ... y {omitted} descuentos más")
+        return "\nDescuentos Activos:\n" + "\n".join(lines)
+    
+    def _nearby_agents(self, agent: Agent) -> Tuple[List[Agent], int]:
+        """
+        Vecinos a listar (como mucho max_nearby_agents) y número de agentes
+        de la misma ubicación que quedan sin listar.
+        """
+        nearby = self.interaction_engine.get_nearby_agents(agent, self.max_nearby_agents, self.nearby_radius)
+        listed_here = sum(1 for other in nearby if other.current_location == agent.current_location)
+        remaining = self.interaction_engine.count_agents_at(agent.current_location) - 1 - listed_here
+        return nearby, max(0, remaining)
     
     def _get_nearby_agents_info(self, agent: Agent) -> str:
-        """Retorna información sobre agentes cercanos (se completará con la lista de agentes)"""
-        # Este método se puede expandir cuando se pase la lista completa de agentes
-        return "\nAgentes cercanos: (información disponible si hay interacciones)"
-
-
-
-
-
-
+        """Retorna información sobre los agentes cercanos según el índice espacial"""
+        if self.interaction_engine is None:
+            return ""
+        nearby, remaining = self._nearby_agents(agent)
+        if not nearby:
+            return "\nAgentes cercanos: ninguno"
+        
+        lines = []
+        for other in nearby:
+            where = "aquí" if other.current_location == agent.current_location else f"en {other.current_location}"
+            lines.append(f"- {other.name} (id: {other.agent_id}, {other.profession}) {where}, "
+                         f"afinidad {agent.get_affinity(other.agent_id):.2f}")
+        if remaining:
+            lines.append(f"- ... y {remaining} agentes más en {agent.current_location}")
+        return "\nAgentes cercanos (para chatear, usa su id como target_agent):\n" + "\n".join(lines)
@@ -0,0 +1,182 @@
+"""
+Limitador de Tasa Adaptativo
+Token bucket y control de concurrencia AIMD compartido por todas las llamadas al LLM
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class AdaptiveRateLimiter:
+    """
+    Limita las peticiones al LLM de todo el proceso.
+    
+    - Token bucket: como máximo `requests_per_second` peticiones nuevas por
+      segundo, con ráfagas de hasta `burst` peticiones.
+    - Concurrencia AIMD: el límite de peticiones en vuelo crece en +1 por cada
+      ventana de respuestas correctas y se multiplica por `decrease_factor`
+      ante un 429/5xx o un timeout.
+    """
+    
+    SUCCESS = "success"
+    THROTTLED = "throttled"
+    ERROR = "error"
+    CANCELLED = "cancelled"  # El hueco se liberó sin enviar la petición
+    
+    def __init__(self, requests_per_second: float = 20.0, burst: int = 40,
+                 initial_concurrency: int = 8, min_concurrency: int = 1,
+                 max_concurrency: int = 64, decrease_factor: float = 0.5,
+                 decrease_cooldown: float = 1.0):
+        """
+        Args:
+            requests_per_second: Tasa de reposición del token bucket.
+            burst: Capacidad del token bucket.
+            initial_concurrency: Límite inicial de peticiones en vuelo.
+            min_concurrency: Límite mínimo tras reducciones.
+            max_concurrency: Límite máximo tras incrementos.
+            decrease_factor: Factor multiplicativo aplicado al recibir un 429/5xx.
+            decrease_cooldown: Segundos mínimos entre dos reducciones, para que
+                una ráfaga de 429 de la misma ventana solo reduzca una vez.
+        """
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self._in_flight = 0
+        self._waiting = 0
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        
+        # Contadores
+        self.total_acquired = 0
+        self.total_throttled = 0
+        self.total_errors = 0
+    
+    def _refill(self, now: float):
+        """Repone tokens según el tiempo transcurrido"""
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.requests_per_second)
+    
+    def _try_acquire_locked(self, now: float) -> Optional[float]:
+        """
+        Intenta ocupar un hueco (requiere el lock).
+        Retorna None si lo consiguió o los segundos sugeridos de espera.
+        """
+        self._refill(now)
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._in_flight >= int(self._limit):
+            return 0.05  # Se despertará antes con notify al liberar un hueco
+        if self._tokens < 1.0:
+            return (1.0 - self._tokens) / self.requests_per_second
+        self._tokens -= 1.0
+        self._in_flight += 1
+        self.total_acquired += 1
+        return None
+    
+    def acquire(self):
+        """Bloquea el hilo actual hasta obtener token y hueco de concurrencia"""
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    wait = self._try_acquire_locked(time.monotonic())
+                    if wait is None:
+                        return
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiting -= 1
+    
+    async def acquire_async(self):
+        """Versión asíncrona de acquire() que no bloquea el event loop"""
+        with self._cond:
+            self._waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_acquire_locked(time.monotonic())
+                if wait is None:
+                    return
+                await asyncio.sleep(max(wait, 0.005))
+        finally:
+            with self._cond:
+                self._waiting -= 1
+    
+    def release(self, outcome: str = SUCCESS, retry_after: Optional[float] = None):
+        """
+        Libera el hueco y ajusta el límite según el resultado de la petición.
+        
+        Args:
+            outcome: "success", "throttled" (429/5xx/timeout), "error" o
+                "cancelled" (no ajusta el límite).
+            retry_after: Segundos indicados por el servidor antes de reintentar.
+        """
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            now = time.monotonic()
+            
+            if outcome == self.SUCCESS:
+                # Incremento aditivo: +1 por cada ventana completa de éxitos
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+            elif outcome == self.THROTTLED:
+                self.total_throttled += 1
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self._limit = max(float(self.min_concurrency), self._limit * self.decrease_factor)
+                    self._last_decrease = now
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+            elif outcome != self.CANCELLED:
+                self.total_errors += 1
+            
+            self._cond.notify_all()
+    
+    @property
+    def current_limit(self) -> int:
+        """Límite actual de peticiones en vuelo"""
+        return int(self._limit)
+    
+    def get_gauges(self) -> Dict:
+        """Retorna el estado actual del limitador para monitorización"""
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "current_limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "tokens_available": round(self._tokens, 2),
+                "paused_for": round(max(0.0, self._blocked_until - time.monotonic()), 2),
+                "total_acquired": self.total_acquired,
+                "total_throttled": self.total_throttled,
+                "total_errors": self.total_errors
+            }
+
+
+_shared_limiter: Optional[AdaptiveRateLimiter] = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_shared_limiter() -> AdaptiveRateLimiter:
+    """Retorna el limitador compartido por todo el proceso (se crea bajo demanda)"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveRateLimiter()
+        return _shared_limiter
+
+
+def configure_shared_limiter(**kwargs) -> AdaptiveRateLimiter:
+    """Reemplaza el limitador compartido por uno con la configuración dada"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        _shared_limiter = AdaptiveRateLimiter(**kwargs)
+        return _shared_limiter
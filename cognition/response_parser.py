@@ -34,9 +34,15 @@ class ResponseParser:
         
         # Registrar la decisión
         agent.last_action = action
-        day, hour, minute = self.world_config.get_current_time()
+        day, hour, minute = self._tick_time()
         agent.last_action_time = (day, hour, minute)
         
+        success, message = self._dispatch(agent, action, decision)
+        agent.last_action_success = success
+        return success, message
+    
+    def _dispatch(self, agent: Agent, action: str, decision: Dict) -> Tuple[bool, str]:
+        """Ejecuta la acción correspondiente"""
         if action == "buy":
             return self._execute_purchase(agent, decision)
         
@@ -93,7 +99,7 @@ class ResponseParser:
         
         if success:
             # Registrar evento
-            day, hour, minute = self.world_config.get_current_time()
+            day, hour, minute = self._tick_time()
             agent.memory.add_event(
                 timestamp=(day, hour, minute),
                 event_type="Purchase",
@@ -133,7 +139,7 @@ class ResponseParser:
         success = self.interaction_engine.move_agent(agent, target_coordinates, self.locations)
         
         if success:
-            day, hour, minute = self.world_config.get_current_time()
+            day, hour, minute = self._tick_time()
             agent.memory.add_event(
                 timestamp=(day, hour, minute),
                 event_type="Move",
@@ -148,7 +154,7 @@ class ResponseParser:
         """Ejecuta una acción de descanso"""
         agent.consume_energy("rest")  # Recupera energía
         
-        day, hour, minute = self.world_config.get_current_time()
+        day, hour, minute = self._tick_time()
         agent.memory.add_event(
             timestamp=(day, hour, minute),
             event_type="Rest",
@@ -170,7 +176,7 @@ class ResponseParser:
         if success:
             agent.consume_energy("eat")  # Recupera energía al comer
             
-            day, hour, minute = self.world_config.get_current_time()
+            day, hour, minute = self._tick_time()
             agent.memory.add_event(
                 timestamp=(day, hour, minute),
                 event_type="Eat",
@@ -190,7 +196,7 @@ class ResponseParser:
         # Generar ingresos por trabajar (simplificado)
         agent.money += 50.0
         
-        day, hour, minute = self.world_config.get_current_time()
+        day, hour, minute = self._tick_time()
         agent.memory.add_event(
             timestamp=(day, hour, minute),
             event_type="Work",
@@ -205,6 +211,10 @@ class ResponseParser:
         # Esta acción se manejará externamente cuando se detecten agentes cercanos
         return True, f"{agent.name} quiere chatear (requiere otro agente presente)"
     
+    def _tick_time(self) -> Tuple[int, int, int]:
+        """(día, hora, minuto) de la instantánea del tick, común a todas las decisiones"""
+        return self.world_config.get_snapshot(self.locations).time
+    
     def _find_similar_location(self, location_name: str) -> Optional[str]:
         """Encuentra una ubicación similar (manejo de alucinaciones)"""
         location_name_lower = location_name.lower()
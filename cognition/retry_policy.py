@@ -0,0 +1,120 @@
+"""
+Política de Reintentos
+Backoff exponencial con jitter, presupuesto de reintentos por tick y latencias para hedging
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class RetryPolicy:
+    """Configuración de reintentos y peticiones duplicadas (hedging)"""
+    
+    max_attempts: int = 3  # Intentos totales por llamada (1 = sin reintentos)
+    base_delay: float = 0.5  # Segundos del primer backoff
+    max_delay: float = 8.0  # Tope del backoff
+    retry_budget_per_tick: Optional[int] = 100  # Reintentos + duplicados por tick (None = sin límite)
+    retry_budget_window: Optional[float] = 60.0  # Segundos para renovarlo aunque no empiece un tick (None = solo por tick)
+    
+    # Hedging: si una petición supera el percentil de latencia, se lanza un duplicado
+    hedging: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_samples: int = 20  # Latencias necesarias antes de empezar a duplicar
+    
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Espera antes del reintento número `attempt` (1, 2, ...).
+        Usa "full jitter": un valor uniforme entre 0 y el backoff exponencial,
+        respetando el Retry-After del servidor si es mayor.
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class RetryBudget:
+    """
+    Presupuesto de reintentos compartido por todas las llamadas de un tick.
+    
+    Se restablece al comenzar cada tick y, además, cuando han pasado `window`
+    segundos desde el último restablecimiento, de modo que los usos sin ticks
+    (scripts, pruebas de carga) no se quedan sin reintentos para siempre.
+    """
+    
+    def __init__(self, limit: Optional[int], window: Optional[float] = None):
+        self.limit = limit
+        self.window = window
+        self._spent = 0
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+        self.exhausted_count = 0
+    
+    def _refill_if_expired(self):
+        """Renueva el presupuesto si la ventana de tiempo ha vencido (con el lock tomado)"""
+        if self.window is not None and time.monotonic() - self._window_start >= self.window:
+            self._spent = 0
+            self._window_start = time.monotonic()
+    
+    def try_spend(self) -> bool:
+        """Consume un reintento si queda presupuesto"""
+        with self._lock:
+            self._refill_if_expired()
+            if self.limit is not None and self._spent >= self.limit:
+                self.exhausted_count += 1
+                return False
+            self._spent += 1
+            return True
+    
+    def reset(self):
+        """Restablece el presupuesto (al comenzar un tick)"""
+        with self._lock:
+            self._spent = 0
+            self._window_start = time.monotonic()
+    
+    @property
+    def remaining(self) -> Optional[int]:
+        """Reintentos disponibles en el tick actual (None = sin límite)"""
+        if self.limit is None:
+            return None
+        with self._lock:
+            self._refill_if_expired()
+            return max(0, self.limit - self._spent)
+
+
+class LatencyTracker:
+    """Ventana deslizante de latencias de las llamadas correctas"""
+    
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, latency: float):
+        """Añade una latencia (segundos)"""
+        with self._lock:
+            self._samples.append(latency)
+    
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Retorna el percentil q (0-1) o None si no hay suficientes muestras"""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+    
+    def get_stats(self) -> Dict:
+        """Retorna p50, p95 y número de muestras"""
+        with self._lock:
+            count = len(self._samples)
+        return {
+            "samples": count,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95)
+        }
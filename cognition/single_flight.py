@@ -0,0 +1,124 @@
+"""
+Coalescencia de Peticiones en Vuelo
+Agrupa llamadas idénticas simultáneas en una sola petición al LLM
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class _Flight:
+    """Petición en curso compartida por el líder y sus seguidores"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class _LeaderCancelled(Exception):
+    """Marca la ejecución asíncrona cuyo líder se canceló (los seguidores la repiten)"""
+
+
+class SingleFlight:
+    """
+    Garantiza que para una misma clave solo haya una ejecución en curso.
+    Las llamadas que llegan mientras tanto esperan y reciben el mismo
+    resultado (o la misma excepción) que la primera. En ado(), si se cancela
+    la corrutina líder, los seguidores no heredan la cancelación: repiten la
+    llamada (uno pasa a ser el nuevo líder).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[Tuple[int, str], "asyncio.Future"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecuta fn() una sola vez por clave en curso.
+        Retorna (resultado, compartido) donde compartido es True si la llamada
+        reutilizó la ejecución de otro hilo.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.leaders += 1
+                leader = True
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+    
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Versión asíncrona de do() para corrutinas del mismo event loop.
+        Si la corrutina líder se cancela, los seguidores repiten la llamada.
+        """
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            future = self._async_flights.get(loop_key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self._async_flights[loop_key] = future
+                self.leaders += 1
+                leader = True
+        
+        if not leader:
+            try:
+                return await asyncio.shield(future), True
+            except _LeaderCancelled:
+                # Se canceló el líder, no este seguidor: se repite la llamada
+                return await self.ado(key, fn)
+        
+        try:
+            result = await fn()
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(_LeaderCancelled() if isinstance(e, asyncio.CancelledError) else e)
+                # Evita el aviso "exception was never retrieved" si nadie espera
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._async_flights[loop_key]
+    
+    def get_stats(self) -> Dict:
+        """Retorna cuántas llamadas ejecutaron la petición y cuántas se agruparon"""
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": self.coalesced / total if total else 0.0,
+                "in_flight": len(self._flights) + len(self._async_flights)
+            }
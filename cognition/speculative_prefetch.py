@@ -0,0 +1,100 @@
+"""
+Prebúsqueda Especulativa
+Lanza las llamadas del reactor del siguiente tick mientras se termina el actual
+"""
+
+import concurrent.futures
+import copy
+import threading
+from typing import Dict, List, Optional, Tuple
+from models.agent import Agent
+from models.world_config import WorldConfig
+
+
+class SpeculativePrefetcher:
+    """
+    Guarda las peticiones del Action Reactor lanzadas por adelantado para el
+    tick siguiente, junto con el prompt con el que se lanzaron.
+    
+    En el tick siguiente la decisión solo se usa si el prompt construido con
+    el estado real coincide byte a byte con el prompt previsto; en ese caso
+    la llamada habría sido idéntica. Si no coincide, se descarta.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # agent_id -> ((día, hora) previstos, prompt, futuro con la decisión)
+        self._pending: Dict[str, Tuple[Tuple[int, int], str, concurrent.futures.Future]] = {}
+        
+        # Contadores
+        self.issued = 0
+        self.used = 0
+        self.mismatched = 0
+        self.discarded = 0
+    
+    @staticmethod
+    def next_world(world_config: WorldConfig) -> WorldConfig:
+        """Copia del mundo avanzada un tick (no modifica el original)"""
+        next_config = copy.copy(world_config)
+        next_config.advance_time()
+        return next_config
+    
+    @staticmethod
+    def predict_agent(agent: Agent, energy_decay: float) -> Agent:
+        """Copia superficial del agente con la energía prevista tras el siguiente tick"""
+        predicted = copy.copy(agent)
+        predicted.energy = max(0.0, agent.energy - energy_decay)
+        return predicted
+    
+    def add(self, agent_id: str, tick: Tuple[int, int], prompt: str,
+            future: concurrent.futures.Future):
+        """Registra una petición especulativa (reemplaza la anterior del agente)"""
+        with self._lock:
+            previous = self._pending.pop(agent_id, None)
+            self._pending[agent_id] = (tick, prompt, future)
+            self.issued += 1
+            if previous is not None:
+                self.discarded += 1
+    
+    def has_pending(self, agent_id: str) -> bool:
+        """True si hay una petición especulativa para el agente"""
+        with self._lock:
+            return agent_id in self._pending
+    
+    def take(self, agent_id: str, tick: Tuple[int, int],
+             actual_prompt: str) -> Optional[concurrent.futures.Future]:
+        """
+        Retira la petición especulativa del agente.
+        Retorna su futuro si se lanzó para este tick con el mismo prompt, o None.
+        """
+        with self._lock:
+            entry = self._pending.pop(agent_id, None)
+            if entry is None:
+                return None
+            predicted_tick, prompt, future = entry
+            if predicted_tick != tick or prompt != actual_prompt:
+                self.mismatched += 1
+                future.cancel()
+                return None
+            self.used += 1
+            return future
+    
+    def discard_stale(self, tick: Tuple[int, int]):
+        """Descarta las peticiones lanzadas para ticks anteriores al actual"""
+        with self._lock:
+            stale = [agent_id for agent_id, entry in self._pending.items() if entry[0] != tick]
+            for agent_id in stale:
+                self._pending.pop(agent_id)[2].cancel()
+            self.discarded += len(stale)
+    
+    def get_stats(self) -> Dict:
+        """Retorna peticiones lanzadas, aprovechadas, descartadas y pendientes"""
+        with self._lock:
+            return {
+                "issued": self.issued,
+                "used": self.used,
+                "mismatched": self.mismatched,
+                "discarded": self.discarded,
+                "pending": len(self._pending),
+                "hit_rate": self.used / self.issued if self.issued else 0.0
+            }
@@ -0,0 +1,281 @@
+"""
+Planificador de Ticks
+Presupuesto de llamadas al LLM por tick con prioridades y alternativas baratas
+"""
+
+import concurrent.futures
+import math
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from models.agent import Agent
+from cognition.decision_maker import DecisionMaker
+from cognition.llm_client import cancellation_scope
+from cognition.utility_policy import UtilityPolicy
+from cognition.usage_tracker import CALL_ACTION_REACTOR
+
+
+# Motivos por los que una decisión no pasó por el LLM
+FALLBACK_MAX_CALLS = "max_calls"
+FALLBACK_MAX_TOKENS = "max_tokens"
+FALLBACK_DEADLINE = "deadline"
+
+URGENCY_SCORES = {"high": 3.0, "medium": 1.5, "low": 0.0}
+
+
+@dataclass
+class TickBudget:
+    """Límites de la fase del reactor en un tick (None = sin límite)"""
+    
+    max_calls: Optional[int] = None  # Llamadas al reactor por tick
+    max_tokens: Optional[int] = None  # Tokens estimados (entrada + salida) por tick
+    deadline_seconds: Optional[float] = None  # Tiempo de reloj máximo de la fase
+    default_tokens_per_call: int = 1200  # Estimación hasta tener datos de uso reales
+
+
+class TickScheduler:
+    """
+    Reparte un presupuesto de llamadas, tokens y tiempo por tick entre los
+    agentes que necesitan el Action Reactor.
+    
+    Los agentes con una petición especulativa válida (ver
+    DecisionMaker.prefetch_next_tick) usan esa respuesta sin gastar
+    presupuesto. El resto se ordena por prioridad (urgencia de su última
+    decisión, energía baja, descuento activo cerca y horas desde su última
+    decisión del LLM). Los que no caben en el presupuesto, o cuya llamada no
+    termina antes del plazo, siguen su plan anterior o, si no lo hay, la
+    política barata de reserva.
+    
+    Al vencer el plazo, las llamadas que aún esperan hueco (en la cola del
+    ejecutor o en el limitador) se abandonan sin enviarse. Las que ya estaban en la red no se pueden retirar: se ignoran
+    y ocupan presupuesto del tick siguiente.
+    """
+    
+    def __init__(self, decision_maker: DecisionMaker, budget: Optional[TickBudget] = None,
+                 fallback: Optional[UtilityPolicy] = None, discount_radius: float = 3.0):
+        """
+        Args:
+            decision_maker: DecisionMaker cuyas llamadas se planifican.
+            budget: Límites por tick.
+            fallback: Política sin LLM para los agentes sin plan que no caben.
+            discount_radius: Distancia a la que un descuento activo cuenta como "cerca".
+        """
+        self.decision_maker = decision_maker
+        self.budget = budget or TickBudget()
+        self.fallback = fallback
+        self.discount_radius = discount_radius
+        self._last_urgency: Dict[str, str] = {}
+        self._last_llm_hour: Dict[str, int] = {}
+        # Llamadas en vuelo al vencer el plazo del tick anterior
+        self._late_calls: List[concurrent.futures.Future] = []
+        
+        # Contadores
+        self.llm_decisions = 0
+        self.fallback_counts: Counter = Counter()
+        self.last_tick: Dict = {}
+    
+    def decide_actions(self, agents: List[Agent], follow_plan: bool = True) -> Dict[str, Dict]:
+        """
+        Decide las acciones del tick respetando el presupuesto.
+        Retorna un diccionario {agent_id: decision}
+        
+        Args:
+            follow_plan: Si es True, los agentes sin disparadores siguen su plan
+                sin gastar presupuesto (como decide_actions_following_plan()).
+        """
+        started = time.monotonic()
+        if follow_plan:
+            results, reactor_agents, plan_items = self.decision_maker.split_by_plan(agents)
+        else:
+            results, reactor_agents, plan_items = {}, list(agents), {}
+        
+        # Las respuestas ya adelantadas no cuentan contra el presupuesto
+        prefetched, reactor_candidates = self.decision_maker.split_prefetched(reactor_agents, plan_items)
+        ranked = sorted(reactor_candidates, key=self.priority, reverse=True)
+        carried = self._carried_calls()
+        admitted, rejected = self._admit(ranked, carried)
+        
+        decisions, late = self._run(admitted, plan_items, started, {
+            prefetched[agent.agent_id]: agent for agent in reactor_agents if agent.agent_id in prefetched
+        })
+        results.update(decisions)
+        
+        fallbacks = rejected + [(agent, FALLBACK_DEADLINE) for agent in late]
+        for agent, reason in fallbacks:
+            results[agent.agent_id] = self._fallback_decision(agent, reason)
+            self.fallback_counts[reason] += 1
+        
+        self.llm_decisions += len(decisions)
+        self.last_tick = {
+            "reactor_candidates": len(reactor_agents),
+            "prefetched": len(prefetched),
+            "carried_calls": carried,
+            "llm_decisions": len(decisions),
+            "fallbacks": len(fallbacks),
+            "late_calls": len(self._late_calls),
+            "seconds": round(time.monotonic() - started, 3)
+        }
+        return results
+    
+    def priority(self, agent: Agent) -> float:
+        """Prioridad del agente para recibir una llamada al LLM (mayor = antes)"""
+        score = URGENCY_SCORES.get(self._last_urgency.get(agent.agent_id, "medium"), 1.5)
+        score += (100.0 - agent.energy) / 25.0
+        if self._discount_nearby(agent):
+            score += 2.0
+        last_hour = self._last_llm_hour.get(agent.agent_id)
+        hours_since = self._absolute_hour() - last_hour if last_hour is not None else 24
+        score += min(hours_since, 24) / 8.0
+        return score
+    
+    def _admit(self, ranked: List[Agent], carried: int = 0) -> Tuple[List[Agent], List[Tuple[Agent, str]]]:
+        """
+        Reparte el presupuesto de llamadas y tokens por orden de prioridad.
+        `carried` llamadas tardías del tick anterior ya ocupan parte de él.
+        """
+        budget = self.budget
+        tokens_per_call = self._estimated_tokens_per_call()
+        admitted = []
+        rejected = []
+        for agent in ranked:
+            calls = carried + len(admitted)
+            if budget.max_calls is not None and calls >= budget.max_calls:
+                rejected.append((agent, FALLBACK_MAX_CALLS))
+            elif budget.max_tokens is not None and (calls + 1) * tokens_per_call > budget.max_tokens:
+                rejected.append((agent, FALLBACK_MAX_TOKENS))
+            else:
+                admitted.append(agent)
+        return admitted, rejected
+    
+    def _carried_calls(self) -> int:
+        """
+        Llamadas tardías del tick anterior que cuentan contra este: las que siguen
+        en vuelo y las que llegaron a enviarse (no se abandonaron al cancelarlas).
+        """
+        carried = 0
+        for future in self._late_calls:
+            if not future.done():
+                carried += 1
+                continue
+            try:
+                decision = future.result()
+            except Exception:
+                carried += 1
+                continue
+            if not (isinstance(decision, dict) and decision.get("cancelled")):
+                carried += 1
+        self._late_calls = []
+        return carried
+    
+    def _run(self, admitted: List[Agent], plan_items: Dict[str, Dict], started: float,
+             prefetched: Optional[Dict[concurrent.futures.Future, Agent]] = None
+             ) -> Tuple[Dict[str, Dict], List[Agent]]:
+        """
+        Lanza las llamadas admitidas en orden de prioridad y espera hasta el plazo,
+        junto con las peticiones especulativas ya lanzadas ({futuro: agente}).
+        Si la cola del ejecutor está llena, encolar también cuenta contra el
+        plazo: los agentes que no llegan a encolarse a tiempo no se envían.
+        Retorna (decisiones obtenidas, agentes cuya llamada no terminó a tiempo).
+        """
+        deadline = None
+        if self.budget.deadline_seconds is not None:
+            deadline = started + self.budget.deadline_seconds
+        
+        cancel_event = threading.Event()
+        future_to_agent = dict(prefetched or {})
+        unsent = []
+        for agent in admitted:
+            # Vencido el plazo (o llena la cola hasta entonces) ya no se encola nada más
+            future = None
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not unsent and (remaining is None or remaining > 0):
+                future = self.decision_maker.executor.submit_within(
+                    remaining, self._decide_cancellable, agent, plan_items.get(agent.agent_id), cancel_event
+                )
+            if future is None:
+                unsent.append(agent)
+            else:
+                future_to_agent[future] = agent
+        
+        timeout = None
+        if deadline is not None:
+            timeout = max(0.0, deadline - time.monotonic())
+        done, not_done = concurrent.futures.wait(future_to_agent, timeout=timeout)
+        
+        decisions = {}
+        now = self._absolute_hour()
+        for future in done:
+            agent = future_to_agent[future]
+            try:
+                decision = future.result()
+            except Exception as e:
+                print(f"Error al decidir para {agent.name}: {e}")
+                decision = {"action": "rest", "reasoning": str(e)}
+            decisions[agent.agent_id] = decision
+            self._last_urgency[agent.agent_id] = str(decision.get("urgency", "medium")).lower()
+            self._last_llm_hour[agent.agent_id] = now
+        
+        # Las que aún no empezaron se cancelan; las que esperan hueco se abandonan
+        # sin enviarse y las que ya están en la red se ignoran y pasan al tick siguiente
+        cancel_event.set()
+        late = list(unsent)
+        for future in not_done:
+            if not future.cancel():
+                self._late_calls.append(future)
+            late.append(future_to_agent[future])
+        return decisions, late
+    
+    def _decide_cancellable(self, agent: Agent, plan_item: Optional[Dict],
+                            cancel_event: threading.Event) -> Dict:
+        """decide_action() dentro del ámbito de cancelación del tick"""
+        with cancellation_scope(cancel_event):
+            return self.decision_maker.decide_action(agent, plan_item)
+    
+    def _fallback_decision(self, agent: Agent, reason: str) -> Dict:
+        """Plan anterior si cubre la hora; si no, la política barata; si no, descansar"""
+        hour = self.decision_maker.world_config.current_hour
+        decision = self.decision_maker.plan_follower.get_plan_decision(agent, hour)
+        if decision is None and self.fallback is not None:
+            decision = self.fallback.decide_action(agent)
+        if decision is None:
+            decision = {"action": "rest", "target_location": None, "target_product": None,
+                        "reasoning": "Sin presupuesto de LLM en este tick, descansando"}
+        decision = dict(decision)
+        decision["fallback"] = reason
+        return decision
+    
+    def _estimated_tokens_per_call(self) -> int:
+        """Tokens medios por llamada del reactor según el uso registrado"""
+        totals = self.decision_maker.llm_client.usage_tracker.get_totals_by_call_type().get(CALL_ACTION_REACTOR)
+        if totals and totals["api_calls"] and totals["total_tokens"]:
+            return max(1, totals["total_tokens"] // totals["api_calls"])
+        return self.budget.default_tokens_per_call
+    
+    def _discount_nearby(self, agent: Agent) -> bool:
+        """True si hay un descuento activo a menos de discount_radius del agente"""
+        locations = self.decision_maker.locations
+        snapshot = self.decision_maker.world_config.get_snapshot(locations)
+        x, y = agent.coordinates
+        for location_name in snapshot.discounts:
+            location = locations.get(location_name)
+            if location is None:
+                continue
+            lx, ly = location.coordinates
+            if math.hypot(lx - x, ly - y) <= self.discount_radius:
+                return True
+        return False
+    
+    def _absolute_hour(self) -> int:
+        """Horas simuladas desde el inicio"""
+        day, hour, minute = self.decision_maker.world_config.get_current_time()
+        return day * 24 + hour
+    
+    def get_stats(self) -> Dict:
+        """Retorna decisiones del LLM, alternativas por motivo y el último tick"""
+        return {
+            "llm_decisions": self.llm_decisions,
+            "fallbacks": dict(self.fallback_counts),
+            "last_tick": dict(self.last_tick)
+        }
@@ -0,0 +1,239 @@
+"""
+Contabilidad de Uso del LLM
+Registra tokens, latencia, reintentos y coste de cada llamada por tick y por día
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, List, Optional, Tuple
+
+
+# Tipos de llamada del DecisionMaker
+CALL_DAILY_PLANNER = "daily_planner"
+CALL_ACTION_REACTOR = "action_reactor"
+CALL_BATCHED_REACTOR = "batched_reactor"
+CALL_CONVERSATION = "conversation"
+CALL_OTHER = "other"
+
+
+@dataclass
+class CallRecord:
+    """Registro de una llamada al LLM"""
+    call_type: str
+    agent_id: Optional[str]
+    day: Optional[int]
+    hour: Optional[int]
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float  # Segundos de reloj, incluyendo reintentos y esperas
+    retries: int
+    outcome: str  # "ok", "error", "cancelled", "cache_hit", "replay", "coalesced"
+    cost: float  # USD estimados
+    batch_agent_ids: Optional[Tuple[str, ...]] = None  # Agentes de una llamada por lotes (sin agent_id)
+
+
+class UsageTracker:
+    """
+    Acumula registros de llamadas y agrega totales por tick, por día,
+    por tipo de llamada, por agente y globales. Es seguro entre hilos.
+    """
+    
+    def __init__(self, prompt_price_per_million: float = 0.27,
+                 completion_price_per_million: float = 1.10,
+                 max_records: int = 20000):
+        """
+        Args:
+            prompt_price_per_million: USD por millón de tokens de entrada.
+            completion_price_per_million: USD por millón de tokens de salida.
+            max_records: Registros individuales conservados (los agregados no se pierden).
+        """
+        self.prompt_price_per_million = prompt_price_per_million
+        self.completion_price_per_million = completion_price_per_million
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+        self._current_tick: Tuple[Optional[int], Optional[int]] = (None, None)
+        
+        self._totals = self._empty_totals()
+        self._tick_totals: Dict[Tuple[int, int], Dict] = {}
+        self._day_totals: Dict[int, Dict] = {}
+        self._type_totals: Dict[str, Dict] = {}
+        self._agent_totals: Dict[str, Dict] = {}
+    
+    @staticmethod
+    def _empty_totals() -> Dict:
+        """Agregado vacío"""
+        return {
+            "calls": 0,
+            "api_calls": 0,
+            "errors": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "cancelled": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "retries": 0,
+            "latency_total": 0.0,
+            "cost": 0.0
+        }
+    
+    def set_tick(self, day: int, hour: int):
+        """Fija el tick al que se asignan las llamadas siguientes"""
+        with self._lock:
+            self._current_tick = (day, hour)
+    
+    def estimate_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        """Coste estimado en USD de una llamada"""
+        return (prompt_tokens * self.prompt_price_per_million +
+                completion_tokens * self.completion_price_per_million) / 1_000_000
+    
+    def record(self, call_type: str, agent_id: Optional[str], model: str,
+               usage: Optional[Dict], latency: float, retries: int, outcome: str,
+               batch_agent_ids: Optional[List[str]] = None):
+        """
+        Registra una llamada.
+        
+        Args:
+            usage: Campo "usage" de la respuesta de la API (puede ser None).
+            outcome: "ok", "error", "cancelled" (abandonada sin enviarse),
+                "cache_hit", "replay" o "coalesced".
+            batch_agent_ids: Agentes de una llamada por lotes. La llamada se
+                registra sin agent_id y sus tokens se reparten entre ellos en
+                los totales por agente.
+        """
+        usage = usage or {}
+        prompt_tokens = int(usage.get("prompt_tokens", 0) or 0)
+        completion_tokens = int(usage.get("completion_tokens", 0) or 0)
+        
+        with self._lock:
+            day, hour = self._current_tick
+            record = CallRecord(
+                call_type=call_type,
+                agent_id=agent_id,
+                day=day,
+                hour=hour,
+                model=model,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                latency=latency,
+                retries=retries,
+                outcome=outcome,
+                cost=self.estimate_cost(prompt_tokens, completion_tokens),
+                batch_agent_ids=tuple(batch_agent_ids) if batch_agent_ids else None
+            )
+            self._records.append(record)
+            
+            buckets = [self._totals, self._type_totals.setdefault(call_type, self._empty_totals())]
+            if day is not None:
+                buckets.append(self._day_totals.setdefault(day, self._empty_totals()))
+                buckets.append(self._tick_totals.setdefault((day, hour), self._empty_totals()))
+            for bucket in buckets:
+                self._accumulate(bucket, record)
+            
+            if record.batch_agent_ids:
+                for share in self._split_batch(record):
+                    self._accumulate(self._agent_totals.setdefault(share.agent_id, self._empty_totals()), share)
+            elif agent_id is not None:
+                self._accumulate(self._agent_totals.setdefault(agent_id, self._empty_totals()), record)
+    
+    def _split_batch(self, record: CallRecord) -> List[CallRecord]:
+        """
+        Reparte los tokens y el coste de una llamada por lotes entre sus agentes.
+        El resto de la división entera va a los primeros; la latencia no se
+        reparte porque todos esperaron la llamada completa.
+        """
+        count = len(record.batch_agent_ids)
+        shares = []
+        for index, agent_id in enumerate(record.batch_agent_ids):
+            prompt_tokens = record.prompt_tokens // count + (1 if index < record.prompt_tokens % count else 0)
+            completion_tokens = (record.completion_tokens // count +
+                                 (1 if index < record.completion_tokens % count else 0))
+            shares.append(replace(
+                record,
+                agent_id=agent_id,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                retries=record.retries if index == 0 else 0,
+                cost=self.estimate_cost(prompt_tokens, completion_tokens),
+                batch_agent_ids=None
+            ))
+        return shares
+    
+    def _accumulate(self, bucket: Dict, record: CallRecord):
+        """Suma un registro a un agregado"""
+        bucket["calls"] += 1
+        if record.outcome in ("ok", "error"):
+            bucket["api_calls"] += 1
+        if record.outcome == "error":
+            bucket["errors"] += 1
+        if record.outcome in ("cache_hit", "replay"):
+            bucket["cache_hits"] += 1
+        if record.outcome == "coalesced":
+            bucket["coalesced"] += 1
+        if record.outcome == "cancelled":
+            bucket["cancelled"] += 1
+        bucket["prompt_tokens"] += record.prompt_tokens
+        bucket["completion_tokens"] += record.completion_tokens
+        bucket["retries"] += record.retries
+        bucket["latency_total"] += record.latency
+        bucket["cost"] += record.cost
+    
+    def _finalize(self, bucket: Optional[Dict]) -> Dict:
+        """Copia un agregado añadiendo métricas derivadas"""
+        result = dict(bucket or self._empty_totals())
+        result["total_tokens"] = result["prompt_tokens"] + result["completion_tokens"]
+        result["avg_latency"] = result["latency_total"] / result["calls"] if result["calls"] else 0.0
+        return result
+    
+    def get_tick_totals(self, day: Optional[int] = None, hour: Optional[int] = None) -> Dict:
+        """Totales de un tick (por defecto el actual)"""
+        with self._lock:
+            if day is None or hour is None:
+                day, hour = self._current_tick
+            return self._finalize(self._tick_totals.get((day, hour)))
+    
+    def get_day_totals(self, day: Optional[int] = None) -> Dict:
+        """Totales de un día simulado (por defecto el actual)"""
+        with self._lock:
+            if day is None:
+                day = self._current_tick[0]
+            return self._finalize(self._day_totals.get(day))
+    
+    def get_totals(self) -> Dict:
+        """Totales de toda la ejecución"""
+        with self._lock:
+            return self._finalize(self._totals)
+    
+    def get_totals_by_call_type(self) -> Dict[str, Dict]:
+        """Totales agrupados por tipo de llamada"""
+        with self._lock:
+            return {call_type: self._finalize(bucket) for call_type, bucket in self._type_totals.items()}
+    
+    def get_totals_by_agent(self) -> Dict[str, Dict]:
+        """Totales agrupados por agente, con las llamadas por lotes repartidas entre sus agentes"""
+        with self._lock:
+            return {agent_id: self._finalize(bucket) for agent_id, bucket in self._agent_totals.items()}
+    
+    def get_daily_series(self) -> List[Dict]:
+        """Lista de totales por día, ordenada, para gráficos"""
+        with self._lock:
+            return [dict(day=day, **self._finalize(bucket)) for day, bucket in sorted(self._day_totals.items())]
+    
+    def get_records(self, limit: Optional[int] = None) -> List[Dict]:
+        """Últimos registros individuales como diccionarios"""
+        with self._lock:
+            records = list(self._records)
+        if limit is not None:
+            records = records[-limit:]
+        return [asdict(record) for record in records]
+    
+    def reset(self):
+        """Borra todos los registros y agregados"""
+        with self._lock:
+            self._records.clear()
+            self._totals = self._empty_totals()
+            self._tick_totals.clear()
+            self._day_totals.clear()
+            self._type_totals.clear()
+            self._agent_totals.clear()
@@ -0,0 +1,220 @@
+"""
+Política de Utilidad
+Backend de decisiones determinista y sin LLM basado en reglas de utilidad
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from models.agent import Agent
+from models.location import Location
+from models.world_config import WorldConfig
+from engine.transaction_system import TransactionSystem
+
+
+@dataclass
+class UtilityWeights:
+    """Pesos de la función de utilidad de cada acción"""
+    
+    rest: float = 1.0  # Peso de la fatiga en descansar
+    eat: float = 1.2  # Peso del hambre en comer del inventario
+    work: float = 0.8  # Utilidad de trabajar en horario laboral
+    buy: float = 1.0  # Peso de la necesidad al comprar
+    discount: float = 1.0  # Multiplicador del descuento sobre la utilidad de compra
+    price: float = 1.0  # Penalización por precio relativo al dinero disponible
+    go_home: float = 0.6  # Utilidad de volver a casa por la noche
+    work_start_hour: int = 9
+    work_end_hour: int = 17
+    night_hour: int = 21
+
+
+# Ajustes de pesos por rasgo de personalidad
+TRAIT_MODIFIERS: Dict[str, Dict[str, float]] = {
+    "thrifty": {"price": 2.0, "discount": 1.5},
+    "impulsive": {"buy": 1.4, "discount": 1.8, "price": 0.5},
+    "health_conscious": {"rest": 1.2},
+    "introvert": {"rest": 1.1, "go_home": 1.3},
+    "extrovert": {"go_home": 0.7},
+    "social": {"go_home": 0.7}
+}
+
+
+class UtilityPolicy:
+    """
+    Alternativa a DecisionMaker que no llama al LLM.
+    
+    Puntúa cada acción (buy, move, rest, eat, work) a partir de las necesidades
+    del agente, sus rasgos de personalidad, los precios finales de
+    TransactionSystem.calculate_price y los descuentos activos, y devuelve la
+    misma estructura de decisión que consume ResponseParser. Los precios se
+    calculan una vez por tick, así que cada decisión solo recorre las ofertas.
+    """
+    
+    def __init__(self, world_config: WorldConfig, locations: Dict[str, Location],
+                 transaction_system: TransactionSystem,
+                 weights: Optional[UtilityWeights] = None):
+        self.world_config = world_config
+        self.locations = locations
+        self.transaction_system = transaction_system
+        self.weights = weights or UtilityWeights()
+        self._offers_tick: Optional[Tuple[int, int]] = None
+        # (ubicación, producto, precio final, descuento, cubre comestibles)
+        self._offers: List[Tuple[Location, str, float, float, bool]] = []
+        self._trait_weights: Dict[Tuple[str, ...], UtilityWeights] = {}
+        self.decisions = 0
+    
+    def begin_tick(self):
+        """Recalcula precios y descuentos del tick actual"""
+        day, hour, minute = self.world_config.get_current_time()
+        self._offers_tick = (day, hour)
+        self._offers = []
+        snapshot = self.world_config.get_snapshot(self.locations)
+        for location in self.locations.values():
+            discount = snapshot.get_discount(location.name)
+            for product_name in location.inventory:
+                price = self.transaction_system.calculate_price(location, product_name)
+                if price is None:
+                    continue
+                is_grocery = location.location_type == "Grocery"
+                self._offers.append((location, product_name, price, discount, is_grocery))
+    
+    def _ensure_tick(self):
+        """Recalcula las ofertas si cambió la hora desde el último begin_tick()"""
+        day, hour, minute = self.world_config.get_current_time()
+        if self._offers_tick != (day, hour):
+            self.begin_tick()
+    
+    def _weights_for(self, agent: Agent) -> UtilityWeights:
+        """Pesos ajustados por los rasgos del agente (memorizados por combinación de rasgos)"""
+        traits = tuple(sorted(agent.personality_traits))
+        weights = self._trait_weights.get(traits)
+        if weights is None:
+            values = dict(vars(self.weights))
+            for trait in traits:
+                for name, factor in TRAIT_MODIFIERS.get(trait, {}).items():
+                    values[name] *= factor
+            weights = UtilityWeights(**values)
+            self._trait_weights[traits] = weights
+        return weights
+    
+    def score_actions(self, agent: Agent) -> List[Tuple[float, Dict]]:
+        """Retorna las acciones candidatas con su utilidad, de mayor a menor"""
+        candidates = sorted(self._candidates(agent), key=lambda candidate: candidate[0], reverse=True)
+        return [(score, self._decision(*args)) for score, args in candidates]
+    
+    def _candidates(self, agent: Agent) -> List[Tuple[float, tuple]]:
+        """
+        Acciones candidatas como (utilidad, argumentos de _decision).
+        El diccionario de la decisión solo se construye para la elegida.
+        """
+        self._ensure_tick()
+        weights = self._weights_for(agent)
+        hour = self.world_config.current_hour
+        hunger = (100.0 - agent.energy) / 100.0
+        grocery_need = (100.0 - agent.grocery_level) / 100.0
+        at_home = agent.current_location == agent.home_location
+        working_hours = weights.work_start_hour <= hour < weights.work_end_hour
+        
+        candidates = [
+            (weights.rest * hunger * (1.2 if at_home else 1.0), ("rest", None, None, "Recuperar energía"))
+        ]
+        
+        if agent.inventory:
+            candidates.append((weights.eat * hunger, ("eat", None, None, "Comer del inventario")))
+        
+        if agent.work_location and working_hours and agent.energy > 20.0:
+            if agent.current_location == agent.work_location:
+                candidates.append((weights.work, ("work", None, None, "Horario laboral")))
+            else:
+                candidates.append((weights.work * 0.9, ("move", agent.work_location, None, "Ir al trabajo")))
+        
+        if hour >= weights.night_hour and not at_home:
+            candidates.append((weights.go_home, ("move", agent.home_location, None, "Volver a casa")))
+        
+        best_offer = self._best_offer(agent, weights, hunger, grocery_need)
+        if best_offer:
+            candidates.append(best_offer)
+        
+        return candidates
+    
+    def _best_offer(self, agent: Agent, weights: UtilityWeights,
+                    hunger: float, grocery_need: float) -> Optional[Tuple[float, tuple]]:
+        """Compra con mayor utilidad entre las ofertas asequibles con stock"""
+        money = agent.money
+        if money <= 0:
+            return None
+        
+        best_score = 0.0
+        best = None
+        for location, product_name, price, discount, is_grocery in self._offers:
+            if price > money or location.inventory[product_name]["stock"] <= 0:
+                continue
+            need = grocery_need if is_grocery else hunger
+            score = weights.buy * need * (1.0 + weights.discount * discount) - weights.price * price / money
+            if score > best_score:
+                best_score = score
+                best = (location, product_name, price, discount)
+        
+        if best is None:
+            return None
+        location, product_name, price, discount = best
+        reasoning = f"Comprar {product_name} por ${price:.2f}"
+        if discount > 0:
+            reasoning += f" con {discount * 100:.0f}% de descuento"
+        return best_score, ("buy", location.name, product_name, reasoning)
+    
+    @staticmethod
+    def _decision(action: str, target_location: Optional[str] = None,
+                  target_product: Optional[str] = None, reasoning: str = "") -> Dict:
+        """Decisión con el formato de ResponseParser"""
+        return {
+            "action": action,
+            "target_location": target_location,
+            "target_product": target_product,
+            "reasoning": reasoning,
+            "source": "utility"
+        }
+    
+    # ---- Interfaz compatible con DecisionMaker ----
+    
+    def decide_action(self, agent: Agent, current_plan_item: Optional[Dict] = None) -> Dict:
+        """Acción con mayor utilidad para el agente (el plan se ignora)"""
+        self.decisions += 1
+        score, args = max(self._candidates(agent), key=lambda candidate: candidate[0])
+        return self._decision(*args)
+    
+    def decide_actions_parallel(self, agents: List[Agent],
+                                plan_items: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """Decide para todos los agentes en el hilo actual (no hay E/S que paralelizar)"""
+        self._ensure_tick()
+        return {agent.agent_id: self.decide_action(agent) for agent in agents}
+    
+    def decide_actions_following_plan(self, agents: List[Agent], batch_size: int = 0) -> Dict[str, Dict]:
+        """Equivalente a decide_actions_parallel(): decidir no cuesta llamadas"""
+        return self.decide_actions_parallel(agents)
+    
+    def plan_daily_parallel(self, agents: List[Agent]) -> Dict[str, Dict]:
+        """La política decide hora a hora, así que los planes quedan vacíos"""
+        return {
+            agent.agent_id: {"plan": [], "reasoning": "Política de utilidad: sin plan diario"}
+            for agent in agents
+        }
+    
+    def generate_conversation(self, agent: Agent, other_agent: Agent) -> Dict:
+        """Conversación de plantilla; la afinidad cambia según los rasgos compartidos"""
+        shared = set(agent.personality_traits) & set(other_agent.personality_traits)
+        change = 0.05 + 0.05 * len(shared)
+        if "introvert" in agent.personality_traits or "introvert" in other_agent.personality_traits:
+            change -= 0.05
+        return {
+            "dialogue": f"{agent.name}: Hola, {other_agent.name}!\n{other_agent.name}: Hola, {agent.name}!",
+            "topic": "saludo",
+            "relationship_change": round(change, 2),
+            "reasoning": f"Rasgos compartidos: {', '.join(sorted(shared)) or 'ninguno'}"
+        }
+    
+    def generate_conversations_parallel(self, pairs: List[Tuple[Agent, Agent]]) -> List[Dict]:
+        """Una conversación de plantilla por pareja, en el mismo orden"""
+        return [self.generate_conversation(agent, other_agent) for agent, other_agent in pairs]
+    
+    def shutdown(self, wait: bool = True):
+        """No hay recursos que liberar; existe por compatibilidad con DecisionMaker"""
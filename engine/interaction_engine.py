@@ -3,18 +3,128 @@ Motor de Interacciones
 Gestiona la física del mundo y los encuentros entre agentes
 """
 
-from typing import List, Dict, Set, Tuple, Optional
+from typing import Iterator, List, Dict, Set, Tuple, Optional
 from models.agent import Agent
 from models.location import Location
 from models.world_config import WorldConfig
 import math
+import threading
 
 
 class InteractionEngine:
-    """Gestiona interacciones espaciales y físicas entre agentes"""
+    """
+    Gestiona interacciones espaciales y físicas entre agentes.
+    
+    Mantiene un índice de agentes por ubicación y por celda del mapa para
+    consultar los vecinos de un agente sin recorrer la lista completa:
+    index_agents() lo reconstruye al inicio del tick y move_agent() lo
+    actualiza con cada movimiento.
+    """
     
     def __init__(self, world_config: WorldConfig):
         self.world_config = world_config
+        self._index_lock = threading.Lock()
+        # ubicación -> {agent_id: agente}, en orden de llegada
+        self._agents_by_location: Dict[str, Dict[str, Agent]] = {}
+        # celda (x, y) -> {agent_id: agente}
+        self._agents_by_cell: Dict[Tuple[int, int], Dict[str, Agent]] = {}
+        # agent_id -> (ubicación, celda) con la que está indexado
+        self._indexed: Dict[str, Tuple[str, Tuple[int, int]]] = {}
+        # radio -> desplazamientos de celda dentro del radio, de más cerca a más lejos
+        self._cell_offsets: Dict[float, List[Tuple[int, int]]] = {}
+    
+    def index_agents(self, all_agents: List[Agent]):
+        """Reconstruye el índice espacial con la posición actual de los agentes"""
+        with self._index_lock:
+            self._agents_by_location = {}
+            self._agents_by_cell = {}
+            self._indexed = {}
+            for agent in all_agents:
+                self._add_to_index(agent)
+    
+    def update_agent_index(self, agent: Agent):
+        """Actualiza la entrada del agente en el índice si cambió de ubicación o de celda"""
+        with self._index_lock:
+            position = (agent.current_location, self._cell(agent.coordinates))
+            if self._indexed.get(agent.agent_id) == position:
+                return
+            self._remove_from_index(agent.agent_id)
+            self._add_to_index(agent)
+    
+    def _add_to_index(self, agent: Agent):
+        """Añade el agente a sus buckets (con el lock tomado)"""
+        cell = self._cell(agent.coordinates)
+        self._agents_by_location.setdefault(agent.current_location, {})[agent.agent_id] = agent
+        self._agents_by_cell.setdefault(cell, {})[agent.agent_id] = agent
+        self._indexed[agent.agent_id] = (agent.current_location, cell)
+    
+    def _remove_from_index(self, agent_id: str):
+        """Quita el agente de sus buckets (con el lock tomado)"""
+        position = self._indexed.pop(agent_id, None)
+        if position is None:
+            return
+        location_name, cell = position
+        for buckets, key in ((self._agents_by_location, location_name), (self._agents_by_cell, cell)):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.pop(agent_id, None)
+                if not bucket:
+                    del buckets[key]
+    
+    def get_nearby_agents(self, agent: Agent, limit: Optional[int] = None,
+                          radius: float = 1.0) -> List[Agent]:
+        """
+        Vecinos del agente según el índice espacial: primero los de su misma
+        ubicación y después los de las celdas a menos de radius, de más cerca
+        a más lejos. Con limit la búsqueda se detiene al alcanzarlo, así que
+        el coste no depende del número total de agentes.
+        """
+        with self._index_lock:
+            nearby = []
+            for other_agent in self._iter_neighbours(agent, radius):
+                if limit is not None and len(nearby) >= limit:
+                    break
+                nearby.append(other_agent)
+            return nearby
+    
+    def count_agents_at(self, location_name: str) -> int:
+        """Número de agentes indexados en una ubicación (O(1))"""
+        with self._index_lock:
+            return len(self._agents_by_location.get(location_name, {}))
+    
+    def _iter_neighbours(self, agent: Agent, radius: float) -> Iterator[Agent]:
+        """Recorre los vecinos sin repetir, de la ubicación y luego de las celdas cercanas"""
+        seen = {agent.agent_id}
+        for other_id, other_agent in self._agents_by_location.get(agent.current_location, {}).items():
+            if other_id not in seen:
+                seen.add(other_id)
+                yield other_agent
+        
+        x, y = self._cell(agent.coordinates)
+        for dx, dy in self._offsets_within(radius):
+            for other_id, other_agent in self._agents_by_cell.get((x + dx, y + dy), {}).items():
+                if other_id not in seen:
+                    seen.add(other_id)
+                    yield other_agent
+    
+    def _offsets_within(self, radius: float) -> List[Tuple[int, int]]:
+        """Desplazamientos de celda a distancia <= radius, ordenados por distancia"""
+        offsets = self._cell_offsets.get(radius)
+        if offsets is None:
+            reach = int(math.floor(radius))
+            offsets = sorted(
+                ((dx, dy) for dx in range(-reach, reach + 1) for dy in range(-reach, reach + 1)
+                 if math.hypot(dx, dy) <= radius),
+                key=lambda offset: math.hypot(*offset)
+            )
+            self._cell_offsets[radius] = offsets
+        return offsets
+    
+    @staticmethod
+    def _cell(coordinates: Tuple[int, int]) -> Tuple[int, int]:
+        """Celda entera del mapa que contiene unas coordenadas"""
+        x, y = coordinates
+        return int(math.floor(x)), int(math.floor(y))
     
     def detect_proximity(self, agent: Agent, all_agents: List[Agent], 
                         threshold: float = 1.0) -> List[Agent]:
@@ -45,6 +155,35 @@ class InteractionEngine:
         
         return same_location_agents
     
+    def detect_conversation_pairs(self, all_agents: List[Agent]) -> List[Tuple[Agent, Agent]]:
+        """
+        Retorna las parejas únicas que conversan en este tick.
+        Cada agente habla con el primer otro agente de su ubicación (en el orden
+        de all_agents); A-B y B-A cuentan como una sola conversación.
+        El orden del resultado es determinista.
+        """
+        agents_by_location: Dict[str, List[Agent]] = {}
+        for agent in all_agents:
+            agents_by_location.setdefault(agent.current_location, []).append(agent)
+        
+        pairs = []
+        seen: Set[frozenset] = set()
+        for agent in all_agents:
+            partner = next(
+                (other for other in agents_by_location[agent.current_location]
+                 if other.agent_id != agent.agent_id),
+                None
+            )
+            if partner is None:
+                continue
+            pair_key = frozenset((agent.agent_id, partner.agent_id))
+            if pair_key in seen:
+                continue
+            seen.add(pair_key)
+            pairs.append((agent, partner))
+        
+        return pairs
+    
     def validate_movement(self, agent: Agent, target_coordinates: Tuple[int, int],
                          locations: Dict[str, Location]) -> Tuple[bool, float]:
         """
@@ -94,6 +233,7 @@ class InteractionEngine:
             if new_location.enter(agent.agent_id):
                 agent.current_location = new_location.name
         
+        self.update_agent_index(agent)
         return True
     
     def _calculate_distance(self, coord1: Tuple[int, int], coord2: Tuple[int, int]) -> float:
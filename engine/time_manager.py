@@ -37,18 +37,23 @@ class TimeManager:
         """Aplica el decaimiento natural de energía"""
         for agent in agents:
             if not agent.is_collapsed():
-                # Decaimiento base por hora
-                base_decay = 2.0
-                
-                # Decaimiento adicional si está trabajando
-                if agent.current_location == agent.work_location and agent.work_location:
-                    base_decay += 5.0
-                
-                # Decaimiento adicional si tiene poca comida
-                if agent.grocery_level < 20:
-                    base_decay += 3.0
-                
-                agent.decay_energy(base_decay)
+                agent.decay_energy(self.energy_decay(agent))
+    
+    @staticmethod
+    def energy_decay(agent: Agent) -> float:
+        """Energía que pierde el agente en el siguiente tick según su situación"""
+        # Decaimiento base por hora
+        base_decay = 2.0
+        
+        # Decaimiento adicional si está trabajando
+        if agent.current_location == agent.work_location and agent.work_location:
+            base_decay += 5.0
+        
+        # Decaimiento adicional si tiene poca comida
+        if agent.grocery_level < 20:
+            base_decay += 3.0
+        
+        return base_decay
     
     def _reset_collapsed_agents(self, agents: List[Agent]):
         """Resetea agentes que han colapsado (energía = 0)"""
@@ -25,8 +25,16 @@ class TransactionSystem:
         if base_price is None:
             return None
         
-        # Obtener descuento activo de marketing
-        discount = self.world_config.get_discount(location.name)
+        # Obtener descuento activo de marketing (de la instantánea del tick si está vigente)
+        snapshot = self.world_config.current_snapshot()
+        if snapshot is not None:
+            if quantity == 1:
+                price = snapshot.get_price(location.name, product_name)
+                if price is not None:
+                    return price
+            discount = snapshot.get_discount(location.name)
+        else:
+            discount = self.world_config.get_discount(location.name)
         
         # Aplicar fórmula: FinalPrice = P_base * (1 - Descuento)
         final_price = base_price * quantity * (1 - discount)
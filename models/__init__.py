@@ -7,6 +7,7 @@ from models.world_config import WorldConfig
 from models.location import Location
 from models.agent import Agent
 from models.memory_stream import MemoryStream, MemoryEvent, Reflection
+from models.world_snapshot import WorldSnapshot
 
 __all__ = [
     "WorldConfig",
@@ -14,7 +15,8 @@ __all__ = [
     "Agent",
     "MemoryStream",
     "MemoryEvent",
-    "Reflection"
+    "Reflection",
+    "WorldSnapshot"
 ]
 
 
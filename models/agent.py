@@ -47,6 +47,7 @@ class Agent:
     is_planning_day: bool = False
     last_action: Optional[str] = None
     last_action_time: Optional[Tuple[int, int, int]] = None
+    last_action_success: Optional[bool] = None
     
     def decay_energy(self, amount: float = 2.0):
         """Reduce la energía del agente (se llama cada hora)"""
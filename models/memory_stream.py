@@ -3,8 +3,10 @@ Sistema de Memoria para Agentes
 Almacena eventos y reflexiones para formar hábitos
 """
 
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple
+from itertools import islice
+from typing import Deque, List, Dict, Optional, Tuple
 from datetime import datetime
 
 
@@ -29,12 +31,26 @@ class Reflection:
 
 
 class MemoryStream:
-    """Stream de memoria que almacena eventos y reflexiones"""
+    """
+    Stream de memoria que almacena eventos y reflexiones.
     
-    def __init__(self, max_events: int = 100):
+    Las líneas del contexto para prompts de los últimos context_lines eventos
+    y el bloque de la última reflexión se formatean una sola vez, al añadirse,
+    así que get_memory_context() y get_compact_context() solo unen piezas ya
+    preparadas. El texto resultante se memoriza hasta el siguiente cambio.
+    """
+    
+    def __init__(self, max_events: int = 100, context_lines: int = 10):
         self.events: List[MemoryEvent] = []
         self.reflections: List[Reflection] = []
         self.max_events = max_events
+        # Ventana de eventos ya formateados: texto y entradas del formato compacto
+        self._context_lines: Deque[str] = deque(maxlen=context_lines)
+        self._compact_events: Deque[Tuple[str, str, str]] = deque(maxlen=context_lines)
+        self._reflection_block = ""
+        self._compact_reflection: Dict = {}
+        # eventos mostrados -> contexto ya unido (se vacía con cada cambio)
+        self._contexts: Dict[int, str] = {}
     
     def add_event(self, timestamp: Tuple[int, int, int], event_type: str, 
                   description: str, location: Optional[str] = None,
@@ -53,6 +69,11 @@ class MemoryStream:
         # Mantener solo los últimos max_events
         if len(self.events) > self.max_events:
             self.events = self.events[-self.max_events:]
+        
+        day, hour, minute = timestamp
+        self._context_lines.append(f"- Día {day}, {hour:02d}:{minute:02d} - {event_type}: {description}\n")
+        self._compact_events.append((f"D{day} {hour:02d}:{minute:02d}", event_type, description))
+        self._contexts = {}
     
     def add_reflection(self, timestamp: Tuple[int, int, int], summary: str,
                       insights: List[str], habits_identified: List[str]):
@@ -64,6 +85,13 @@ class MemoryStream:
             habits_identified=habits_identified
         )
         self.reflections.append(reflection)
+        
+        self._reflection_block = f"\nÚltima Reflexión:\n{summary}\n"
+        self._compact_reflection = {"refl": summary}
+        if habits_identified:
+            self._reflection_block += f"Hábitos Identificados: {', '.join(habits_identified)}\n"
+            self._compact_reflection["hab"] = list(habits_identified)
+        self._contexts = {}
     
     def get_recent_events(self, hours: int = 24) -> List[MemoryEvent]:
         """Retorna eventos recientes dentro de las últimas N horas"""
@@ -94,22 +122,59 @@ class MemoryStream:
             filtered = self.get_events_by_type("Chat", limit)
         return filtered[-limit:]
     
-    def get_memory_context(self, window_hours: int = 48) -> str:
+    def _shown_count(self, window_hours: int, max_events: int) -> Optional[int]:
+        """
+        Número de eventos que muestra el contexto (los últimos de la ventana),
+        o None si no están todos en la ventana de líneas ya formateadas.
+        """
+        if max_events <= 0:
+            return 0
+        if window_hours <= 0:
+            return None
+        count = min(window_hours, max_events, len(self.events))
+        return count if count <= len(self._context_lines) else None
+    
+    def get_memory_context(self, window_hours: int = 48, max_events: int = 10) -> str:
         """Genera un contexto de memoria para prompts del LLM"""
+        count = self._shown_count(window_hours, max_events)
+        if count is None:
+            return self._render_memory_context(window_hours, max_events)
+        
+        context = self._contexts.get(count)
+        if context is None:
+            lines = islice(self._context_lines, len(self._context_lines) - count, None)
+            context = "Memoria Reciente:\n" + "".join(lines) + self._reflection_block
+            self._contexts[count] = context
+        return context
+    
+    def _render_memory_context(self, window_hours: int, max_events: int) -> str:
+        """Contexto formateado desde los eventos, para ventanas mayores que la preparada"""
         recent_events = self.get_recent_events(window_hours)
         
+        shown = recent_events[-max_events:] if max_events > 0 else []  # Últimos max_events eventos
+        
         context = "Memoria Reciente:\n"
-        for event in recent_events[-10:]:  # Últimos 10 eventos
+        for event in shown:
             day, hour, minute = event.timestamp
             context += f"- Día {day}, {hour:02d}:{minute:02d} - {event.event_type}: {event.description}\n"
+        return context + self._reflection_block
+    
+    def get_compact_context(self, window_hours: int = 48, max_events: int = 10) -> Dict:
+        """
+        Versión compacta de get_memory_context() para prompts en JSON:
+        {"ev": [["D<día> HH:MM", tipo, descripción]], "refl": ..., "hab": [...]}
+        """
+        count = self._shown_count(window_hours, max_events)
+        if count is None:
+            recent_events = self.get_recent_events(window_hours)
+            entries = [
+                (f"D{event.timestamp[0]} {event.timestamp[1]:02d}:{event.timestamp[2]:02d}",
+                 event.event_type, event.description)
+                for event in recent_events[-max_events:]
+            ]
+        else:
+            entries = list(islice(self._compact_events, len(self._compact_events) - count, None))
         
-        if self.reflections:
-            latest_reflection = self.reflections[-1]
-            context += f"\nÚltima Reflexión:\n{latest_reflection.summary}\n"
-            if latest_reflection.habits_identified:
-                context += f"Hábitos Identificados: {', '.join(latest_reflection.habits_identified)}\n"
-        
+        context: Dict = {"ev": entries}
+        context.update(self._compact_reflection)
         return context
-
-
-
@@ -4,8 +4,10 @@ Define el estado del mundo y sus parámetros principales
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, time
+from models.location import Location
+from models.world_snapshot import WorldSnapshot
 
 
 @dataclass
@@ -29,6 +31,40 @@ class WorldConfig:
     # Grid de ubicaciones (matriz de coordenadas)
     grid: List[List[None]] = field(default_factory=lambda: [[None for _ in range(10)] for _ in range(10)])
     
+    # Instantánea del tick (ver take_snapshot)
+    snapshot: Optional[WorldSnapshot] = field(default=None, repr=False, compare=False)
+    # Versión de las campañas: sube con cada cambio (ver snapshot_key)
+    campaigns_version: int = field(default=0, repr=False, compare=False)
+    
+    def __setattr__(self, name, value):
+        """Reasignar marketing_campaigns cuenta como cambio de campañas"""
+        if name == "marketing_campaigns":
+            object.__setattr__(self, "campaigns_version", getattr(self, "campaigns_version", 0) + 1)
+        object.__setattr__(self, name, value)
+    
+    def add_campaign(self, campaign: Dict):
+        """Añade una campaña de marketing"""
+        self.marketing_campaigns.append(campaign)
+        self.mark_campaigns_changed()
+    
+    def update_campaign(self, index: int, **changes):
+        """Modifica los campos de la campaña en la posición index"""
+        self.marketing_campaigns[index].update(changes)
+        self.mark_campaigns_changed()
+    
+    def remove_campaign(self, index: int) -> Dict:
+        """Elimina y retorna la campaña en la posición index"""
+        campaign = self.marketing_campaigns.pop(index)
+        self.mark_campaigns_changed()
+        return campaign
+    
+    def mark_campaigns_changed(self):
+        """
+        Registra un cambio de campañas hecho directamente sobre la lista o sus
+        diccionarios, para que la siguiente instantánea lo recoja.
+        """
+        self.campaigns_version += 1
+    
     def get_current_time(self) -> Tuple[int, int, int]:
         """Retorna (día, hora, minuto) actual"""
         return (self.current_day, self.current_hour, self.current_minute)
@@ -44,7 +80,7 @@ class WorldConfig:
         if self.current_minute >= 60:
             self.current_minute = 0
             self.current_hour += 1
-            
+        
         if self.current_hour >= 24:
             self.current_hour = 0
             self.current_day += 1
@@ -68,6 +104,26 @@ class WorldConfig:
                 if campaign.get("location_name") == location_name:
                     return campaign.get("discount_percent", 0) / 100.0
         return 0.0
-
-
-
+    
+    def snapshot_key(self) -> Tuple:
+        """Firma del estado que invalida la instantánea: la hora y la versión de las campañas"""
+        return (self.current_day, self.current_hour, self.current_minute, self.campaigns_version)
+    
+    def take_snapshot(self, locations: Dict[str, Location]) -> WorldSnapshot:
+        """
+        Congela la hora, los descuentos, los precios y la ocupación del tick.
+        Se llama al inicio del tick, antes de repartir trabajo entre hilos.
+        """
+        self.snapshot = WorldSnapshot.capture(self, locations)
+        return self.snapshot
+    
+    def current_snapshot(self) -> Optional[WorldSnapshot]:
+        """Instantánea vigente, o None si no hay o cambió la hora o las campañas"""
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.key == self.snapshot_key():
+            return snapshot
+        return None
+    
+    def get_snapshot(self, locations: Dict[str, Location]) -> WorldSnapshot:
+        """Instantánea vigente; si no la hay, la captura"""
+        return self.current_snapshot() or self.take_snapshot(locations)
@@ -0,0 +1,85 @@
+"""
+Instantánea del Mundo
+Vista inmutable del estado del mundo en un tick, compartida por los hilos de trabajo
+"""
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Tuple
+from models.location import Location
+
+if TYPE_CHECKING:
+    from models.world_config import WorldConfig
+
+
+DAY_NAMES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+@dataclass(frozen=True)
+class WorldSnapshot:
+    """
+    Estado del mundo congelado al inicio de un tick.
+    
+    Las campañas de marketing se recorren una sola vez al capturarla, así que
+    consultar descuentos y precios cuesta una búsqueda en un diccionario en
+    lugar de un recorrido de campañas por llamada. Los diccionarios son de
+    solo lectura, de modo que todos los hilos ven los mismos valores aunque
+    el estado vivo cambie durante el tick.
+    """
+    
+    key: Tuple  # Firma de WorldConfig al capturarla (hora y campañas)
+    time: Tuple[int, int, int]  # (día, hora, minuto)
+    day_of_week: int
+    day_name: str
+    discounts: Mapping[str, float]  # Ubicación con campaña activa -> descuento (0.0 a 1.0)
+    prices: Mapping[Tuple[str, str], float]  # (ubicación, producto) -> precio final unitario
+    occupancy: Mapping[str, int]  # Ubicación -> agentes presentes al capturarla
+    catalog: Tuple  # ((ubicación, tipo, coordenadas, productos), ...) al capturarla
+    
+    @classmethod
+    def capture(cls, world_config: "WorldConfig", locations: Dict[str, Location]) -> "WorldSnapshot":
+        """Captura la instantánea del tick actual de world_config"""
+        discounts = {}
+        for name in locations:
+            if world_config.is_marketing_active(name):
+                discounts[name] = world_config.get_discount(name)
+        
+        prices = {}
+        catalog = []
+        for location in locations.values():
+            discount = discounts.get(location.name, 0.0)
+            for product_name, product in location.inventory.items():
+                # Misma fórmula que TransactionSystem.calculate_price con cantidad 1
+                prices[(location.name, product_name)] = product["price"] * (1 - discount)
+            catalog.append((location.name, location.location_type, tuple(location.coordinates),
+                            tuple(location.inventory)))
+        
+        day_of_week = world_config.get_day_of_week()
+        return cls(
+            key=world_config.snapshot_key(),
+            time=world_config.get_current_time(),
+            day_of_week=day_of_week,
+            day_name=DAY_NAMES[day_of_week],
+            discounts=MappingProxyType(discounts),
+            prices=MappingProxyType(prices),
+            occupancy=MappingProxyType({
+                location.name: len(location.agents_present) for location in locations.values()
+            }),
+            catalog=tuple(catalog)
+        )
+    
+    def is_discounted(self, location_name: str) -> bool:
+        """True si la ubicación tiene una campaña activa en el tick"""
+        return location_name in self.discounts
+    
+    def get_discount(self, location_name: str) -> float:
+        """Descuento activo de la ubicación (0.0 a 1.0)"""
+        return self.discounts.get(location_name, 0.0)
+    
+    def get_price(self, location_name: str, product_name: str) -> Optional[float]:
+        """Precio final unitario del producto o None si no estaba a la venta al capturarla"""
+        return self.prices.get((location_name, product_name))
+    
+    def active_discounts(self) -> List[str]:
+        """Ubicaciones con campaña activa"""
+        return list(self.discounts)
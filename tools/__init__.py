@@ -0,0 +1,11 @@
+"""
+Módulo de Herramientas
+Utilidades de desarrollo: servidor LLM simulado y pruebas de carga
+"""
+
+from tools.mock_llm_server import MockLLMServer, MockServerConfig
+
+__all__ = [
+    "MockLLMServer",
+    "MockServerConfig"
+]
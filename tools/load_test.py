@@ -0,0 +1,151 @@
+"""
+Prueba de Carga del DecisionMaker
+Mide el throughput de decisiones frente a la concurrencia contra el servidor simulado
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from models.world_config import WorldConfig
+from models.location import Location
+from models.agent import Agent
+from engine.transaction_system import TransactionSystem
+from cognition.llm_client import LLMClient
+from cognition.decision_maker import DecisionMaker
+from cognition.utility_policy import UtilityPolicy
+from cognition.rate_limiter import configure_shared_limiter
+from tools.mock_llm_server import MockLLMServer, MockServerConfig
+
+
+def build_world(num_agents: int):
+    """Crea un mundo sintético con las ubicaciones por defecto y N agentes"""
+    world_config = WorldConfig(width=10, height=10)
+    locations = {
+        "home": Location(name="home", coordinates=(0, 0), location_type="Residence", capacity=num_agents),
+        "Coffee Shop": Location(name="Coffee Shop", coordinates=(3, 3), location_type="Restaurant", capacity=num_agents),
+        "Grocery Store": Location(name="Grocery Store", coordinates=(5, 5), location_type="Grocery", capacity=num_agents),
+        "Chicken Shop": Location(name="Chicken Shop", coordinates=(7, 7), location_type="Restaurant", capacity=num_agents),
+        "office": Location(name="office", coordinates=(2, 2), location_type="Work", capacity=num_agents)
+    }
+    locations["Coffee Shop"].add_product("coffee", price=5.0)
+    locations["Coffee Shop"].add_product("sandwich", price=8.0)
+    locations["Grocery Store"].add_product("groceries", price=30.0)
+    locations["Chicken Shop"].add_product("chicken", price=12.0)
+    
+    agents = [
+        Agent(
+            agent_id=f"agent_{i}",
+            name=f"Agente {i}",
+            age=20 + i % 40,
+            profession="Tester",
+            personality_traits=["thrifty"] if i % 2 else ["impulsive"],
+            work_location="office"
+        )
+        for i in range(num_agents)
+    ]
+    return world_config, locations, agents
+
+
+def run_sync(decision_maker: DecisionMaker, agents: List[Agent]) -> float:
+    """Ejecuta decide_actions_parallel (hilos) y retorna el tiempo en segundos"""
+    start = time.perf_counter()
+    decision_maker.decide_actions_parallel(agents)
+    return time.perf_counter() - start
+
+
+def run_batched(decision_maker: DecisionMaker, agents: List[Agent], batch_size: int) -> float:
+    """Ejecuta decide_actions_batched con el tamaño de lote dado y retorna el tiempo"""
+    start = time.perf_counter()
+    decision_maker.decide_actions_batched(agents, batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def run_async(decision_maker: DecisionMaker, agents: List[Agent], concurrency: int) -> float:
+    """Ejecuta adecide_actions_parallel con la concurrencia dada y retorna el tiempo"""
+    async def tick():
+        start = time.perf_counter()
+        await decision_maker.adecide_actions_parallel(agents, max_concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        await decision_maker.llm_client.aclose()
+        return elapsed
+    
+    return asyncio.run(tick())
+
+
+def run_utility(world_config: WorldConfig, locations: Dict, agents: List[Agent], ticks: int) -> float:
+    """Decide `ticks` horas con UtilityPolicy (sin LLM) y retorna el tiempo por tick"""
+    policy = UtilityPolicy(world_config, locations, TransactionSystem(world_config))
+    start = time.perf_counter()
+    for _ in range(ticks):
+        policy.begin_tick()
+        policy.decide_actions_parallel(agents)
+    return (time.perf_counter() - start) / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput del DecisionMaker frente a la concurrencia")
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--workers", default="5,16,32,64",
+                        help="Lista de tamaños del pool de hilos separados por comas")
+    parser.add_argument("--concurrency", default="5,10,25,50,100,200",
+                        help="Lista de niveles de concurrencia asíncrona separados por comas")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Si es > 0, mide también el reactor por lotes con este tamaño")
+    parser.add_argument("--latency-mean", type=float, default=0.5)
+    parser.add_argument("--latency-stddev", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--url", help="Usar un servidor ya arrancado en lugar del simulado interno")
+    parser.add_argument("--utility-ticks", type=int, default=0,
+                        help="Si es > 0, mide también UtilityPolicy durante este número de ticks")
+    args = parser.parse_args()
+    
+    server = None
+    url = args.url
+    if not url:
+        server = MockLLMServer(MockServerConfig(
+            latency_mean=args.latency_mean,
+            latency_stddev=args.latency_stddev,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate
+        ), port=0).start()
+        url = server.url
+    
+    # El limitador compartido no debe ser el cuello de botella de la medición
+    worker_levels = [int(w) for w in args.workers.split(",") if w.strip()]
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    ceiling = max(levels + worker_levels + [args.agents])
+    configure_shared_limiter(requests_per_second=100000, burst=100000,
+                             initial_concurrency=ceiling, max_concurrency=ceiling)
+    
+    world_config, locations, agents = build_world(args.agents)
+    llm_client = LLMClient(api_key="mock", base_url=url)
+    decision_maker = DecisionMaker(world_config, locations, llm_client)
+    
+    results: Dict[str, float] = {}
+    for workers in worker_levels:
+        threaded = DecisionMaker(world_config, locations, llm_client, max_workers=workers)
+        results[f"threads x{workers}"] = run_sync(threaded, agents)
+        threaded.shutdown()
+    if args.batch_size > 0:
+        results[f"batched x{args.batch_size}"] = run_batched(decision_maker, agents, args.batch_size)
+    for level in levels:
+        results[f"async x{level}"] = run_async(decision_maker, agents, level)
+    if args.utility_ticks > 0:
+        results["utility"] = run_utility(world_config, locations, agents, args.utility_ticks)
+    
+    print(f"{'modo':<16}{'segundos':>10}{'decisiones/s':>15}")
+    for mode, elapsed in results.items():
+        print(f"{mode:<16}{elapsed:>10.2f}{len(agents) / elapsed:>15.1f}")
+    
+    decision_maker.shutdown()
+    llm_client.close()
+    if server:
+        server.stop()
+        print(f"Servidor: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Servidor LLM Simulado
+Servidor local compatible con /v1/chat/completions para pruebas de carga sin red
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_LOCATIONS = {
+    "home": [],
+    "Coffee Shop": ["coffee", "sandwich"],
+    "Grocery Store": ["groceries"],
+    "Chicken Shop": ["chicken"],
+    "office": []
+}
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer con una cola de conexiones amplia para ráfagas concurrentes"""
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+@dataclass
+class MockServerConfig:
+    """Parámetros de latencia y fallos del servidor simulado"""
+    
+    # Latencia por petición (segundos)
+    latency_distribution: str = "lognormal"  # "fixed", "uniform", "normal", "lognormal"
+    latency_mean: float = 0.8
+    latency_stddev: float = 0.4
+    latency_min: float = 0.0
+    latency_max: float = 30.0
+    
+    # Errores
+    error_rate: float = 0.0  # Probabilidad de responder 500
+    rate_limit_rate: float = 0.0  # Probabilidad de responder 429 fuera de ráfagas
+    burst_interval: float = 0.0  # Cada cuántos segundos empieza una ráfaga de 429 (0 = sin ráfagas)
+    burst_duration: float = 0.0  # Duración de cada ráfaga de 429
+    
+    # Streaming (peticiones con "stream": true)
+    stream_chunk_chars: int = 8  # Caracteres de contenido por fragmento
+    stream_chunk_delay: float = 0.01  # Segundos entre fragmentos (velocidad de generación)
+    
+    # Ubicaciones conocidas {nombre: [productos]} para generar decisiones válidas
+    locations: Dict[str, List[str]] = field(default_factory=lambda: dict(DEFAULT_LOCATIONS))
+    seed: Optional[int] = None
+
+
+class MockLLMServer:
+    """
+    Servidor HTTP que imita la API de chat completions.
+    Genera JSON válido para el planificador, el reactor y las conversaciones
+    según el tipo de prompt recibido.
+    """
+    
+    def __init__(self, config: Optional[MockServerConfig] = None,
+                 host: str = "127.0.0.1", port: int = 8000):
+        self.config = config or MockServerConfig()
+        self.host = host
+        self.port = port
+        self._random = random.Random(self.config.seed)
+        self._random_lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._server: Optional[_MockHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        
+        # Estadísticas
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+    
+    @property
+    def url(self) -> str:
+        """URL completa del endpoint de chat completions"""
+        return f"http://{self.host}:{self.port}/v1/chat/completions"
+    
+    def start(self) -> "MockLLMServer":
+        """Arranca el servidor en un hilo en segundo plano"""
+        handler = self._make_handler()
+        self._server = _MockHTTPServer((self.host, self.port), handler)
+        self.port = self._server.server_address[1]
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Detiene el servidor"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+    
+    def _count(self, key: str):
+        """Incrementa un contador de estadísticas"""
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    def _sample_latency(self) -> float:
+        """Muestrea la latencia de una petición según la distribución configurada"""
+        config = self.config
+        with self._random_lock:
+            if config.latency_distribution == "fixed":
+                latency = config.latency_mean
+            elif config.latency_distribution == "uniform":
+                latency = self._random.uniform(
+                    config.latency_mean - config.latency_stddev,
+                    config.latency_mean + config.latency_stddev
+                )
+            elif config.latency_distribution == "normal":
+                latency = self._random.gauss(config.latency_mean, config.latency_stddev)
+            else:
+                # Lognormal parametrizada por media y desviación reales
+                mean = max(config.latency_mean, 1e-6)
+                variance = config.latency_stddev ** 2
+                sigma2 = math.log(1 + variance / mean ** 2)
+                mu = math.log(mean) - sigma2 / 2
+                latency = self._random.lognormvariate(mu, sigma2 ** 0.5)
+        return max(config.latency_min, min(config.latency_max, latency))
+    
+    def _pick_status(self) -> int:
+        """Decide el código HTTP de la respuesta (200, 429 o 500)"""
+        config = self.config
+        if config.burst_interval > 0 and config.burst_duration > 0:
+            elapsed = time.monotonic() - self._started_at
+            if elapsed % config.burst_interval < config.burst_duration:
+                return 429
+        with self._random_lock:
+            roll = self._random.random()
+        if roll < config.rate_limit_rate:
+            return 429
+        if roll < config.rate_limit_rate + config.error_rate:
+            return 500
+        return 200
+    
+    def build_completion(self, prompt: str) -> Dict:
+        """Genera el contenido JSON adecuado para el tipo de prompt"""
+        with self._random_lock:
+            if "Planifica tu día" in prompt:
+                return self._planner_response(prompt)
+            if "Genera un diálogo" in prompt:
+                return self._conversation_response()
+            if "cuyas claves sean los agent_id" in prompt:
+                agent_ids = re.findall(r"^### Agente (\S+) - ", prompt, flags=re.MULTILINE)
+                if not agent_ids:
+                    # Formato compacto: {"ags":[{"id":"...", ...}]}
+                    agent_ids = re.findall(r'"id":"([^"]+)"', prompt)
+                return {agent_id: self._reactor_response() for agent_id in agent_ids}
+            return self._reactor_response()
+    
+    def _planner_response(self, prompt: str) -> Dict:
+        """Plan diario con una actividad cada dos horas"""
+        match = re.search(r"desde las (\d{2}):00", prompt)
+        start_hour = int(match.group(1)) if match else 7
+        names = list(self.config.locations.keys())
+        plan = []
+        for hour in range(start_hour + 1, 24, 2):
+            location = self._random.choice(names)
+            products = self.config.locations[location]
+            if products:
+                plan.append({"time": f"{hour:02d}:00", "action": "buy", "location": location,
+                             "product": self._random.choice(products), "purpose": "comprar"})
+            else:
+                plan.append({"time": f"{hour:02d}:00", "action": "move", "location": location,
+                             "purpose": "desplazarse"})
+        return {"plan": plan, "reasoning": "Plan generado por el servidor simulado"}
+    
+    def _reactor_response(self) -> Dict:
+        """Decisión horaria con ubicación y producto existentes"""
+        action = self._random.choice(["buy", "move", "rest", "eat", "work"])
+        shops = [name for name, products in self.config.locations.items() if products]
+        location = self._random.choice(shops if action == "buy" and shops else list(self.config.locations))
+        products = self.config.locations.get(location, [])
+        return {
+            "action": action,
+            "target_location": location if action in ("buy", "move") else None,
+            "target_product": self._random.choice(products) if action == "buy" and products else None,
+            "target_agent": None,
+            "reasoning": "Decisión generada por el servidor simulado",
+            "urgency": self._random.choice(["high", "medium", "low"])
+        }
+    
+    def _conversation_response(self) -> Dict:
+        """Diálogo corto con un cambio de relación aleatorio"""
+        return {
+            "dialogue": "¡Hola! ¿Qué tal el día?",
+            "topic": "saludo",
+            "relationship_change": round(self._random.uniform(-0.1, 0.2), 2),
+            "reasoning": "Conversación generada por el servidor simulado"
+        }
+    
+    def handle_completion(self, body: Dict) -> Tuple[int, Dict]:
+        """Procesa una petición de chat completions y retorna (status, json)"""
+        self._count("requests")
+        time.sleep(self._sample_latency())
+        
+        status = self._pick_status()
+        if status == 429:
+            self._count("rate_limited")
+            return 429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}
+        if status == 500:
+            self._count("errors")
+            return 500, {"error": {"message": "Internal server error", "type": "server_error"}}
+        
+        messages = body.get("messages", [])
+        prompt = messages[-1].get("content", "") if messages else ""
+        content = json.dumps(self.build_completion(prompt), ensure_ascii=False)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        
+        self._count("ok")
+        return 200, {
+            "id": f"mock-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+    
+    def stream_chunks(self, response: Dict) -> List[Dict]:
+        """Divide una respuesta completa en los fragmentos chat.completion.chunk del streaming"""
+        content = response["choices"][0]["message"]["content"]
+        size = max(1, self.config.stream_chunk_chars)
+        base = {"id": response["id"], "object": "chat.completion.chunk",
+                "created": response["created"], "model": response["model"]}
+        chunks = [
+            dict(base, choices=[{"index": 0, "delta": {"content": content[i:i + size]}, "finish_reason": None}])
+            for i in range(0, len(content), size)
+        ]
+        chunks.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        chunks.append(dict(base, choices=[], usage=response["usage"]))
+        return chunks
+    
+    def _make_handler(self):
+        """Crea la clase de handler HTTP ligada a esta instancia"""
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Permite conexiones keep-alive
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send(400, {"error": {"message": "Invalid JSON"}})
+                    return
+                
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                
+                status, response = server.handle_completion(body)
+                if status == 200 and body.get("stream"):
+                    self._send_stream(server.stream_chunks(response))
+                else:
+                    self._send(status, response)
+            
+            def _send_stream(self, chunks: List[Dict]):
+                """Envía la respuesta como server-sent events con el ritmo configurado"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                events = [f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n" for chunk in chunks]
+                events.append("data: [DONE]\n\n")
+                for event in events:
+                    data = event.encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+                    time.sleep(server.config.stream_chunk_delay)
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            
+            def _send(self, status: int, data: Dict):
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(payload)
+        
+        return Handler
+
+
+def load_locations_from_config(path: str) -> Dict[str, List[str]]:
+    """Lee las ubicaciones y productos de un JSON de configuración de la simulación"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        loc["name"]: [product["name"] for product in loc.get("products", [])]
+        for loc in data.get("locations", [])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor LLM simulado compatible con chat completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--config", help="JSON de configuración de la simulación (ubicaciones)")
+    parser.add_argument("--latency-distribution", default="lognormal",
+                        choices=["fixed", "uniform", "normal", "lognormal"])
+    parser.add_argument("--latency-mean", type=float, default=0.8)
+    parser.add_argument("--latency-stddev", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--burst-interval", type=float, default=0.0)
+    parser.add_argument("--burst-duration", type=float, default=0.0)
+    parser.add_argument("--stream-chunk-chars", type=int, default=8)
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.01)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    
+    config = MockServerConfig(
+        latency_distribution=args.latency_distribution,
+        latency_mean=args.latency_mean,
+        latency_stddev=args.latency_stddev,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        burst_interval=args.burst_interval,
+        burst_duration=args.burst_duration,
+        stream_chunk_chars=args.stream_chunk_chars,
+        stream_chunk_delay=args.stream_chunk_delay,
+        seed=args.seed
+    )
+    if args.config:
+        config.locations = load_locations_from_config(args.config)
+    
+    server = MockLLMServer(config, host=args.host, port=args.port).start()
+    print(f"Servidor LLM simulado escuchando en {server.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
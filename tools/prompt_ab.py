@@ -0,0 +1,172 @@
+"""
+Comparación A/B de Formatos de Prompt
+Mide tokens de entrada y validez de las decisiones con el formato explicativo y el compacto
+"""
+
+import argparse
+import os
+import time
+from typing import Dict, List, Optional
+
+from models.agent import Agent
+from cognition.llm_client import LLMClient, SYSTEM_MESSAGE
+from cognition.decision_maker import DecisionMaker, VALID_ACTIONS
+from cognition.prompt_builder import FORMAT_VERBOSE, FORMAT_COMPACT, estimate_tokens
+from cognition.rate_limiter import configure_shared_limiter
+from cognition.usage_tracker import (
+    CALL_DAILY_PLANNER, CALL_ACTION_REACTOR, CALL_BATCHED_REACTOR, CALL_CONVERSATION
+)
+from tools.load_test import build_world
+from tools.mock_llm_server import MockLLMServer, MockServerConfig
+
+
+CALL_TYPES = (CALL_DAILY_PLANNER, CALL_ACTION_REACTOR, CALL_BATCHED_REACTOR, CALL_CONVERSATION)
+
+
+def is_valid_decision(decision: Optional[Dict], locations: Dict, agent_ids: List[str]) -> bool:
+    """
+    Decisión ejecutable: acción conocida y, según la acción, ubicación,
+    producto o agente existentes.
+    """
+    if not isinstance(decision, dict) or decision.get("error"):
+        return False
+    action = str(decision.get("action", "")).lower()
+    if action not in VALID_ACTIONS:
+        return False
+    location = locations.get(decision.get("target_location"))
+    if action == "move":
+        return location is not None
+    if action == "buy":
+        return location is not None and decision.get("target_product") in location.inventory
+    if action == "chat":
+        return decision.get("target_agent") in agent_ids
+    return True
+
+
+def is_valid_plan(plan: Dict, locations: Dict) -> bool:
+    """Plan con al menos una actividad y todas con acción y ubicación existentes"""
+    items = plan.get("plan") or []
+    if not items:
+        return False
+    for item in items:
+        if not isinstance(item, dict) or str(item.get("action", "")).lower() not in VALID_ACTIONS:
+            return False
+        if item.get("location") is not None and item["location"] not in locations:
+            return False
+    return True
+
+
+def is_valid_conversation(conversation: Dict) -> bool:
+    """Conversación con diálogo y un cambio de relación numérico"""
+    return (bool(conversation.get("dialogue")) and
+            isinstance(conversation.get("relationship_change"), (int, float)) and
+            not str(conversation.get("reasoning", "")).startswith("Error:"))
+
+
+def run_call_type(decision_maker: DecisionMaker, call_type: str, agents: List[Agent],
+                  locations: Dict, batch_size: int) -> List[bool]:
+    """Ejecuta un tipo de llamada para todos los agentes y retorna la validez de cada resultado"""
+    agent_ids = [agent.agent_id for agent in agents]
+    
+    if call_type == CALL_DAILY_PLANNER:
+        plans = decision_maker.plan_daily_parallel(agents)
+        return [is_valid_plan(plans.get(agent_id, {}), locations) for agent_id in agent_ids]
+    
+    if call_type == CALL_ACTION_REACTOR:
+        decisions = decision_maker.decide_actions_parallel(agents)
+        return [is_valid_decision(decisions.get(agent_id), locations, agent_ids) for agent_id in agent_ids]
+    
+    if call_type == CALL_BATCHED_REACTOR:
+        # Sin el reintento individual de decide_actions_batched(): se mide solo la respuesta del lote
+        results = []
+        for start in range(0, len(agents), batch_size):
+            batch = agents[start:start + batch_size]
+            decisions = decision_maker.decide_batch(batch)
+            results.extend(is_valid_decision(decisions.get(agent.agent_id), locations, agent_ids)
+                           for agent in batch)
+        return results
+    
+    pairs = list(zip(agents[0::2], agents[1::2]))
+    return [is_valid_conversation(conversation)
+            for conversation in decision_maker.generate_conversations_parallel(pairs)]
+
+
+def measure(prompt_format: str, call_types: List[str], args, url: str, api_key: str) -> Dict[str, Dict]:
+    """Mide cada tipo de llamada con un formato sobre un mundo nuevo"""
+    world_config, locations, agents = build_world(args.agents)
+    world_config.current_hour = 7
+    llm_client = LLMClient(api_key=api_key, base_url=url)
+    if args.model:
+        llm_client.set_model(args.model)
+    decision_maker = DecisionMaker(world_config, locations, llm_client,
+                                   prompt_formats={call_type: prompt_format for call_type in call_types})
+    builder = decision_maker.prompt_builder
+    
+    results = {}
+    for call_type in call_types:
+        start = time.perf_counter()
+        validity = run_call_type(decision_maker, call_type, agents, locations, args.batch_size)
+        elapsed = time.perf_counter() - start
+        
+        sizes = builder.get_size_stats().get(call_type, {})
+        system_tokens = estimate_tokens(builder.get_system_message(call_type) or SYSTEM_MESSAGE)
+        usage = llm_client.usage_tracker.get_totals_by_call_type().get(call_type, {})
+        results[call_type] = {
+            "calls": sizes.get("prompts", 0),
+            "est_input_tokens": sizes.get("avg_tokens", 0.0) + system_tokens,
+            "prompt_tokens": usage["prompt_tokens"] / usage["api_calls"] if usage.get("api_calls") else 0.0,
+            "valid_rate": sum(validity) / len(validity) if validity else 0.0,
+            "seconds": elapsed
+        }
+    
+    decision_maker.shutdown()
+    llm_client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A/B de formato de prompt: tokens de entrada y validez")
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--call-types", default=",".join(CALL_TYPES),
+                        help="Tipos de llamada a comparar separados por comas")
+    parser.add_argument("--batch-size", type=int, default=5,
+                        help="Agentes por llamada del reactor por lotes")
+    parser.add_argument("--latency-mean", type=float, default=0.05)
+    parser.add_argument("--url", help="Usar un endpoint real o ya arrancado en lugar del simulado interno")
+    parser.add_argument("--api-key", default=os.environ.get("DEEPSEEK_API_KEY", "mock"))
+    parser.add_argument("--model", help="Modelo a usar con --url")
+    args = parser.parse_args()
+    call_types = [call_type.strip() for call_type in args.call_types.split(",") if call_type.strip()]
+    
+    server = None
+    url = args.url
+    if not url:
+        server = MockLLMServer(MockServerConfig(latency_mean=args.latency_mean, latency_stddev=0.0),
+                               port=0).start()
+        url = server.url
+    
+    # El limitador compartido no debe ser el cuello de botella de la medición
+    configure_shared_limiter(requests_per_second=100000, burst=100000,
+                             initial_concurrency=max(args.agents, 1), max_concurrency=max(args.agents, 1))
+    
+    results = {prompt_format: measure(prompt_format, call_types, args, url, args.api_key)
+               for prompt_format in (FORMAT_VERBOSE, FORMAT_COMPACT)}
+    
+    print(f"{'tipo':<18}{'formato':<10}{'llamadas':>9}{'tokens est.':>13}{'prompt_tokens':>15}"
+          f"{'válidas':>9}{'segundos':>10}")
+    for call_type in call_types:
+        for prompt_format, by_type in results.items():
+            row = by_type[call_type]
+            print(f"{call_type:<18}{prompt_format:<10}{row['calls']:>9}{row['est_input_tokens']:>13.0f}"
+                  f"{row['prompt_tokens']:>15.0f}{row['valid_rate']:>9.0%}{row['seconds']:>10.2f}")
+        verbose = results[FORMAT_VERBOSE][call_type]["est_input_tokens"]
+        compact = results[FORMAT_COMPACT][call_type]["est_input_tokens"]
+        if verbose:
+            print(f"{'':<18}ahorro de tokens de entrada: {1 - compact / verbose:.0%}")
+    
+    if server:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()